@@ -4,5 +4,7 @@ set -o errexit
 
 pip install -r requirements.txt
 
+# Download the CDN assets into static/vendor so collectstatic hashes and compresses them
+python manage.py vendor_static
 python manage.py collectstatic --no-input
 python manage.py migrate
\ No newline at end of file
@@ -0,0 +1,70 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from smart_campus.routers import primary_reads
+
+from .versions import get_version, last_changed
+
+
+def _personal_state(request):
+    """What a page shows about the viewer that the model versions do not cover"""
+    user = request.user
+    # unread_count is kept up to date with update(), which sends no signal
+    return f'{user.pk}:{getattr(user, "unread_count", "")}'
+
+
+def _pending_messages(request):
+    # A 304 would leave a queued flash message unshown until the next full render
+    return bool(request.COOKIES.get(getattr(settings, 'MESSAGE_COOKIE_NAME', 'messages')))
+
+
+def conditional_page(*labels, vary_on=None):
+    """
+    Answer repeat GETs of a page with 304 Not Modified while its data is unchanged.
+
+    The ETag combines the version tokens of `labels` (see caching.versions),
+    the viewer and an optional vary_on(request) value, so it costs no
+    queries. Last-Modified is the time the newest of those versions was
+    issued. Responses are marked private and must be revalidated, so
+    browsers keep a copy but ask before every reuse. ETAG_SALT should
+    change on deploy so template changes reach browsers. The page reads
+    the primary: rendered from a lagging replica it would carry the ETag
+    of data it does not show yet.
+    """
+    def etag(request, *args, **kwargs):
+        if _pending_messages(request):
+            return None
+        parts = [
+            getattr(settings, 'ETAG_SALT', ''),
+            get_version(*labels),
+            _personal_state(request),
+            vary_on(request) if vary_on else '',
+        ]
+        return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if _pending_messages(request):
+            return None
+        return last_changed(*labels)
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with primary_reads():
+                response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def clock_minute(request):
+    """vary_on for pages whose content also depends on the current time"""
+    return timezone.now().strftime('%Y%m%d%H%M')
@@ -0,0 +1,61 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from .versions import CACHED_MODELS, bump_version
+
+# Models that cached pages show only a few fields of: saving one of these
+# rows invalidates the pages only when a shown field actually changes
+_DISPLAYED_FIELDS = {
+    'users.User': ('username',),
+}
+
+
+def _invalidate(label):
+    bump_version(label)
+    # Bump again once the transaction commits: a request that read the old
+    # rows between the first bump and the commit may have cached them under
+    # the new version
+    transaction.on_commit(lambda: bump_version(label))
+
+
+def remember_displayed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Note the stored values of the displayed fields before a save overwrites them"""
+    fields = _DISPLAYED_FIELDS[sender._meta.label]
+    instance._displayed_before = None
+    if raw or instance._state.adding or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    instance._displayed_before = sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def invalidate_model(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    label = sender._meta.label
+    fields = _DISPLAYED_FIELDS.get(label)
+    if fields is not None and 'created' in kwargs:
+        # Only post_save passes `created`. A new row is in no cached page until
+        # a cached row points at it; other saves matter if a shown field changed
+        before = getattr(kwargs['instance'], '_displayed_before', None)
+        if before is None or before == tuple(getattr(kwargs['instance'], field) for field in fields):
+            return
+    _invalidate(label)
+
+
+def invalidate_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate(_owners[sender])
+
+
+_owners = {}
+
+for label, m2m_fields in CACHED_MODELS.items():
+    model = apps.get_model(label)
+    post_save.connect(invalidate_model, sender=model, dispatch_uid=f'cache_invalidate_save_{label}')
+    post_delete.connect(invalidate_model, sender=model, dispatch_uid=f'cache_invalidate_delete_{label}')
+    if label in _DISPLAYED_FIELDS:
+        pre_save.connect(remember_displayed, sender=model, dispatch_uid=f'cache_remember_displayed_{label}')
+    for field in m2m_fields:
+        through = getattr(model, field).through
+        _owners[through] = label
+        m2m_changed.connect(invalidate_m2m, sender=through, dispatch_uid=f'cache_invalidate_m2m_{label}_{field}')
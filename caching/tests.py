@@ -0,0 +1,187 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clubs.models import Club
+from events.models import Event
+from feedback.models import Feedback
+from users.models import User
+
+from .versions import bump_version, cached, get_version
+
+
+class VersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_version(self):
+        before = get_version('events.Event')
+        self.assertEqual(get_version('events.Event'), before)
+        bump_version('events.Event')
+        self.assertNotEqual(get_version('events.Event'), before)
+
+    def test_cached_recomputes_after_save(self):
+        user = User.objects.create_user('author')
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return list(Feedback.objects.values_list('title', flat=True))
+
+        self.assertEqual(cached('titles', ['feedback.Feedback'], compute), [])
+        self.assertEqual(cached('titles', ['feedback.Feedback'], compute), [])
+        Feedback.objects.create(title='Broken tap', description='Hostel B', category='Hostel', user=user)
+        self.assertEqual(cached('titles', ['feedback.Feedback'], compute), ['Broken tap'])
+        self.assertEqual(len(calls), 2)
+
+    def test_login_does_not_invalidate_users(self):
+        user = User.objects.create_user('student', password='pw')
+        before = get_version('users.User')
+        self.client.login(username='student', password='pw')
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+        self.assertEqual(get_version('users.User'), before)
+
+
+class PageInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.organizer = User.objects.create_user('organizer', role='faculty')
+        start = timezone.now() + timedelta(days=1)
+        cls.event = Event.objects.create(
+            title='Robotics Workshop', description='Build a rover', location='CS Lab 1',
+            start_date=start, end_date=start + timedelta(hours=2), organizer=cls.organizer,
+        )
+        cls.club = Club.objects.create(name='Chess Club', description='Weekly games', president=cls.organizer)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def test_repeat_request_is_served_from_cache(self):
+        url = reverse('events:list')
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(url)
+        self.assertLess(len(warm), len(cold))
+
+    def test_event_edit_shows_immediately(self):
+        self.assertContains(self.client.get(reverse('events:list')), 'Robotics Workshop')
+        self.event.title = 'Drone Workshop'
+        self.event.save()
+        self.assertContains(self.client.get(reverse('events:list')), 'Drone Workshop')
+        self.assertContains(self.client.get(reverse('events:detail', args=[self.event.id])), 'Drone Workshop')
+
+    def test_attendance_updates_counts(self):
+        url = reverse('events:detail', args=[self.event.id])
+        self.assertContains(self.client.get(url), '0 people')
+        self.event.attendees.add(self.student)
+        response = self.client.get(url)
+        self.assertContains(response, '1 people')
+        self.assertContains(response, 'You are attending this event')
+
+    def test_reverse_membership_change_updates_club(self):
+        url = reverse('clubs:detail', args=[self.club.id])
+        self.assertContains(self.client.get(url), '0 people')
+        self.student.club_members.add(self.club)
+        self.assertContains(self.client.get(url), '1 people')
+
+    def test_username_change_updates_lists(self):
+        self.assertContains(self.client.get(reverse('clubs:list')), 'organizer')
+        self.organizer.username = 'prof_rao'
+        self.organizer.save()
+        self.assertContains(self.client.get(reverse('clubs:list')), 'prof_rao')
+
+    def test_deleted_event_is_gone(self):
+        url = reverse('events:detail', args=[self.event.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        Event.objects.filter(id=self.event.id).delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.other = User.objects.create_user('other', role='student')
+        cls.author = User.objects.create_user('author')
+        cls.feedback = Feedback.objects.create(title='Wifi', description='Slow', category='IT', user=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def test_unchanged_page_returns_304(self):
+        url = reverse('feedback:list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertFalse([q for q in queries if 'feedback_feedback' in q['sql']])
+
+    def test_edit_changes_etag(self):
+        url = reverse('feedback:list')
+        etag = self.client.get(url)['ETag']
+        self.feedback.title = 'Wifi down'
+        self.feedback.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Wifi down')
+
+    def test_etag_is_per_viewer(self):
+        url = reverse('feedback:list')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_membership_change_refreshes_club_detail(self):
+        club = Club.objects.create(name='Chess Club', description='Weekly games', president=self.author)
+        url = reverse('clubs:detail', args=[club.id])
+        etag = self.client.get(url)['ETag']
+        club.members.add(self.student)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_skip_conditional_response(self):
+        url = reverse('feedback:list')
+        etag = self.client.get(url)['ETag']
+        self.client.cookies['messages'] = 'pending'
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class UserInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', role='faculty')
+        start = timezone.now() + timedelta(days=1)
+        Event.objects.create(title='Robotics Workshop', description='Build a rover', location='CS Lab 1',
+                             start_date=start, end_date=start + timedelta(hours=2), organizer=cls.organizer)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_saves_that_change_no_shown_field_keep_pages(self):
+        before = get_version('users.User')
+        User.objects.create_user('newcomer')
+        self.organizer.department = 'Physics'
+        self.organizer.can_create_clubs = True
+        self.organizer.save()
+        self.assertEqual(get_version('users.User'), before)
+
+    def test_username_change_shows_immediately(self):
+        self.client.force_login(self.organizer)
+        self.assertContains(self.client.get(reverse('events:list')), 'organizer')
+        self.organizer.username = 'robotics_lead'
+        self.organizer.save(update_fields=['username'])
+        self.assertContains(self.client.get(reverse('events:list')), 'robotics_lead')
@@ -0,0 +1,96 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from smart_campus.routers import primary_reads
+
+# Models whose rows appear in cached pages, with the M2M fields whose
+# changes alter those pages (attendee and member counts)
+CACHED_MODELS = {
+    'events.Event': ['attendees'],
+    'clubs.Club': ['members'],
+    'lost_found.LostItem': [],
+    'feedback.Feedback': [],
+    'users.User': [],
+}
+
+_MISSING = object()
+
+
+def version_key(label):
+    return f'cache-version:{label.lower()}'
+
+
+def _new_token():
+    # Time of the change plus a random suffix: see get_versions
+    return f'{time.time_ns()}-{uuid.uuid4().hex[:12]}'
+
+
+def get_versions(*labels):
+    """
+    Current version token of each model label.
+
+    A token is random rather than a counter: if one is evicted, the
+    replacement can never equal an older token, so entries cached under an
+    old version are never read again. Its prefix records when it was
+    issued, which is when the model last changed (or later, after an
+    eviction).
+    """
+    keys = [version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            token = _new_token()
+            # add() keeps a token another process set first
+            cache.add(key, token, None)
+            versions[key] = cache.get(key) or token
+    return [versions[key] for key in keys]
+
+
+def get_version(*labels):
+    """The version tokens of `labels` joined into one string"""
+    return '.'.join(get_versions(*labels))
+
+
+def last_changed(*labels):
+    """When any of `labels` last changed, as an aware UTC datetime"""
+    issued = max(int(token.split('-')[0]) for token in get_versions(*labels))
+    return datetime.fromtimestamp(issued / 1e9, tz=timezone.utc)
+
+
+def bump_version(label):
+    """Invalidate every cache entry built from rows of `label`"""
+    cache.set(version_key(label), _new_token(), None)
+
+
+def page_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+
+
+def cache_key(name, *parts):
+    """A memcached-safe key for `name` varying on arbitrary (user supplied) parts"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'{name}:{digest}'
+
+
+def cached(key, depends_on, compute, timeout=None):
+    """
+    Return compute() through the cache, keyed on `key` and the versions of `depends_on`.
+
+    Saving or deleting a row of any model in `depends_on` changes its
+    version, so the next call recomputes instead of serving stale data.
+    compute() reads the primary, since a replica may not have the write
+    that produced the current version yet. Template fragments cached
+    alongside (the event cards) render only what compute() returned.
+    """
+    versioned = f'{key}:{get_version(*depends_on)}'
+    value = cache.get(versioned, _MISSING)
+    if value is _MISSING:
+        with primary_reads():
+            value = compute()
+        cache.set(versioned, value, page_timeout() if timeout is None else timeout)
+    return value
@@ -1,3 +1,59 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from smart_campus.testing import QueryScalingTestCase
+from users.models import User
+
+from .models import Club
+
+
+class ClubQueryCountTests(QueryScalingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.club = Club.objects.create(
+            name='Club 0', description='Description',
+            president=User.objects.create_user('president0', role='faculty'),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+        self.created = 1
+
+    def add_clubs(self, count):
+        for _ in range(count):
+            president = User.objects.create_user(f'president{self.created}', role='faculty')
+            club = Club.objects.create(name=f'Club {self.created}', description='Description', president=president)
+            club.members.add(president, self.student)
+            self.created += 1
+
+    def add_members(self, count):
+        start = self.club.members.count()
+        self.club.members.add(*[User.objects.create_user(f'member{start + i}') for i in range(count)])
+
+    def test_club_list(self):
+        self.assertConstantQueries(reverse('clubs:list'), self.add_clubs, 'clubs:list')
+
+    def test_club_detail(self):
+        url = reverse('clubs:detail', args=[self.club.id])
+        self.assertConstantQueries(url, self.add_members, 'clubs:detail')
+
+
+class JoinClubTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.club = Club.objects.create(name='Chess', description='Description',
+                                       president=User.objects.create_user('president', role='faculty'))
+
+    def test_join_and_leave_need_post(self):
+        self.client.force_login(self.student)
+        url = reverse('clubs:join', args=[self.club.id])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertFalse(self.club.members.filter(pk=self.student.pk).exists())
+        self.assertRedirects(self.client.post(url), reverse('clubs:detail', args=[self.club.id]),
+                             fetch_redirect_response=False)
+        self.assertTrue(self.club.members.filter(pk=self.student.pk).exists())
+        self.client.post(url)
+        self.assertFalse(self.club.members.filter(pk=self.student.pk).exists())
@@ -1,9 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count
+from django.http import Http404
+from django.views.decorators.http import require_POST
 from .models import Club
 from django import forms
 from users.decorators import faculty_or_admin_required
+from smart_campus.db import serialized_writes
+from caching.conditional import conditional_page
+from caching.versions import cached
+
+CLUB_CACHE_MODELS = ('clubs.Club', 'users.User')
 
 class ClubForm(forms.ModelForm):
     class Meta:
@@ -11,8 +19,17 @@ class ClubForm(forms.ModelForm):
         fields = ['name', 'description', 'logo']
 
 @login_required
+@conditional_page(*CLUB_CACHE_MODELS)
 def club_list(request):
-    clubs = Club.objects.all().order_by('name')
+    clubs = cached('clubs:list', CLUB_CACHE_MODELS, lambda: list(
+        Club.objects.select_related('president')
+        .annotate(num_members=Count('members'))
+        .order_by('name')
+    ))
+    # One query for every club the user belongs to instead of one per card
+    member_club_ids = set(request.user.club_members.values_list('id', flat=True))
+    for club in clubs:
+        club.is_member = club.id in member_club_ids
     return render(request, 'clubs/list.html', {'clubs': clubs})
 
 @login_required
@@ -37,11 +54,24 @@ def create_club(request):
     return render(request, 'clubs/form.html', {'form': form, 'title': 'Create Club'})
 
 @login_required
+@conditional_page(*CLUB_CACHE_MODELS)
 def club_detail(request, club_id):
-    club = get_object_or_404(Club, id=club_id)
-    return render(request, 'clubs/detail.html', {'club': club})
+    club = cached(f'clubs:detail:{club_id}', CLUB_CACHE_MODELS, lambda: (
+        Club.objects.select_related('president')
+        .annotate(num_members=Count('members'))
+        .filter(id=club_id)
+        .first()
+    ))
+    if club is None:
+        raise Http404('No Club matches the given query.')
+    return render(request, 'clubs/detail.html', {
+        'club': club,
+        'is_member': club.members.filter(id=request.user.id).exists(),
+    })
 
 @login_required
+@require_POST
+@serialized_writes()
 def join_club(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     if request.user in club.members.all():
@@ -0,0 +1,188 @@
+from collections import namedtuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from caching.versions import bump_version
+
+from .models import Event, EventOccurrence, WaitlistEntry
+
+Attendance = namedtuple('Attendance', ['attending', 'waitlisted', 'attendee_count'])
+
+
+def _has_seats(taking=1):
+    return Q(capacity__isnull=True) | Q(attendee_count__lte=F('capacity') - taking)
+
+
+def _claim_seats(event_id, count=1):
+    """
+    Take `count` seats with one conditional UPDATE; False when they are not free.
+
+    The capacity check and the increment are a single statement, so
+    concurrent RSVPs can never push attendee_count past capacity.
+    """
+    return bool(Event.objects.filter(_has_seats(count), pk=event_id).update(
+        attendee_count=F('attendee_count') + count,
+    ))
+
+
+def set_attendance(event_id, user_id, attending=None):
+    """
+    Add or remove one attendee and return an Attendance tuple.
+
+    With `attending` None the current state is flipped. Joining claims a seat
+    with a conditional UPDATE and writes the through row. If the event is
+    full the user is queued on the waitlist instead. Leaving frees the seat
+    and promotes the head of the waitlist. Raises Event.DoesNotExist for an
+    unknown event.
+    """
+    through = Event.attendees.through
+    rows = through.objects.filter(event_id=event_id, user_id=user_id)
+    waiting = WaitlistEntry.objects.filter(event_id=event_id, user_id=user_id)
+    changed = False
+    with transaction.atomic():
+        state = Event.objects.filter(pk=event_id).values_list(Exists(rows), Exists(waiting)).first()
+        if state is None:
+            raise Event.DoesNotExist('No Event matches the given query.')
+        is_attending, is_waitlisted = state
+        if attending is None:
+            attending = not (is_attending or is_waitlisted)
+
+        if attending and not (is_attending or is_waitlisted):
+            try:
+                with transaction.atomic():
+                    is_attending = _claim_seats(event_id)
+                    if is_attending:
+                        through.objects.create(event_id=event_id, user_id=user_id)
+                    else:
+                        WaitlistEntry.objects.create(event_id=event_id, user_id=user_id)
+                        is_waitlisted = True
+                changed = True
+            except IntegrityError:
+                # A double-submitted form got there first; the savepoint returned the seat
+                is_attending, is_waitlisted = rows.exists(), waiting.exists()
+        elif not attending and is_attending:
+            if rows.delete()[0]:
+                Event.objects.filter(pk=event_id).update(attendee_count=F('attendee_count') - 1)
+                promote_waitlist(event_id)
+                changed = True
+            is_attending = False
+        elif not attending and is_waitlisted:
+            changed = bool(waiting.delete()[0])
+            is_waitlisted = False
+
+        count = Event.objects.filter(pk=event_id).values_list('attendee_count', flat=True).get()
+    if changed:
+        # Neither the through-table write nor update() sends the signals caching listens to
+        transaction.on_commit(lambda: bump_version('events.Event'))
+    return Attendance(is_attending, is_waitlisted, count)
+
+
+def promote_waitlist(event_id):
+    """
+    Move waitlisted users into free seats in arrival order.
+
+    The free seats are claimed with one conditional UPDATE. The promoted
+    entries are moved in bulk and their notifications are written with one
+    bulk_create. If someone else takes the seats first, nothing is promoted;
+    the next departure runs this again. Returns the promoted user ids.
+    """
+    from users.models import Notification
+    from users.notifications import refresh_unread_counts
+
+    event = Event.objects.filter(pk=event_id).values('title', 'capacity', 'attendee_count').first()
+    if event is None:
+        return []
+    queue = WaitlistEntry.objects.filter(event_id=event_id).select_for_update(skip_locked=True)
+    if event['capacity'] is not None:
+        free = event['capacity'] - event['attendee_count']
+        if free <= 0:
+            return []
+        queue = queue[:free]
+    entries = list(queue.values_list('id', 'user_id'))
+    if not entries or not _claim_seats(event_id, len(entries)):
+        return []
+
+    user_ids = [user_id for _, user_id in entries]
+    WaitlistEntry.objects.filter(id__in=[entry_id for entry_id, _ in entries]).delete()
+    Event.attendees.through.objects.bulk_create([
+        Event.attendees.through(event_id=event_id, user_id=user_id) for user_id in user_ids
+    ])
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            title='You have a seat!',
+            message=f'A seat opened up at "{event["title"]}" and you have been moved off the waitlist.',
+            link=reverse('events:detail', args=[event_id]),
+        )
+        for user_id in user_ids
+    ])
+    # bulk_create skips post_save, so refresh the badge counters here
+    refresh_unread_counts(user_ids)
+    transaction.on_commit(lambda: bump_version('events.Event'))
+    return user_ids
+
+
+def refresh_attendee_counts(event_ids=None):
+    """
+    Recompute Event.attendee_count from the through table.
+
+    Used where attendees change without set_attendance: m2m add/remove/clear,
+    user deletion and bulk loads. Pass None to recount every event.
+    """
+    attendance = (
+        Event.attendees.through.objects.filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    events = Event.objects.all()
+    if event_ids is not None:
+        event_ids = set(event_ids)
+        if not event_ids:
+            return
+        events = events.filter(pk__in=event_ids)
+    events.update(attendee_count=Coalesce(Subquery(attendance), Value(0)))
+
+
+def set_occurrence_attendance(occurrence_id, user_id, attending=None):
+    """
+    Add or remove one attendee of a single occurrence of a recurring event.
+
+    Works like set_attendance with the series' capacity applied to each
+    occurrence, but a full occurrence has no waitlist: the user is simply
+    not added. Raises EventOccurrence.DoesNotExist for an unknown occurrence.
+    """
+    through = EventOccurrence.attendees.through
+    rows = through.objects.filter(eventoccurrence_id=occurrence_id, user_id=user_id)
+    occurrences = EventOccurrence.objects.filter(pk=occurrence_id)
+    changed = False
+    with transaction.atomic():
+        is_attending = occurrences.values_list(Exists(rows), flat=True).first()
+        if is_attending is None:
+            raise EventOccurrence.DoesNotExist('No EventOccurrence matches the given query.')
+        if attending is None:
+            attending = not is_attending
+
+        if attending and not is_attending:
+            has_seat = Q(event__capacity__isnull=True) | Q(attendee_count__lt=F('event__capacity'))
+            try:
+                with transaction.atomic():
+                    if occurrences.filter(has_seat).update(attendee_count=F('attendee_count') + 1):
+                        through.objects.create(eventoccurrence_id=occurrence_id, user_id=user_id)
+                        is_attending = changed = True
+            except IntegrityError:
+                is_attending = rows.exists()
+        elif not attending and is_attending:
+            if rows.delete()[0]:
+                occurrences.update(attendee_count=F('attendee_count') - 1)
+                changed = True
+            is_attending = False
+
+        count = occurrences.values_list('attendee_count', flat=True).get()
+    if changed:
+        transaction.on_commit(lambda: bump_version('events.Event'))
+    return Attendance(is_attending, False, count)
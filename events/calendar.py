@@ -0,0 +1,149 @@
+"""
+iCalendar (RFC 5545) feeds of events.
+
+Calendar clients poll a subscribed feed every few minutes and cannot log in,
+so feeds are addressed with a signed per-user token. Each feed is streamed
+from an .iterator() query, and its ETag is derived from one aggregate over
+the same rows: 304s cost a single indexed query and no rendering.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from .models import Event
+
+FEED_FIELDS = ('id', 'title', 'description', 'location', 'start_date', 'end_date', 'recurrence', 'updated_at')
+
+
+def calendar_token(user):
+    """Secret that lets a calendar client read `user`'s feeds without a session"""
+    return signing.Signer(salt='events.calendar').sign(str(user.pk))
+
+
+def token_user_id(token):
+    """The user id `token` was issued for, or None if it is not a valid token"""
+    try:
+        return int(signing.Signer(salt='events.calendar').unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def feed_events(user=None, club=None):
+    """
+    Events for one feed: attended by `user`, organized by `club`'s
+    president or members, or every event when both are None.
+
+    Events that ended more than EVENT_FEED_PAST_DAYS ago are left out so a
+    feed stays the same size however long the campus has been running.
+    """
+    past_days = getattr(settings, 'EVENT_FEED_PAST_DAYS', 180)
+    # last_end is the end of a series' final occurrence, and null while it repeats forever
+    cutoff = timezone.now() - timedelta(days=past_days)
+    events = Event.objects.filter(Q(last_end__gte=cutoff) | (Q(last_end__isnull=True) & ~Q(recurrence='')))
+    if user is not None:
+        events = events.filter(attendees=user)
+    if club is not None:
+        events = events.filter(Q(organizer_id=club.president_id) | Q(organizer__in=club.members.values('pk')))
+    return events
+
+
+def feed_etag(events):
+    """
+    ETag of a feed, from the newest updated_at of its events.
+
+    The count and id sum catch deletions and events entering or leaving the
+    feed (an RSVP or an old event dropping out), which touch no updated_at.
+    """
+    state = events.order_by().aggregate(newest=Max('updated_at'), count=Count('id'), ids=Sum('id'))
+    parts = [getattr(settings, 'ETAG_SALT', ''), state['newest'], state['count'], state['ids']]
+    return '"%s"' % hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest(), state['newest']
+
+
+def _escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace(
+        '\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Split a content line into CRLF-terminated pieces of at most 75 octets"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    pieces = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a UTF-8 sequence: back off continuation bytes
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _rrule(recurrence):
+    """The stored rule as an RRULE line; RFC 5545 wants UNTIL in UTC when DTSTART is"""
+    parts = recurrence.split(';')
+    for index, part in enumerate(parts):
+        if part.startswith('UNTIL='):
+            until = part[len('UNTIL='):]
+            local = datetime.strptime(until, '%Y%m%dT%H%M%S' if 'T' in until else '%Y%m%d')
+            parts[index] = f'UNTIL={_utc(timezone.make_aware(local))}'
+    return f'RRULE:{";".join(parts)}'
+
+
+def _moment(name, value, recurring):
+    """A DTSTART/DTEND line; a series repeats in local time, so it keeps its time zone across DST"""
+    zone = timezone.get_current_timezone_name()
+    if not recurring or zone == 'UTC':
+        return f'{name}:{_utc(value)}'
+    return f'{name};TZID={zone}:{timezone.localtime(value):%Y%m%dT%H%M%S}'
+
+
+def vevent(event, url, domain):
+    """The VEVENT lines of one event, given as a dict of FEED_FIELDS"""
+    # A series is one VEVENT with its rule, however many times it repeats
+    recurring = bool(event['recurrence'])
+    recurrence = [_rrule(event['recurrence'])] if recurring else []
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event["id"]}@{domain}',
+        f'DTSTAMP:{_utc(event["updated_at"])}',
+        f'LAST-MODIFIED:{_utc(event["updated_at"])}',
+        _moment('DTSTART', event['start_date'], recurring),
+        _moment('DTEND', max(event['end_date'], event['start_date']), recurring),
+        *recurrence,
+        f'SUMMARY:{_escape(event["title"])}',
+        f'LOCATION:{_escape(event["location"])}',
+        f'DESCRIPTION:{_escape(event["description"])}',
+        f'URL:{url}',
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def stream_calendar(events, name, build_url, domain):
+    """
+    Yield an iCalendar document for `events` piece by piece.
+
+    Rows are read with .iterator(), so memory use does not grow with the
+    size of the feed. build_url(event_id) returns the event's page.
+    """
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold('PRODID:-//KLH University//Smart Campus//EN')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold(f'X-WR-CALNAME:{_escape(name)}')
+    rows = events.order_by('start_date', 'id').values(*FEED_FIELDS)
+    for event in rows.iterator(chunk_size=500):
+        yield vevent(event, build_url(event['id']), domain)
+    yield _fold('END:VCALENDAR')
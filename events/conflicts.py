@@ -0,0 +1,287 @@
+import random
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils import timezone
+
+from .recurrence import expand, occurrences_between
+
+# Placeholder venues never conflict with each other
+UNSCHEDULED_LOCATIONS = {'', 'tbd', 'tba'}
+
+# Indexed end of a series that never ends
+FOREVER = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+def normalize_location(location):
+    """Canonical venue key: case, punctuation and spacing differences are ignored"""
+    return re.sub(r'[\W_]+', ' ', (location or '').casefold()).strip()
+
+
+class _Node:
+    __slots__ = ('key', 'end', 'max_end', 'priority', 'left', 'right')
+
+    def __init__(self, key, end):
+        self.key = key
+        self.end = end
+        self.max_end = end
+        self.priority = random.random()
+        self.left = self.right = None
+
+
+def _update(node):
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _split(node, key):
+    """Split a treap into the nodes with keys < key and those >= key"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """Join two treaps where every key in `left` sorts before every key in `right`"""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class IntervalTree:
+    """
+    Half-open [start, end) intervals in a treap keyed by (start, id).
+
+    Every node also stores the largest end in its subtree, so an overlap
+    query can skip any subtree that finishes before the query starts.
+    Insert and remove are O(log n) expected. overlapping() confirms a free
+    slot in O(log n) and costs about O(log n) more per overlapping interval.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def insert(self, start, end, ident):
+        left, right = _split(self.root, (start, ident))
+        self.root = _merge(_merge(left, _Node((start, ident), end)), right)
+        self.size += 1
+
+    def remove(self, start, ident):
+        left, rest = _split(self.root, (start, ident))
+        # (start, ident) < (start, ident, 0) < the next key, so this isolates exactly one node
+        middle, right = _split(rest, (start, ident, 0))
+        if middle is not None:
+            self.size -= 1
+        self.root = _merge(left, right)
+
+    def overlapping(self, start, end):
+        """Return [(start, end, id)] for intervals that overlap [start, end), ordered by start"""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= start:
+                continue
+            stack.append(node.left)
+            # Everything to the right starts at or after this node
+            if node.key[0] < end:
+                if node.end > start:
+                    found.append((node.key[0], node.end, node.key[1]))
+                stack.append(node.right)
+        found.sort()
+        return found
+
+
+class VenueIndex:
+    """
+    Per-venue interval trees over event times.
+
+    A recurring event is indexed over its whole series, from its first start
+    to last_end (or forever), so the index only narrows the candidates and
+    find_conflicts works out which occurrences actually overlap. The tree
+    therefore never needs the stored EventOccurrence rows, which change
+    without touching the event.
+
+    Kept up to date by events.signals in this process and by sync() for
+    writes made by other workers, in the same way as the lost and found
+    matcher. Events deleted by another worker linger until this process sees
+    them; find_conflicts re-checks every hit against the database.
+    """
+
+    def __init__(self):
+        self.trees = defaultdict(IntervalTree)
+        self.events = {}  # event id -> (venue key, start, end)
+        self.synced_at = None
+        self._lock = threading.Lock()
+
+    def _discard(self, event_id):
+        entry = self.events.pop(event_id, None)
+        if entry is not None:
+            key, start, _ = entry
+            self.trees[key].remove(start, event_id)
+
+    def update(self, event):
+        key = normalize_location(event.location)
+        with self._lock:
+            self._discard(event.id)
+            if key not in UNSCHEDULED_LOCATIONS and event.start_date and event.end_date:
+                end = (event.last_end or FOREVER) if event.recurrence else event.end_date
+                self.trees[key].insert(event.start_date, end, event.id)
+                self.events[event.id] = (key, event.start_date, end)
+
+    def remove(self, event_id):
+        with self._lock:
+            self._discard(event_id)
+
+    def sync(self):
+        """Apply events changed since the last sync, e.g. by other worker processes"""
+        from .models import Event
+
+        started = timezone.now()
+        changed = Event.objects.only('id', 'location', 'start_date', 'end_date', 'recurrence', 'last_end')
+        if self.synced_at is not None:
+            changed = changed.filter(updated_at__gte=self.synced_at)
+        for event in changed.iterator(chunk_size=2000):
+            self.update(event)
+        self.synced_at = started
+
+    def overlapping(self, location, start, end):
+        key = normalize_location(location)
+        if key in UNSCHEDULED_LOCATIONS or key not in self.trees:
+            return []
+        with self._lock:
+            return self.trees[key].overlapping(start, end)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_venue_index():
+    """Return the process-wide venue index, building it on first use and catching up with the database"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VenueIndex()
+        _index.sync()
+        return _index
+
+
+def use_venue_index():
+    """Whether conflicts come from the in-memory index or straight from SQL"""
+    return getattr(settings, 'EVENT_CONFLICT_INDEX', True)
+
+
+def find_conflicts(location, start, end, exclude_id=None):
+    """
+    Return the occurrences booked at the same venue for any part of [start, end).
+
+    These are events.recurrence.Occurrence tuples: single events, stored
+    occurrences of a series and, outside a series' stored span, occurrences
+    expanded from its rule.
+    """
+    from .models import Event
+
+    key = normalize_location(location)
+    if key in UNSCHEDULED_LOCATIONS or start is None or end is None:
+        return []
+    if use_venue_index():
+        ids = [event_id for _, _, event_id in get_venue_index().overlapping(location, start, end)]
+        bookings = Event.objects.filter(id__in=ids)
+    else:
+        bookings = Event.objects.all()
+    # The index hits are re-checked by occurrences_between, which also drops events another
+    # worker moved or deleted. Without the index the venue filter uses event_location_start_idx
+    bookings = bookings.filter(location_key=key)
+    if exclude_id is not None:
+        bookings = bookings.exclude(id=exclude_id)
+    return occurrences_between(start, end, events=bookings)
+
+
+def conflict_message(conflicts):
+    if not conflicts:
+        return ''
+    booked = ', '.join(
+        f'"{occurrence.event.title}" ({timezone.localtime(occurrence.start):%b %d %H:%M}'
+        f'-{timezone.localtime(occurrence.end):%H:%M})'
+        for occurrence in conflicts[:3]
+    )
+    more = f' and {len(conflicts) - 3} more' if len(conflicts) > 3 else ''
+    return f'{conflicts[0].event.location} is already booked at that time: {booked}{more}.'
+
+
+def warn_conflicts(request, event):
+    """
+    Flash a warning if `event` shares its venue and time with other events.
+
+    A series is checked occurrence by occurrence up to the end of its stored
+    span (RECURRENCE_HORIZON_DAYS), with one lookup for the whole span.
+    """
+    slots = expand(event, event.start_date, max(event.end_date, event.occurrences_until or event.end_date))
+    if not slots:
+        return []
+    own = IntervalTree()
+    for slot_start, slot_end in slots:
+        own.insert(slot_start, slot_end, 0)
+    conflicts = [
+        occurrence
+        for occurrence in find_conflicts(event.location, slots[0][0], slots[-1][1], exclude_id=event.id)
+        if own.overlapping(occurrence.start, occurrence.end)
+    ]
+    if conflicts:
+        messages.warning(request, conflict_message(conflicts))
+    return conflicts
+
+
+def day_window(day):
+    """Bookable hours of `day` in the current time zone"""
+    opens = getattr(settings, 'VENUE_DAY_START', time(8))
+    closes = getattr(settings, 'VENUE_DAY_END', time(22))
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(day, opens), tz),
+        timezone.make_aware(datetime.combine(day, closes), tz),
+    )
+
+
+def free_slots(location, start, end, min_duration=timedelta(minutes=30)):
+    """
+    Return (busy, free) for a venue between `start` and `end`.
+
+    `busy` lists the booked occurrences as (event id, start, end) and `free`
+    the gaps between them that are at least `min_duration` long as
+    (start, end), both clipped to the window.
+    """
+    busy = [
+        (occurrence.event.id, max(occurrence.start, start), min(occurrence.end, end))
+        for occurrence in find_conflicts(location, start, end)
+    ]
+    free = []
+    cursor = start
+    for _, busy_start, busy_end in busy:
+        if busy_start - cursor >= min_duration:
+            free.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if end - cursor >= min_duration:
+        free.append((cursor, end))
+    return busy, free
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from events.models import Event
+from events.recurrence import materialize
+
+
+class Command(BaseCommand):
+    help = 'Store the upcoming dates of recurring events up to RECURRENCE_HORIZON_DAYS ahead; run daily'
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        series = (
+            Event.objects.exclude(recurrence='')
+            .filter(Q(last_end__isnull=True) | Q(last_end__gt=now))
+            .only('id', 'start_date', 'end_date', 'recurrence', 'occurrences_from', 'occurrences_until')
+        )
+        created = 0
+        for event in series.iterator(chunk_size=500):
+            with transaction.atomic():
+                created += materialize(event)
+        self.stdout.write(f'Stored {created} occurrences')
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-17 20:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["start_date", "id"], name="event_start_date_id_idx"
+            ),
+        ),
+    ]
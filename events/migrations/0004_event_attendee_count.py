@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_attendee_count(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    attendance = (
+        Event.attendees.through.objects.filter(event=OuterRef("pk"))
+        .order_by()
+        .values("event")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Event.objects.update(attendee_count=Coalesce(Subquery(attendance), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0003_event_start_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="attendee_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_attendee_count, migrations.RunPython.noop),
+    ]
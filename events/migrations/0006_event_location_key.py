@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:20
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_location_key(apps, schema_editor):
+    # Same rule as events.conflicts.normalize_location at the time of writing
+    Event = apps.get_model("events", "Event")
+    events = list(Event.objects.only("id", "location"))
+    for event in events:
+        event.location_key = re.sub(r"[\W_]+", " ", (event.location or "").casefold()).strip()
+    Event.objects.bulk_update(events, ["location_key"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0005_event_capacity_waitlist"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="location_key",
+            field=models.CharField(default="", editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["location_key", "start_date"], name="event_location_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["updated_at"], name="event_updated_at_idx"),
+        ),
+        migrations.RunPython(backfill_location_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.6 on 2026-10-17 21:33
+
+import django.db.models.deletion
+import events.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_last_end(apps, schema_editor):
+    # Every existing event is a single occurrence
+    Event = apps.get_model("events", "Event")
+    Event.objects.update(last_end=models.F("end_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0006_event_location_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="last_end",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="occurrences_from",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="occurrences_until",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="recurrence",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="e.g. FREQ=WEEKLY;COUNT=12 or FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261231",
+                max_length=500,
+                validators=[events.models.validate_recurrence],
+            ),
+        ),
+        migrations.CreateModel(
+            name="EventOccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start_date", models.DateTimeField()),
+                ("end_date", models.DateTimeField()),
+                (
+                    "attendee_count",
+                    models.PositiveIntegerField(default=0, editable=False),
+                ),
+                (
+                    "attendees",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="attending_occurrences",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrences",
+                        to="events.event",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["start_date", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["start_date", "end_date"],
+                        name="occurrence_start_end_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("event", "start_date"),
+                        name="occurrence_event_start_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_last_end, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,106 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
+from .conflicts import normalize_location
+from .recurrence import describe_rule, normalize_rule, series_last_end
+
+
+def validate_recurrence(value):
+    try:
+        normalize_rule(value)
+    except ValueError as e:
+        raise ValidationError(str(e))
+
 
 class Event(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
     location = models.CharField(max_length=100)
+    # normalize_location(location), so venue lookups ignore spelling variations
+    location_key = models.CharField(max_length=100, editable=False, default='')
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     image = models.ImageField(upload_to='event_images', blank=True, null=True)
     organizer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='organized_events')
     attendees = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='attending_events', blank=True)
+    # Denormalized attendees.count(), maintained by events.attendance
+    attendee_count = models.PositiveIntegerField(default=0, editable=False)
+    # Seats available; further RSVPs join the waitlist. Blank means unlimited
+    capacity = models.PositiveIntegerField(blank=True, null=True)
+    # iCalendar RRULE for repeating events; the event's own times are the first occurrence
+    recurrence = models.CharField(max_length=500, blank=True, default='', validators=[validate_recurrence],
+                                  help_text='e.g. FREQ=WEEKLY;COUNT=12 or FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261231')
+    # End of the last occurrence (end_date unless recurring); null for series without an end
+    last_end = models.DateTimeField(null=True, editable=False)
+    # Span of this series stored as EventOccurrence rows, see events.recurrence
+    occurrences_from = models.DateTimeField(null=True, editable=False)
+    occurrences_until = models.DateTimeField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination in events.pagination
+            models.Index(fields=['start_date', 'id'], name='event_start_date_id_idx'),
+            # Venue conflict checks when the in-memory index is disabled
+            models.Index(fields=['location_key', 'start_date'], name='event_location_start_idx'),
+            # Lets events.conflicts.VenueIndex.sync() fetch only recent changes
+            models.Index(fields=['updated_at'], name='event_updated_at_idx'),
+        ]
+    
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.location_key = normalize_location(self.location)
+        self.recurrence = normalize_rule(self.recurrence)
+        self.last_end = series_last_end(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'location_key'}
+        if update_fields is not None and {'recurrence', 'start_date', 'end_date'} & set(update_fields):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'recurrence', 'last_end'}
+        super().save(*args, **kwargs)
+
+    def recurrence_description(self):
+        return describe_rule(self.recurrence)
+
+
+class WaitlistEntry(models.Model):
+    """A user queued for a seat at a full event, promoted in id (arrival) order"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlisted_events')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='waitlist_event_user_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} waiting for {self.event}'
+
+
+class EventOccurrence(models.Model):
+    """One stored date of a recurring event, materialized by events.recurrence"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='occurrences')
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    attendees = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='attending_occurrences', blank=True)
+    # Denormalized attendees.count(), maintained by events.attendance
+    attendee_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['start_date', 'id']
+        indexes = [
+            # Calendar range queries across all series
+            models.Index(fields=['start_date', 'end_date'], name='occurrence_start_end_idx'),
+        ]
+        constraints = [
+            # Also serves the per-series lookups by start
+            models.UniqueConstraint(fields=['event', 'start_date'], name='occurrence_event_start_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.event} on {self.start_date:%Y-%m-%d %H:%M}'
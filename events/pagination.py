@@ -0,0 +1,122 @@
+import base64
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+EVENTS_PAGE_SIZE = 12
+
+TIME_FILTERS = ('all', 'upcoming', 'past')
+
+
+def encode_cursor(event):
+    """Encode the (start_date, id) position of an event as an opaque cursor"""
+    raw = f'{event.start_date.isoformat()}|{event.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into (start_date, id), or None if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start, event_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        start_date = parse_datetime(start)
+        if start_date is None:
+            return None
+        return start_date, int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _parse_day(value, end_of_day=False):
+    """Start (or end) of the day in `value`, or None if it is missing or not a real date"""
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        # Well formed but impossible, e.g. 2025-02-30
+        return None
+    if day is None:
+        return None
+    moment = datetime.combine(day, time.max if end_of_day else time.min)
+    return timezone.make_aware(moment)
+
+
+def _series_running(moment):
+    """Recurring events with an occurrence ending at or after `moment`, judged by the stored series end"""
+    return ~Q(recurrence='') & (Q(last_end__isnull=True) | Q(last_end__gte=moment))
+
+
+def filter_events(queryset, params):
+    """
+    Apply the upcoming/past and date range filters from the query string.
+
+    A recurring event is one row sorted by its first occurrence. It counts as
+    upcoming until its series ends and matches a date range its series
+    overlaps; occurrences_between has the individual dates.
+
+    Returns the filtered queryset and a dict of the filters actually applied
+    so they can be echoed back into "load more" links.
+    """
+    when = params.get('when', 'all')
+    if when not in TIME_FILTERS:
+        when = 'all'
+
+    now = timezone.now()
+    if when == 'upcoming':
+        queryset = queryset.filter(Q(start_date__gte=now) | _series_running(now))
+    elif when == 'past':
+        queryset = queryset.filter(start_date__lt=now)
+
+    date_from = _parse_day(params.get('from'))
+    date_to = _parse_day(params.get('to'), end_of_day=True)
+    if date_from:
+        queryset = queryset.filter(Q(start_date__gte=date_from) | _series_running(date_from))
+    if date_to:
+        queryset = queryset.filter(start_date__lte=date_to)
+
+    filters = {'when': when}
+    if date_from:
+        filters['from'] = params.get('from')
+    if date_to:
+        filters['to'] = params.get('to')
+    return queryset, filters
+
+
+def paginate_events(queryset, cursor=None, ascending=False, page_size=EVENTS_PAGE_SIZE):
+    """
+    Keyset pagination over (start_date, id).
+
+    Instead of OFFSET, each page continues strictly after the last row of the
+    previous one, so the database seeks straight to the cursor on the
+    (start_date, id) index no matter how deep into the archive we are.
+    Returns (events, next_cursor); next_cursor is None on the last page.
+    """
+    if ascending:
+        queryset = queryset.order_by('start_date', 'id')
+    else:
+        queryset = queryset.order_by('-start_date', '-id')
+
+    position = decode_cursor(cursor)
+    if position:
+        start_date, event_id = position
+        if ascending:
+            queryset = queryset.filter(
+                Q(start_date__gt=start_date) | Q(start_date=start_date, id__gt=event_id)
+            )
+        else:
+            queryset = queryset.filter(
+                Q(start_date__lt=start_date) | Q(start_date=start_date, id__lt=event_id)
+            )
+
+    # Fetch one extra row to find out whether another page exists
+    events = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(events) > page_size:
+        events = events[:page_size]
+        next_cursor = encode_cursor(events[-1])
+    return events, next_cursor
@@ -0,0 +1,278 @@
+"""
+Recurring events.
+
+A series is one Event whose `recurrence` holds an iCalendar RRULE. Its first
+occurrence is the event's own start and end. Occurrences are expanded with
+dateutil only for the window a caller asks about, starting near that window
+rather than at the first occurrence, so the cost does not grow with the age
+or length of the series.
+
+Upcoming occurrences, up to RECURRENCE_HORIZON_DAYS ahead and at most
+RECURRENCE_MAX_MATERIALIZED per series, are also stored as EventOccurrence
+rows. They make range queries index lookups and hold attendance per
+occurrence. The stored span of each series is [occurrences_from,
+occurrences_until); anything outside it is expanded on the fly and never
+written by a read.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from dateutil.parser import isoparse
+from dateutil.rrule import rrulestr
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from caching.versions import bump_version
+
+Occurrence = namedtuple('Occurrence', ['event', 'start', 'end', 'id', 'attendee_count'])
+
+FREQUENCIES = {'DAILY': 'day', 'WEEKLY': 'week', 'MONTHLY': 'month', 'YEARLY': 'year'}
+# Sub-daily parts are left out: occurrences always keep the event's own time of day
+RULE_PARTS = ('FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY', 'BYMONTHDAY', 'BYYEARDAY', 'BYWEEKNO',
+              'BYMONTH', 'BYSETPOS', 'WKST')
+UNTIL_FORMAT = '%Y%m%dT%H%M%S'
+
+
+def _rule_parts(recurrence):
+    parts = {}
+    for part in recurrence.split(';'):
+        name, _, value = part.partition('=')
+        if part and (name not in RULE_PARTS or not value):
+            raise ValueError(f'Unsupported recurrence part "{part}".')
+        if part:
+            parts[name] = value
+    return parts
+
+
+def normalize_rule(recurrence):
+    """
+    Validate an RRULE and return it in stored form, or '' for no recurrence.
+
+    The form is upper case with no "RRULE:" prefix. A UTC UNTIL is converted
+    to local time, because occurrences are computed in local time. Raises
+    ValueError with a readable message.
+    """
+    text = (recurrence or '').strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if not text:
+        return ''
+    if '\n' in text or '\r' in text:
+        raise ValueError('Enter a single RRULE line.')
+    parts = _rule_parts(text)
+    if parts.get('FREQ') not in FREQUENCIES:
+        raise ValueError('FREQ must be DAILY, WEEKLY, MONTHLY or YEARLY.')
+    if 'COUNT' in parts and 'UNTIL' in parts:
+        raise ValueError('Use either COUNT or UNTIL, not both.')
+    if parts.get('UNTIL', '').endswith('Z'):
+        parts['UNTIL'] = timezone.localtime(isoparse(parts['UNTIL'])).strftime(UNTIL_FORMAT)
+    text = ';'.join(f'{name}={parts[name]}' for name in RULE_PARTS if name in parts)
+    try:
+        rrulestr(text, dtstart=datetime(2000, 1, 1))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid recurrence rule: {e}.')
+    return text
+
+
+def _naive(value):
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def _aware(value):
+    return timezone.make_aware(value)
+
+
+def _rule(event, not_before=None):
+    """
+    The event's rule in naive local time, rebased close to `not_before`.
+
+    dateutil iterates from DTSTART, so a ten-year-old daily series would walk
+    3,650 dates to reach today. Without COUNT, a DAILY or WEEKLY rule repeats
+    every INTERVAL days or weeks. Moving DTSTART forward by whole periods
+    therefore leaves the set of dates unchanged from that point on.
+    """
+    parts = _rule_parts(event.recurrence)
+    dtstart = _naive(event.start_date)
+    if not_before is not None and 'COUNT' not in parts and parts['FREQ'] in ('DAILY', 'WEEKLY'):
+        period = timedelta(days=int(parts.get('INTERVAL', 1)) * (7 if parts['FREQ'] == 'WEEKLY' else 1))
+        periods = (_naive(not_before) - dtstart) // period - 1
+        if periods > 0:
+            dtstart += periods * period
+    return rrulestr(event.recurrence, dtstart=dtstart)
+
+
+def series_last_end(event):
+    """End of the final occurrence: end_date for single events, None for endless series"""
+    if not event.recurrence:
+        return event.end_date
+    parts = _rule_parts(event.recurrence)
+    if 'COUNT' not in parts and 'UNTIL' not in parts:
+        return None
+    if 'UNTIL' in parts:
+        until = isoparse(parts['UNTIL'])
+        last = _rule(event, not_before=_aware(until)).before(until, inc=True)
+    else:
+        last = _rule(event)[-1]
+    last = _aware(last) if last else event.start_date
+    return last + (event.end_date - event.start_date)
+
+
+def expand(event, start, end, limit=None):
+    """(start, end) of the occurrences of `event` overlapping [start, end), in order"""
+    duration = event.end_date - event.start_date
+    if not event.recurrence:
+        return [(event.start_date, event.end_date)] if event.start_date < end and event.end_date > start else []
+    rule = _rule(event, not_before=start - duration)
+    found = []
+    for moment in rule.xafter(_naive(start - duration), inc=True):
+        occurrence_start = _aware(moment)
+        if occurrence_start >= end or (limit is not None and len(found) >= limit):
+            break
+        if occurrence_start + duration > start:
+            found.append((occurrence_start, occurrence_start + duration))
+    return found
+
+
+def _max_materialized():
+    return getattr(settings, 'RECURRENCE_MAX_MATERIALIZED', 500)
+
+
+def materialize(event, until=None):
+    """
+    Store the occurrences of a series up to `until` and at most the horizon.
+
+    Extends [occurrences_from, occurrences_until) forward from where it
+    stopped. Occurrences already stored, and their attendance, are kept.
+    Returns the number of rows created.
+    """
+    from .models import Event, EventOccurrence
+
+    if not event.recurrence:
+        return 0
+    now = timezone.now()
+    horizon = now + timedelta(days=getattr(settings, 'RECURRENCE_HORIZON_DAYS', 180))
+    until = min(until or horizon, horizon)
+    begin = event.occurrences_until or max(event.start_date, now - (event.end_date - event.start_date))
+    if begin >= until:
+        return 0
+    limit = _max_materialized()
+    slots = [slot for slot in expand(event, begin, until, limit=limit + 1) if slot[0] >= begin]
+    if len(slots) > limit:
+        # Stop just after the last stored start so the next run carries on from there
+        slots = slots[:limit]
+        until = slots[-1][0] + timedelta(microseconds=1)
+    EventOccurrence.objects.bulk_create(
+        [EventOccurrence(event_id=event.id, start_date=start, end_date=end) for start, end in slots],
+        ignore_conflicts=True,
+    )
+    if event.occurrences_until is None or event.occurrences_from is None:
+        event.occurrences_from = begin
+    else:
+        event.occurrences_from = min(event.occurrences_from, begin)
+    event.occurrences_until = until
+    # update() leaves updated_at and the post_save handlers alone
+    Event.objects.filter(pk=event.pk).update(occurrences_from=event.occurrences_from, occurrences_until=until)
+    if slots:
+        transaction.on_commit(lambda: bump_version('events.Event'))
+    return len(slots)
+
+
+def sync_occurrences(event):
+    """
+    Bring stored occurrences in line with a saved event's rule and times.
+
+    Past occurrences stay as a record of who attended. Upcoming ones that
+    still fit the rule keep their attendance. The rest are deleted and any
+    missing ones created.
+    """
+    from .models import Event, EventOccurrence
+
+    if not event.recurrence and event.occurrences_until is None:
+        return
+    now = timezone.now()
+    upcoming = EventOccurrence.objects.filter(event_id=event.id, start_date__gte=now)
+    if not event.recurrence:
+        upcoming.delete()
+        event.occurrences_from = event.occurrences_until = None
+        Event.objects.filter(pk=event.pk).update(occurrences_from=None, occurrences_until=None)
+        transaction.on_commit(lambda: bump_version('events.Event'))
+        return
+    if event.occurrences_until is not None and event.occurrences_until > now:
+        expected = {start: end for start, end in expand(event, now, event.occurrences_until) if start >= now}
+        stale = [
+            occurrence_id for occurrence_id, start, end in upcoming.values_list('id', 'start_date', 'end_date')
+            if expected.get(start) != end
+        ]
+        if stale:
+            EventOccurrence.objects.filter(id__in=stale).delete()
+        # Re-create anything the rule now adds inside the stored span
+        event.occurrences_until = now
+    materialize(event)
+
+
+def occurrences_between(start, end, events=None):
+    """
+    Every occurrence of `events` (default: all) overlapping [start, end), by start time.
+
+    Single events count as one occurrence. Stored occurrences are read with
+    one indexed range query; windows outside a series' stored span are
+    expanded lazily, at most RECURRENCE_MAX_MATERIALIZED per series. Only the
+    series overlapping the window are loaded, so endless series cost no
+    more than any other.
+    """
+    from .models import Event, EventOccurrence
+
+    events = Event.objects.all() if events is None else events
+    found = [
+        Occurrence(event, event.start_date, event.end_date, None, event.attendee_count)
+        for event in events.filter(recurrence='', start_date__lt=end, end_date__gt=start).select_related('organizer')
+    ]
+    series = list(
+        events.exclude(recurrence='').filter(start_date__lt=end)
+        .filter(Q(last_end__isnull=True) | Q(last_end__gt=start))
+        .select_related('organizer')
+    )
+    by_id = {event.id: event for event in series}
+    stored = EventOccurrence.objects.filter(
+        event_id__in=by_id, start_date__lt=end, end_date__gt=start,
+    ).values_list('id', 'event_id', 'start_date', 'end_date', 'attendee_count')
+    for occurrence_id, event_id, occurrence_start, occurrence_end, count in stored:
+        event = by_id[event_id]
+        # Rows outside the stored span are left behind by an earlier rule and would be duplicated
+        if event.occurrences_until is not None and event.occurrences_from <= occurrence_start < event.occurrences_until:
+            found.append(Occurrence(event, occurrence_start, occurrence_end, occurrence_id, count))
+    for event in series:
+        gaps = [(start, end)]
+        if event.occurrences_until is not None:
+            gaps = [(start, min(end, event.occurrences_from)), (max(start, event.occurrences_until), end)]
+        for gap_start, gap_end in gaps:
+            if gap_start >= gap_end:
+                continue
+            for occurrence_start, occurrence_end in expand(event, gap_start, gap_end, limit=_max_materialized()):
+                # An occurrence straddling the edge of the stored span is already in `stored`
+                if event.occurrences_until is None or not (
+                    event.occurrences_from <= occurrence_start < event.occurrences_until
+                ):
+                    found.append(Occurrence(event, occurrence_start, occurrence_end, None, 0))
+    found.sort(key=lambda occurrence: (occurrence.start, occurrence.event.id))
+    return found
+
+
+def describe_rule(recurrence):
+    """A short English summary of a stored RRULE, e.g. "Repeats every 2 weeks, 10 times\""""
+    if not recurrence:
+        return ''
+    parts = _rule_parts(recurrence)
+    unit = FREQUENCIES[parts['FREQ']]
+    interval = int(parts.get('INTERVAL', 1))
+    text = f'Repeats every {interval} {unit}s' if interval > 1 else f'Repeats every {unit}'
+    if 'BYDAY' in parts:
+        text += f' on {parts["BYDAY"].replace(",", ", ")}'
+    if 'COUNT' in parts:
+        text += f', {parts["COUNT"]} times'
+    elif 'UNTIL' in parts:
+        until = parts['UNTIL']
+        text += f' until {until[:4]}-{until[4:6]}-{until[6:8]}'
+    return text
@@ -0,0 +1,182 @@
+"""
+Batch scheduling of pending event requests.
+
+Every pending event_creation PermissionRequest gets a few candidate slots:
+the requested venue and time, the same venue shifted by up to
+SCHEDULER_TIME_SHIFTS hours, and the same times in other venues. A 0/1
+program then picks at most one slot per request. It maximises the number of
+requests scheduled first and the closeness to what was asked for second.
+No venue holds two overlapping events, and nothing overlaps an event that
+is already published, including any occurrence of a recurring one.
+"""
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+import pulp
+from django.conf import settings
+
+from .conflicts import IntervalTree, UNSCHEDULED_LOCATIONS, day_window, normalize_location
+from .models import Event
+from .recurrence import occurrences_between
+
+Slot = namedtuple('Slot', ['request', 'location', 'start', 'end', 'cost'])
+Schedule = namedtuple('Schedule', ['assignments', 'unscheduled', 'status', 'seconds'])
+
+# Scheduling every request always beats making one request fit better
+SCHEDULED_REWARD = 1000
+VENUE_CHANGE_COST = 4
+SHIFT_COST_PER_HOUR = 1
+
+
+def scheduler_settings():
+    return {
+        'shifts': getattr(settings, 'SCHEDULER_TIME_SHIFTS', [0, -1, 1, -2, 2]),
+        'venues': getattr(settings, 'SCHEDULER_VENUES', None),
+        'time_limit': getattr(settings, 'SCHEDULER_TIME_LIMIT', 20),
+    }
+
+
+def pending_event_requests():
+    from users.models import PermissionRequest
+
+    return list(
+        PermissionRequest.objects.filter(
+            status='pending', permission_type='event_creation',
+            event_title__isnull=False, event_start_date__isnull=False,
+        ).exclude(event_title='').select_related('user').order_by('created_at', 'id')
+    )
+
+
+def known_venues():
+    """SCHEDULER_VENUES, or one spelling of every venue events have used"""
+    venues = scheduler_settings()['venues']
+    if venues is None:
+        venues = Event.objects.order_by().values_list('location', flat=True).distinct()
+    by_key = {}
+    for venue in venues:
+        key = normalize_location(venue)
+        if key not in UNSCHEDULED_LOCATIONS:
+            by_key.setdefault(key, venue)
+    return by_key
+
+
+def _requested_times(permission_request):
+    start = permission_request.event_start_date
+    end = permission_request.event_end_date
+    if end is None or end <= start:
+        end = start + timedelta(hours=1)
+    return start, end
+
+
+def _booked_trees(window_start, window_end):
+    """Interval trees of the published occurrences at each venue inside the scheduling window"""
+    trees = defaultdict(IntervalTree)
+    for occurrence in occurrences_between(window_start, window_end):
+        trees[occurrence.event.location_key].insert(occurrence.start, occurrence.end, occurrence.event.id)
+    return trees
+
+
+def candidate_slots(requests, venues, shifts):
+    """Slots each request could take without touching an already published event"""
+    if not requests:
+        return []
+    times = [_requested_times(permission_request) for permission_request in requests]
+    furthest = timedelta(hours=max(abs(shift) for shift in shifts))
+    trees = _booked_trees(min(start for start, _ in times) - furthest, max(end for _, end in times) + furthest)
+
+    slots = []
+    for permission_request, (start, end) in zip(requests, times):
+        requested_key = normalize_location(permission_request.event_location)
+        opens, closes = day_window(start.date())
+        for shift in shifts:
+            offset = timedelta(hours=shift)
+            # Only the requested time itself may fall outside the bookable hours
+            if shift and (start + offset < opens or end + offset > closes):
+                continue
+            for key, venue in venues.items():
+                if trees[key].overlapping(start + offset, end + offset):
+                    continue
+                moved = requested_key not in UNSCHEDULED_LOCATIONS and key != requested_key
+                cost = abs(shift) * SHIFT_COST_PER_HOUR + (VENUE_CHANGE_COST if moved else 0)
+                slots.append(Slot(permission_request, venue, start + offset, end + offset, cost))
+    return slots
+
+
+def _overlap_groups(slots):
+    """
+    Maximal sets of slots at one venue that all overlap one another.
+
+    Intervals that overlap pairwise share a point, so "at most one per group"
+    is exactly "no two overlap" with about one constraint per slot rather
+    than one per pair. A sweep over start times finds the groups: the set of
+    running slots is maximal just before one of them ends.
+    """
+    by_venue = defaultdict(list)
+    for index, slot in enumerate(slots):
+        by_venue[normalize_location(slot.location)].append(index)
+    for indices in by_venue.values():
+        indices.sort(key=lambda index: slots[index].start)
+        active = []
+        grown = False
+        for index in indices:
+            start = slots[index].start
+            running = [other for other in active if slots[other].end > start]
+            if grown and len(running) < len(active):
+                yield active
+            grown = True
+            active = running + [index]
+        if grown:
+            yield active
+
+
+def propose_schedule(requests=None, venues=None, time_limit=None):
+    """
+    Solve the batch with CBC and return a Schedule.
+
+    `assignments` maps each scheduled request to its Slot; `unscheduled`
+    lists the requests that do not fit. With a time limit CBC returns the
+    best schedule found so far; `status` is then 'Feasible' rather than
+    'Optimal'.
+    """
+    options = scheduler_settings()
+    requests = pending_event_requests() if requests is None else requests
+    venues = known_venues() if venues is None else dict(venues)
+    for permission_request in requests:
+        key = normalize_location(permission_request.event_location)
+        if key not in UNSCHEDULED_LOCATIONS:
+            venues.setdefault(key, permission_request.event_location)
+
+    started = time.perf_counter()
+    slots = candidate_slots(requests, venues, options['shifts'])
+    if not slots:
+        return Schedule({}, list(requests), 'Optimal', time.perf_counter() - started)
+
+    problem = pulp.LpProblem('event_schedule', pulp.LpMaximize)
+    choose = [pulp.LpVariable(f'slot_{index}', cat=pulp.LpBinary) for index in range(len(slots))]
+    # Expressions built from (variable, coefficient) pairs skip lpSum's per-term arithmetic
+    problem += pulp.LpAffineExpression(
+        [(choose[index], SCHEDULED_REWARD - slot.cost) for index, slot in enumerate(slots)]
+    )
+    by_request = defaultdict(list)
+    for index, slot in enumerate(slots):
+        by_request[slot.request.id].append(index)
+    for request_id, indices in by_request.items():
+        problem += pulp.LpAffineExpression([(choose[index], 1) for index in indices]) <= 1, f'one_slot_{request_id}'
+    for number, group in enumerate(_overlap_groups(slots)):
+        # A group holding one request's slots only is already covered by one_slot
+        if len({slots[index].request.id for index in group}) > 1:
+            problem += pulp.LpAffineExpression([(choose[index], 1) for index in group]) <= 1, f'venue_{number}'
+
+    solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit or options['time_limit'])
+    problem.solve(solver)
+    status = {pulp.LpSolutionOptimal: 'Optimal', pulp.LpSolutionIntegerFeasible: 'Feasible'}.get(
+        problem.sol_status, pulp.LpStatus[problem.status],
+    )
+
+    assignments = {}
+    for index, slot in enumerate(slots):
+        if choose[index].varValue is not None and choose[index].varValue > 0.5:
+            assignments[slot.request.id] = slot
+    unscheduled = [permission_request for permission_request in requests if permission_request.id not in assignments]
+    return Schedule(assignments, unscheduled, status, time.perf_counter() - started)
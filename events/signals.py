@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .attendance import promote_waitlist, refresh_attendee_counts
+from .conflicts import get_venue_index
+from .recurrence import sync_occurrences
+from .models import Event
+
+
+@receiver(m2m_changed, sender=Event.attendees.through)
+def update_attendee_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Event.attendee_count in sync with attendees.add/remove/clear, from either side"""
+    if reverse and action == 'pre_clear':
+        instance._cleared_event_ids = list(instance.attending_events.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        event_ids = [instance.pk]
+    elif action == 'post_clear':
+        event_ids = instance.__dict__.pop('_cleared_event_ids', [])
+    else:
+        event_ids = pk_set
+    _recount(event_ids, promote=action != 'post_add')
+
+
+def _recount(event_ids, promote):
+    refresh_attendee_counts(event_ids)
+    if promote:
+        for event_id in event_ids:
+            promote_waitlist(event_id)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remember_attended_events(sender, instance, **kwargs):
+    # The cascade removes attendance rows without sending m2m_changed
+    instance._attended_event_ids = list(instance.attending_events.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def release_attendance(sender, instance, **kwargs):
+    _recount(instance.__dict__.pop('_attended_event_ids', []), promote=True)
+
+
+@receiver(post_save, sender=Event)
+def update_venue_index(sender, instance, raw=False, **kwargs):
+    """Keep this process's venue index in step with event times and locations"""
+    if raw:
+        return
+    get_venue_index().update(instance)
+
+
+@receiver(post_save, sender=Event)
+def update_occurrences(sender, instance, raw=False, **kwargs):
+    """Store the upcoming dates of a series and drop those its new rule or times no longer produce"""
+    if raw:
+        return
+    sync_occurrences(instance)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_venue_index(sender, instance, **kwargs):
+    get_venue_index().remove(instance.id)
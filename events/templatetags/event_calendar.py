@@ -0,0 +1,15 @@
+from django import template
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from events.calendar import calendar_token
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def calendar_feed_url(context, view_name, *args):
+    """Absolute subscription URL of a calendar feed, signed for the current user"""
+    request = context['request']
+    url = reverse(view_name, args=args)
+    return request.build_absolute_uri(f'{url}?{urlencode({"token": calendar_token(request.user)})}')
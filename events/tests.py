@@ -1,3 +1,615 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clubs.models import Club
+from smart_campus.testing import QueryScalingTestCase
+from users.models import Notification, PermissionRequest, User
+
+from . import calendar, conflicts, recurrence, scheduling
+from .attendance import Attendance, set_attendance, set_occurrence_attendance
+from .models import Event, WaitlistEntry
+from .recurrence import occurrences_between
+from .views import EventForm
+
+
+class EventQueryCountTests(QueryScalingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.event = cls.make_event()
+
+    @classmethod
+    def make_event(cls, index=0):
+        organizer = User.objects.create_user(f'organizer{index}', role='faculty')
+        start = timezone.now() + timedelta(days=index + 1)
+        return Event.objects.create(
+            title=f'Event {index}', description='Description', location='Main Auditorium',
+            start_date=start, end_date=start + timedelta(hours=2), organizer=organizer,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+        self.created = 1
+
+    def add_events(self, count):
+        for _ in range(count):
+            event = self.make_event(self.created)
+            event.attendees.add(self.student)
+            self.created += 1
+
+    def add_attendees(self, count):
+        start = self.event.attendees.count()
+        users = [User.objects.create_user(f'attendee{start + i}') for i in range(count)]
+        self.event.attendees.add(*users)
+
+    def test_event_list(self):
+        self.assertConstantQueries(reverse('events:list'), self.add_events, 'events:list')
+
+    def test_event_feed(self):
+        self.assertConstantQueries(reverse('events:feed'), self.add_events, 'events:feed')
+
+    def test_impossible_dates_are_ignored(self):
+        for params in ({'from': '2025-02-30'}, {'to': '2025-13-01'}):
+            response = self.client.get(reverse('events:list'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['filters'], {'when': 'all'})
+        response = self.client.get(reverse('events:feed'), {'from': '2025-02-30'})
+        self.assertEqual(response.json()['results'][0]['url'], reverse('events:detail', args=[self.event.id]))
+
+    def test_event_detail(self):
+        url = reverse('events:detail', args=[self.event.id])
+        self.assertConstantQueries(url, self.add_attendees, 'events:detail')
+
+
+class AttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.event = EventQueryCountTests.make_event()
+
+    def setUp(self):
+        self.client.force_login(self.student)
+        self.url = reverse('events:attend', args=[self.event.id])
+
+    def attendee_count(self):
+        self.event.refresh_from_db()
+        return self.event.attendee_count
+
+    def test_toggle_returns_json_for_ajax(self):
+        response = self.client.post(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'attending': True, 'waitlisted': False, 'attendee_count': 1})
+        self.assertTrue(self.event.attendees.filter(id=self.student.id).exists())
+        response = self.client.post(self.url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'attending': False, 'waitlisted': False, 'attendee_count': 0})
+
+    def test_form_post_redirects(self):
+        response = self.client.post(self.url)
+        self.assertRedirects(response, reverse('events:detail', args=[self.event.id]))
+        self.assertEqual(self.attendee_count(), 1)
+
+    def test_get_is_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_unknown_event(self):
+        url = reverse('events:attend', args=[self.event.id + 1000])
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.assertFalse(Event.attendees.through.objects.exists())
+
+    def test_repeated_set_is_idempotent(self):
+        for _ in range(2):
+            self.assertEqual(set_attendance(self.event.id, self.student.id, True), Attendance(True, False, 1))
+        for _ in range(2):
+            self.assertEqual(set_attendance(self.event.id, self.student.id, False), Attendance(False, False, 0))
+
+    def test_toggle_does_not_load_attendees(self):
+        self.event.attendees.add(*[User.objects.create_user(f'attendee{i}') for i in range(20)])
+        with CaptureQueriesContext(connection) as queries:
+            set_attendance(self.event.id, self.student.id)
+        statements = [q['sql'] for q in queries if not q['sql'].startswith(('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE'))]
+        # EXISTS, conditional UPDATE ... + 1, INSERT, SELECT attendee_count
+        self.assertEqual(len(statements), 4, statements)
+        self.assertFalse([sql for sql in statements if 'users_user' in sql])
+        self.assertEqual(self.attendee_count(), 21)
+
+    def test_count_follows_other_writes(self):
+        other = User.objects.create_user('other')
+        self.event.attendees.add(self.student, other)
+        self.assertEqual(self.attendee_count(), 2)
+        self.event.attendees.remove(self.student)
+        self.assertEqual(self.attendee_count(), 1)
+        self.student.attending_events.add(self.event)
+        self.assertEqual(self.attendee_count(), 2)
+        self.student.attending_events.clear()
+        self.assertEqual(self.attendee_count(), 1)
+        other.delete()
+        self.assertEqual(self.attendee_count(), 0)
+
+
+class WaitlistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = EventQueryCountTests.make_event()
+        cls.event.capacity = 2
+        cls.event.save()
+        cls.users = [User.objects.create_user(f'student{i}') for i in range(5)]
+
+    def join(self, user):
+        return set_attendance(self.event.id, user.id, True)
+
+    def test_full_event_waitlists(self):
+        self.assertEqual(self.join(self.users[0]), Attendance(True, False, 1))
+        self.assertEqual(self.join(self.users[1]), Attendance(True, False, 2))
+        self.assertEqual(self.join(self.users[2]), Attendance(False, True, 2))
+        self.assertEqual(self.join(self.users[2]), Attendance(False, True, 2))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendees.count(), 2)
+        self.assertEqual(WaitlistEntry.objects.count(), 1)
+
+    def test_departure_promotes_in_arrival_order(self):
+        for user in self.users:
+            self.join(user)
+        set_attendance(self.event.id, self.users[0].id, False)
+        self.assertEqual(
+            set(self.event.attendees.values_list('id', flat=True)), {self.users[1].id, self.users[2].id},
+        )
+        self.assertEqual(list(WaitlistEntry.objects.values_list('user_id', flat=True)),
+                         [self.users[3].id, self.users[4].id])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.users[2])
+        self.users[2].refresh_from_db()
+        self.assertEqual(self.users[2].unread_count, 1)
+
+    def test_leaving_waitlist(self):
+        for user in self.users[:3]:
+            self.join(user)
+        self.assertEqual(set_attendance(self.event.id, self.users[2].id), Attendance(False, False, 2))
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_raising_capacity_promotes_in_one_batch(self):
+        for user in self.users:
+            self.join(user)
+        self.client.force_login(self.event.organizer)
+        event = self.event
+        response = self.client.post(reverse('events:edit', args=[event.id]), {
+            'title': event.title, 'description': event.description, 'location': event.location,
+            'start_date': event.start_date.strftime('%Y-%m-%dT%H:%M'),
+            'end_date': event.end_date.strftime('%Y-%m-%dT%H:%M'), 'capacity': 10,
+        })
+        self.assertEqual(response.status_code, 302)
+        event.refresh_from_db()
+        self.assertEqual(event.attendee_count, 5)
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_removing_attendee_elsewhere_promotes(self):
+        for user in self.users[:3]:
+            self.join(user)
+        self.users[0].delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 2)
+        self.assertTrue(self.event.attendees.filter(id=self.users[2].id).exists())
+
+    def test_detail_shows_waitlist(self):
+        for user in self.users[:3]:
+            self.join(user)
+        self.client.force_login(self.users[2])
+        response = self.client.get(reverse('events:detail', args=[self.event.id]))
+        self.assertContains(response, 'You are on the waitlist')
+        self.assertContains(response, '1 on the waitlist')
+        self.client.force_login(self.users[3])
+        self.assertContains(self.client.get(reverse('events:detail', args=[self.event.id])), 'Join Waitlist')
+
+
+class VenueConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+        cls.day = timezone.localdate() + timedelta(days=7)
+        cls.morning = cls.book('Seminar Hall A', 10, 12)
+
+    @classmethod
+    def book(cls, location, start_hour, end_hour, title='Talk'):
+        start, _ = conflicts.day_window(cls.day)
+        return Event.objects.create(
+            title=title, description='Description', location=location, organizer=cls.faculty,
+            start_date=start.replace(hour=start_hour), end_date=start.replace(hour=end_hour),
+        )
+
+    def setUp(self):
+        # Each test rolls back its rows, so start from an empty venue index
+        conflicts._index = None
+
+    def at(self, hour):
+        return conflicts.day_window(self.day)[0].replace(hour=hour)
+
+    def booked(self, location, start, end):
+        return [occurrence.event for occurrence in conflicts.find_conflicts(location, start, end)]
+
+    def check_conflicts(self):
+        self.assertEqual(self.booked('seminar hall-a', self.at(11), self.at(13)), [self.morning])
+        self.assertEqual(conflicts.find_conflicts('Seminar Hall A', self.at(12), self.at(13)), [])
+        self.assertEqual(conflicts.find_conflicts('Seminar Hall B', self.at(11), self.at(13)), [])
+        self.assertEqual(conflicts.find_conflicts('Seminar Hall A', self.at(9), self.at(11),
+                                                  exclude_id=self.morning.id), [])
+
+    def test_index_finds_overlaps(self):
+        self.check_conflicts()
+
+    @override_settings(EVENT_CONFLICT_INDEX=False)
+    def test_sql_fallback_finds_overlaps(self):
+        self.check_conflicts()
+
+    def test_index_follows_moves_and_deletes(self):
+        conflicts.get_venue_index()
+        self.morning.location = 'Library'
+        self.morning.save()
+        self.assertEqual(conflicts.find_conflicts('Seminar Hall A', self.at(11), self.at(13)), [])
+        self.assertEqual(self.booked('library', self.at(11), self.at(13)), [self.morning])
+        self.morning.delete()
+        self.assertEqual(conflicts.get_venue_index().overlapping('library', self.at(0), self.at(23)), [])
+
+    def check_series_conflicts(self):
+        series = Event.objects.create(
+            title='Weekly', description='Description', location='Library', organizer=self.faculty,
+            start_date=self.at(16), end_date=self.at(17), recurrence='FREQ=WEEKLY',
+        )
+        week = timedelta(weeks=1)
+        # A stored occurrence, and one far past the stored span that is expanded from the rule
+        for weeks in (3, 52 * 3):
+            self.assertEqual(self.booked('library', self.at(16) + weeks * week, self.at(18) + weeks * week),
+                             [series])
+        self.assertEqual(self.booked('library', self.at(17) + week, self.at(18) + week), [])
+
+    def test_index_finds_series_occurrences(self):
+        self.check_series_conflicts()
+
+    @override_settings(EVENT_CONFLICT_INDEX=False)
+    def test_sql_fallback_finds_series_occurrences(self):
+        self.check_series_conflicts()
+
+    def test_new_series_is_checked_past_its_first_occurrence(self):
+        later = self.book('Seminar Hall A', 10, 11, title='Later')
+        later.start_date += timedelta(weeks=2)
+        later.end_date += timedelta(weeks=2)
+        later.save()
+        self.client.force_login(self.faculty)
+        response = self.client.post(reverse('events:create'), {
+            'title': 'Series', 'description': 'Description', 'location': 'Seminar Hall A',
+            'start_date': (self.at(10) + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M'),
+            'end_date': (self.at(11) + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M'),
+            'recurrence': 'FREQ=DAILY',
+        }, follow=True)
+        self.assertContains(response, 'is already booked at that time: &quot;Later&quot;')
+
+    def test_placeholder_venues_never_conflict(self):
+        self.book('TBD', 10, 12)
+        self.assertEqual(conflicts.find_conflicts('tbd', self.at(10), self.at(12)), [])
+
+    def test_create_warns_about_double_booking(self):
+        self.client.force_login(self.faculty)
+        response = self.client.post(reverse('events:create'), {
+            'title': 'Clash', 'description': 'Description', 'location': 'seminar hall a',
+            'start_date': self.at(11).strftime('%Y-%m-%dT%H:%M'),
+            'end_date': self.at(13).strftime('%Y-%m-%dT%H:%M'),
+        }, follow=True)
+        self.assertContains(response, 'is already booked at that time')
+        self.assertTrue(Event.objects.filter(title='Clash').exists())
+
+    def test_free_slots(self):
+        self.book('Seminar Hall A', 14, 15)
+        self.client.force_login(self.faculty)
+        response = self.client.get(reverse('events:free_slots'), {
+            'location': 'Seminar Hall A', 'date': self.day.isoformat(), 'duration': 90,
+        })
+        data = response.json()
+        self.assertEqual(len(data['free']), 3)
+        response = self.client.get(reverse('events:free_slots'), {
+            'location': 'Seminar Hall A', 'date': self.day.isoformat(), 'duration': 150,
+        })
+        data = response.json()
+        self.assertEqual(len(data['busy']), 2)
+        self.assertEqual(
+            [(slot['start'], slot['end']) for slot in data['free']],
+            [(self.at(15).isoformat(), self.at(22).isoformat())],
+        )
+        self.assertEqual(self.client.get(reverse('events:free_slots')).status_code, 400)
+
+    def test_free_slots_include_series_occurrences(self):
+        Event.objects.create(
+            title='Daily', description='Description', location='Seminar Hall A', organizer=self.faculty,
+            start_date=self.at(14) - timedelta(days=3), end_date=self.at(15) - timedelta(days=3),
+            recurrence='FREQ=DAILY',
+        )
+        busy, free = conflicts.free_slots('Seminar Hall A', *conflicts.day_window(self.day))
+        self.assertEqual([(start, end) for _, start, end in busy],
+                         [(self.at(10), self.at(12)), (self.at(14), self.at(15))])
+        self.assertEqual(free, [(self.at(8), self.at(10)), (self.at(12), self.at(14)), (self.at(15), self.at(22))])
+
+
+@override_settings(SCHEDULER_VENUES=['Hall A', 'Hall B'], SCHEDULER_TIME_SHIFTS=[0, 1, -1])
+class EventSchedulingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+        cls.day = timezone.localdate() + timedelta(days=7)
+
+    def setUp(self):
+        conflicts._index = None
+
+    def at(self, hour):
+        return conflicts.day_window(self.day)[0].replace(hour=hour)
+
+    def ask(self, location, start_hour, end_hour, title='Meetup'):
+        return PermissionRequest.objects.create(
+            user=self.student, permission_type='event_creation', reason='Please', event_title=title,
+            event_location=location, event_start_date=self.at(start_hour), event_end_date=self.at(end_hour),
+        )
+
+    def assert_no_double_booking(self, slots):
+        for slot in slots:
+            for other in slots:
+                if slot is not other and slot.location == other.location:
+                    self.assertFalse(slot.start < other.end and other.start < slot.end, (slot, other))
+
+    def test_requests_that_fit_keep_what_they_asked_for(self):
+        first, second = self.ask('Hall A', 10, 12), self.ask('Hall B', 10, 12)
+        schedule = scheduling.propose_schedule()
+        self.assertEqual(schedule.status, 'Optimal')
+        self.assertEqual(schedule.unscheduled, [])
+        self.assertEqual(schedule.assignments[first.id][1:], ('Hall A', self.at(10), self.at(12), 0))
+        self.assertEqual(schedule.assignments[second.id][1:], ('Hall B', self.at(10), self.at(12), 0))
+
+    def test_clashing_requests_are_moved_rather_than_dropped(self):
+        Event.objects.create(title='Booked', description='Description', location='hall b', organizer=self.faculty,
+                             start_date=self.at(9), end_date=self.at(15))
+        requests = [self.ask('Hall A', 10, 12, title=f'Meetup {index}') for index in range(4)]
+        schedule = scheduling.propose_schedule()
+        # Hall B is taken all morning and Hall A only has room for 9-11 and 11-13
+        self.assertEqual(len(schedule.assignments), 2)
+        self.assertEqual(len(schedule.unscheduled), 2)
+        slots = list(schedule.assignments.values())
+        self.assert_no_double_booking(slots)
+        self.assertTrue(all(slot.location == 'Hall A' for slot in slots))
+        self.assertEqual(sorted(slot.start for slot in slots), [self.at(9), self.at(11)])
+        self.assertEqual({slot.request.id for slot in slots} | {r.id for r in schedule.unscheduled},
+                         {r.id for r in requests})
+
+    def test_series_occurrences_are_booked(self):
+        Event.objects.create(title='Weekly', description='Description', location='Hall A', organizer=self.faculty,
+                             start_date=self.at(10) - timedelta(weeks=2), end_date=self.at(12) - timedelta(weeks=2),
+                             recurrence='FREQ=WEEKLY')
+        request = self.ask('Hall A', 10, 12)
+        schedule = scheduling.propose_schedule()
+        self.assertEqual(schedule.assignments[request.id][1:], ('Hall B', self.at(10), self.at(12), 4))
+
+    def test_hundreds_of_requests(self):
+        rooms = [f'Room {number}' for number in range(20)]
+        week = [self.day + timedelta(days=offset) for offset in range(5)]
+        for index in range(300):
+            day = week[index % 5]
+            start = conflicts.day_window(day)[0].replace(hour=9 + index % 11)
+            PermissionRequest.objects.create(
+                user=self.student, permission_type='event_creation', reason='Please', event_title=f'Meetup {index}',
+                event_location=rooms[index % 7], event_start_date=start, event_end_date=start + timedelta(hours=2),
+            )
+        with self.settings(SCHEDULER_VENUES=rooms, SCHEDULER_TIME_SHIFTS=[0, -1, 1, -2, 2]):
+            schedule = scheduling.propose_schedule(time_limit=30)
+        self.assertEqual(schedule.status, 'Optimal')
+        self.assertEqual(len(schedule.assignments), 300)
+        self.assert_no_double_booking(list(schedule.assignments.values()))
+        self.assertLess(schedule.seconds, 30)
+
+
+class CalendarFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+        start = timezone.now() + timedelta(days=3)
+        cls.event = Event.objects.create(
+            title='Hackathon; day one', description='Bring a laptop,\nand snacks. ' + 'Long text ' * 20,
+            location='Main Auditorium', start_date=start, end_date=start + timedelta(hours=8), organizer=cls.faculty,
+        )
+        cls.other = Event.objects.create(
+            title='Choir', description='Singing', location='Hall', organizer=cls.student,
+            start_date=start, end_date=start + timedelta(hours=1),
+        )
+        cls.event.attendees.add(cls.student)
+
+    def feed(self, name, *args, **headers):
+        url = reverse(name, args=args)
+        token = calendar.calendar_token(self.student)
+        return self.client.get(url, {'token': token}, **headers)
+
+    def test_feed_contents(self):
+        response = self.feed('events:calendar')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn(r'SUMMARY:Hackathon\; day one', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+        unfolded = body.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:Bring a laptop\\,\\nand snacks.', unfolded)
+
+    def test_old_events_without_last_end_are_left_out(self):
+        # bulk_create skips Event.save(), so last_end can be missing on a single event
+        start = timezone.now() - timedelta(days=400)
+        Event.objects.bulk_create([Event(
+            title='Old', description='Description', location='Hall', organizer=self.faculty,
+            start_date=start, end_date=start + timedelta(hours=1),
+        )])
+        body = b''.join(self.feed('events:calendar').streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+
+    def test_personal_and_club_feeds(self):
+        body = b''.join(self.feed('events:my_calendar').streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'UID:event-{self.event.id}@', body)
+
+        club = Club.objects.create(name='Choir club', description='Description', president=self.faculty)
+        club.members.add(self.student)
+        body = b''.join(self.feed('events:club_calendar', club.id).streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+
+    def test_unchanged_feed_is_304(self):
+        etag = self.feed('events:my_calendar')['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.feed('events:my_calendar', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # The token's user and the feed's aggregate
+        self.assertEqual(len(queries), 2)
+
+        self.event.title = 'Hackathon'
+        self.event.save()
+        self.assertEqual(self.feed('events:my_calendar', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.feed('events:my_calendar')['ETag']
+        self.other.attendees.add(self.student)
+        self.assertEqual(self.feed('events:my_calendar', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tokens(self):
+        url = reverse('events:my_calendar')
+        self.assertEqual(self.client.get(url, {'token': 'forged:token'}).status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_single_event_download(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('events:event_calendar', args=[self.event.id]))
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertContains(self.client.get(reverse('events:detail', args=[self.event.id])), 'Add to calendar')
+
+
+@override_settings(RECURRENCE_HORIZON_DAYS=60)
+class RecurrenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.other = User.objects.create_user('other', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+        cls.start = timezone.now().replace(hour=17, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def series(self, recurrence, start=None, **fields):
+        start = start or self.start
+        return Event.objects.create(
+            title='Meetup', description='Weekly meetup', location='Club room', organizer=self.faculty,
+            start_date=start, end_date=start + timedelta(hours=2), recurrence=recurrence, **fields,
+        )
+
+    def stored(self, event):
+        return list(event.occurrences.values_list('start_date', flat=True))
+
+    def test_rules_are_validated_and_normalized(self):
+        self.assertEqual(recurrence.normalize_rule(' rrule:freq=weekly;count=3 '), 'FREQ=WEEKLY;COUNT=3')
+        self.assertEqual(recurrence.normalize_rule('FREQ=DAILY;UNTIL=20301231T120000Z'),
+                         'FREQ=DAILY;UNTIL=20301231T120000')
+        for rule in ['FREQ=HOURLY', 'FREQ=WEEKLY;BYHOUR=1', 'FREQ=WEEKLY;COUNT=2;UNTIL=20301231', 'FREQ=WEEKLY;BYDAY=XX']:
+            with self.assertRaises(ValueError, msg=rule):
+                recurrence.normalize_rule(rule)
+        form = EventForm(data={
+            'title': 'Meetup', 'description': 'Weekly', 'location': 'Club room', 'recurrence': 'FREQ=SECONDLY',
+            'start_date': '2030-01-01T10:00', 'end_date': '2030-01-01T11:00',
+        })
+        self.assertIn('recurrence', form.errors)
+
+    def test_finite_series(self):
+        event = self.series('FREQ=WEEKLY;COUNT=5')
+        starts = [self.start + timedelta(weeks=week) for week in range(5)]
+        self.assertEqual(event.last_end, starts[-1] + timedelta(hours=2))
+        # Only the horizon is stored; the rest is expanded when asked for
+        self.assertEqual(self.stored(event), [start for start in starts if start < timezone.now() + timedelta(days=60)])
+        window = occurrences_between(self.start + timedelta(days=6), self.start + timedelta(days=30))
+        self.assertEqual([occurrence.start for occurrence in window], starts[1:])
+        self.assertTrue(all(occurrence.id for occurrence in window))
+        self.assertEqual([o.start for o in occurrences_between(starts[0], starts[-1] + timedelta(days=1))], starts)
+
+    def test_endless_series_only_stores_the_horizon(self):
+        started = self.start - timedelta(days=3 * 365)
+        event = self.series('FREQ=DAILY', start=started)
+        self.assertIsNone(event.last_end)
+        stored = self.stored(event)
+        self.assertEqual(len(stored), 60)
+        self.assertGreaterEqual(stored[0], timezone.now() - timedelta(hours=2))
+
+        # Windows outside the stored span are expanded lazily, never written
+        for offset in (-700, 400):
+            day = self.start + timedelta(days=offset)
+            with self.assertNumQueries(3):
+                window = occurrences_between(day - timedelta(hours=1), day + timedelta(days=2, hours=-1))
+            self.assertEqual([(o.start, o.id) for o in window], [(day, None), (day + timedelta(days=1), None)])
+        self.assertEqual(len(self.stored(event)), 60)
+
+        response = self.client.get(reverse('events:calendar'), {'token': calendar.calendar_token(self.student)})
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('RRULE:FREQ=DAILY\r\n', body)
+
+    def test_rule_change_keeps_attendance_of_remaining_dates(self):
+        event = self.series('FREQ=WEEKLY;COUNT=4')
+        first, second = event.occurrences.all()[:2]
+        set_occurrence_attendance(first.id, self.student.id, True)
+        set_occurrence_attendance(second.id, self.student.id, True)
+
+        event.recurrence = 'FREQ=WEEKLY;INTERVAL=2;COUNT=2'
+        event.save()
+        self.assertEqual(self.stored(event), [self.start, self.start + timedelta(weeks=2)])
+        self.assertEqual(list(event.occurrences.filter(attendees=self.student)), [first])
+
+        event.recurrence = ''
+        event.save()
+        self.assertEqual(self.stored(event), [])
+        self.assertIsNone(event.occurrences_until)
+
+    def test_occurrence_attendance(self):
+        event = self.series('FREQ=WEEKLY;COUNT=3', capacity=1)
+        occurrence = event.occurrences.first()
+        url = reverse('events:attend_occurrence', args=[event.id, occurrence.id])
+        self.client.force_login(self.student)
+        response = self.client.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'attending': True, 'attendee_count': 1})
+
+        self.client.force_login(self.other)
+        response = self.client.post(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'attending': False, 'attendee_count': 1})
+        # The other dates and the series itself are unaffected
+        self.assertEqual(set_occurrence_attendance(event.occurrences.last().id, self.other.id).attendee_count, 1)
+        event.refresh_from_db()
+        self.assertEqual(event.attendee_count, 0)
+
+        self.client.force_login(self.student)
+        self.client.post(url, {'attending': '0'})
+        occurrence.refresh_from_db()
+        self.assertEqual(occurrence.attendee_count, 0)
+        self.assertEqual(self.client.post(reverse('events:attend_occurrence', args=[event.id + 1, occurrence.id]))
+                         .status_code, 404)
+
+    def test_list_and_detail(self):
+        event = self.series('FREQ=WEEKLY', start=self.start - timedelta(weeks=10))
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('events:list'), {'when': 'upcoming'})
+        self.assertEqual(list(response.context['events']), [event])
+        self.assertContains(response, 'Repeats every week')
+        response = self.client.get(reverse('events:detail', args=[event.id]))
+        self.assertEqual(len(response.context['occurrences']), 9)
+        self.assertContains(response, 'Upcoming dates')
+
+    def test_occurrences_api(self):
+        self.series('FREQ=WEEKLY;COUNT=3')
+        self.client.force_login(self.student)
+        day = timezone.localdate(self.start)
+        response = self.client.get(reverse('events:occurrences'), {'from': day, 'to': day + timedelta(days=8)})
+        self.assertEqual(len(response.json()['results']), 2)
+        response = self.client.get(reverse('events:occurrences'), {'from': day, 'to': day + timedelta(days=400)})
+        self.assertEqual(response.status_code, 400)
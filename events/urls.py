@@ -5,10 +5,18 @@ app_name = 'events'
 
 urlpatterns = [
     path('', views.event_list, name='list'),
+    path('feed/', views.event_feed, name='feed'),
     path('create/', views.create_event, name='create'),
+    path('venues/free-slots/', views.venue_free_slots, name='free_slots'),
+    path('occurrences/', views.event_occurrences, name='occurrences'),
+    path('calendar.ics', views.campus_calendar, name='calendar'),
+    path('calendar/mine.ics', views.my_calendar, name='my_calendar'),
+    path('calendar/club/<int:club_id>.ics', views.club_calendar, name='club_calendar'),
     path('<int:event_id>/', views.event_detail, name='detail'),
     path('<int:event_id>/edit/', views.edit_event, name='edit'),
+    path('<int:event_id>/calendar.ics', views.event_calendar, name='event_calendar'),
     path('<int:event_id>/attend/', views.attend_event, name='attend'),
+    path('<int:event_id>/occurrences/<int:occurrence_id>/attend/', views.attend_occurrence, name='attend_occurrence'),
     path('<int:event_id>/delete/', views.delete_event, name='delete'),
     path('api/<int:event_id>/delete/', views.ajax_delete_event, name='ajax_delete'),
 ]
\ No newline at end of file
@@ -1,25 +1,110 @@
+from datetime import datetime, time, timedelta
+from functools import wraps
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from .models import Event
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
+from django.contrib.auth import get_user_model
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date, urlencode
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+from .attendance import promote_waitlist, set_attendance, set_occurrence_attendance
+from .calendar import feed_etag, feed_events, stream_calendar, token_user_id
+from .conflicts import day_window, free_slots, warn_conflicts
+from .models import Event, EventOccurrence
+from .pagination import filter_events, paginate_events
+from .recurrence import occurrences_between
 from django import forms
 from users.decorators import faculty_or_admin_required
+from smart_campus.db import serialized_writes
+from caching.conditional import clock_minute, conditional_page
+from caching.versions import cache_key, cached, get_version, page_timeout
+
+# Cached event pages show organizer usernames, so they depend on users too
+EVENT_CACHE_MODELS = ('events.Event', 'users.User')
+
+def _event_list_clock(request):
+    return clock_minute(request) if request.GET.get('when') in ('upcoming', 'past') else ''
 
 class EventForm(forms.ModelForm):
     class Meta:
         model = Event
-        fields = ['title', 'description', 'location', 'start_date', 'end_date', 'image']
+        fields = ['title', 'description', 'location', 'start_date', 'end_date', 'recurrence', 'capacity', 'image']
         widgets = {
             'start_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'end_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
         }
 
+def _event_page(request):
+    """
+    Resolve the filters and cursor in the query string into one page of events.
+
+    Also returns the key under which the rendered cards of this page are
+    cached; it changes whenever an event or user is written.
+    """
+    queryset = Event.objects.select_related('organizer')
+    queryset, filters = filter_events(queryset, request.GET)
+    cursor = request.GET.get('cursor', '')
+    # Upcoming/past depend on the clock as well as the rows, so they expire each minute
+    minute = timezone.now().strftime('%Y%m%d%H%M') if filters['when'] != 'all' else ''
+    key = cache_key('events:page', urlencode(filters), cursor, minute)
+    # Upcoming events read soonest-first; everything else newest-first as before
+    events, next_cursor = cached(key, EVENT_CACHE_MODELS, lambda: paginate_events(
+        queryset,
+        cursor=cursor,
+        ascending=filters['when'] == 'upcoming',
+    ))
+    return events, next_cursor, filters, f'{key}:{get_version(*EVENT_CACHE_MODELS)}'
+
 @login_required
+@conditional_page(*EVENT_CACHE_MODELS, vary_on=_event_list_clock)
 def event_list(request):
-    events = Event.objects.all().order_by('-start_date')
-    return render(request, 'events/list.html', {'events': events})
+    events, next_cursor, filters, cards_key = _event_page(request)
+    return render(request, 'events/list.html', {
+        'events': events,
+        'next_cursor': next_cursor,
+        'filters': filters,
+        'filter_query': urlencode(filters),
+        'cards_key': cards_key,
+        'cache_timeout': page_timeout(),
+    })
+
+@login_required
+def event_feed(request):
+    """JSON variant of the event list used for infinite scrolling"""
+    events, next_cursor, filters, cards_key = _event_page(request)
+    return JsonResponse({
+        'results': [
+            {
+                'id': event.id,
+                'title': event.title,
+                'location': event.location,
+                'start_date': event.start_date.isoformat(),
+                'end_date': event.end_date.isoformat(),
+                'organizer': event.organizer.username,
+                'attendees': event.attendee_count,
+                'url': reverse('events:detail', args=[event.id]),
+            }
+            for event in events
+        ],
+        'html': render_to_string('events/_event_cards.html', {
+            'events': events,
+            'cards_key': cards_key,
+            'cache_timeout': page_timeout(),
+        }, request=request),
+        'next_cursor': next_cursor,
+        'filters': filters,
+    })
 
 @login_required
 @faculty_or_admin_required
@@ -36,26 +121,93 @@ def create_event(request):
             event.organizer = request.user
             event.save()
             messages.success(request, 'Event created successfully!')
+            warn_conflicts(request, event)
             return redirect('events:list')
     else:
         form = EventForm()
     return render(request, 'events/form.html', {'form': form, 'title': 'Create Event'})
 
+def _today(request):
+    return timezone.localdate().isoformat()
+
 @login_required
+@conditional_page(*EVENT_CACHE_MODELS, vary_on=_today)
 def event_detail(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
-    return render(request, 'events/detail.html', {'event': event})
+    event = cached(f'events:detail:{event_id}', EVENT_CACHE_MODELS, lambda: (
+        Event.objects.select_related('organizer').filter(id=event_id).first()
+    ))
+    if event is None:
+        raise Http404('No Event matches the given query.')
+    is_attending = event.attendees.filter(id=request.user.id).exists()
+    occurrences, attending_occurrences = [], set()
+    if event.recurrence:
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        days = getattr(settings, 'RECURRENCE_DETAIL_DAYS', 60)
+        occurrences = occurrences_between(today, today + timedelta(days=days), Event.objects.filter(id=event.id))
+        attending_occurrences = set(EventOccurrence.attendees.through.objects.filter(
+            eventoccurrence_id__in=[occurrence.id for occurrence in occurrences if occurrence.id],
+            user_id=request.user.id,
+        ).values_list('eventoccurrence_id', flat=True))
+    return render(request, 'events/detail.html', {
+        'event': event,
+        'is_attending': is_attending,
+        'is_waitlisted': not is_attending and event.waitlist.filter(user=request.user).exists(),
+        'waitlist_count': event.waitlist.count() if event.capacity is not None else 0,
+        'occurrences': occurrences,
+        'attending_occurrences': attending_occurrences,
+    })
 
 @login_required
+@require_POST
+@serialized_writes()
 def attend_event(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
-    if request.user in event.attendees.all():
-        event.attendees.remove(request.user)
+    """
+    Toggle the current user's attendance, or set it with attending=1/0.
+
+    Full events put the user on the waitlist. AJAX callers get
+    {"attending": ..., "waitlisted": ..., "attendee_count": ...} back instead
+    of a redirect.
+    """
+    attending = request.POST.get('attending')
+    if attending is not None:
+        attending = attending.lower() in ('1', 'true', 'yes')
+    try:
+        state = set_attendance(event_id, request.user.id, attending)
+    except Event.DoesNotExist:
+        raise Http404('No Event matches the given query.')
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse(state._asdict())
+    if state.attending:
+        messages.success(request, 'You are now attending this event!')
+    elif state.waitlisted:
+        messages.info(request, 'This event is full, so you have been added to the waitlist.')
+    else:
         messages.success(request, 'You are no longer attending this event.')
+    return redirect('events:detail', event_id=event_id)
+
+@login_required
+@require_POST
+@serialized_writes()
+def attend_occurrence(request, event_id, occurrence_id):
+    """Toggle the current user's attendance of one date of a recurring event, or set it with attending=1/0"""
+    was_attending = EventOccurrence.objects.filter(id=occurrence_id, event_id=event_id).values_list(
+        Exists(EventOccurrence.attendees.through.objects.filter(eventoccurrence_id=occurrence_id, user_id=request.user.id)),
+        flat=True,
+    ).first()
+    if was_attending is None:
+        raise Http404('No EventOccurrence matches the given query.')
+    attending = request.POST.get('attending')
+    attending = not was_attending if attending is None else attending.lower() in ('1', 'true', 'yes')
+    state = set_occurrence_attendance(occurrence_id, request.user.id, attending)
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'attending': state.attending, 'attendee_count': state.attendee_count})
+    if state.attending:
+        messages.success(request, 'You are now attending this date!')
+    elif attending:
+        messages.error(request, 'This date is full.')
     else:
-        event.attendees.add(request.user)
-        messages.success(request, 'You are now attending this event!')
-    return redirect('events:detail', event_id=event.id)
+        messages.success(request, 'You are no longer attending this date.')
+    return redirect('events:detail', event_id=event_id)
 
 @login_required
 def edit_event(request, event_id):
@@ -71,7 +223,11 @@ def edit_event(request, event_id):
         form = EventForm(request.POST, request.FILES, instance=event)
         if form.is_valid():
             form.save()
+            # A raised capacity seats people from the waitlist straight away
+            with serialized_writes(), transaction.atomic():
+                promote_waitlist(event.id)
             messages.success(request, 'Event updated successfully!')
+            warn_conflicts(request, event)
             return redirect('events:detail', event_id=event.id)
     else:
         form = EventForm(instance=event)
@@ -114,3 +270,139 @@ def ajax_delete_event(request, event_id):
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+@login_required
+def venue_free_slots(request):
+    """
+    JSON list of the bookings and free slots of a venue on one day.
+
+    ?location=<venue>&date=YYYY-MM-DD&duration=<minutes>; the date defaults
+    to today and free slots shorter than `duration` (default 30) are left out.
+    """
+    location = request.GET.get('location', '').strip()
+    if not location:
+        return JsonResponse({'error': 'location is required'}, status=400)
+    day = parse_date(request.GET.get('date', '')) if request.GET.get('date') else timezone.localdate()
+    try:
+        duration = timedelta(minutes=int(request.GET.get('duration', 30)))
+    except ValueError:
+        duration = None
+    if day is None or duration is None or duration <= timedelta(0):
+        return JsonResponse({'error': 'date must be YYYY-MM-DD and duration a positive number of minutes'},
+                            status=400)
+
+    start, end = day_window(day)
+    busy, free = free_slots(location, start, end, duration)
+    return JsonResponse({
+        'location': location,
+        'date': day.isoformat(),
+        'busy': [
+            {'event': event_id, 'start': slot_start.isoformat(), 'end': slot_end.isoformat()}
+            for event_id, slot_start, slot_end in busy
+        ],
+        'free': [{'start': slot_start.isoformat(), 'end': slot_end.isoformat()} for slot_start, slot_end in free],
+    })
+
+@login_required
+def event_occurrences(request):
+    """
+    JSON list of every event date between ?from= and ?to= (YYYY-MM-DD, inclusive), for calendar views.
+
+    Recurring series contribute only their dates inside the window, and the
+    window may span at most RECURRENCE_MAX_WINDOW_DAYS.
+    """
+    start_day, end_day = parse_date(request.GET.get('from', '')), parse_date(request.GET.get('to', ''))
+    max_days = getattr(settings, 'RECURRENCE_MAX_WINDOW_DAYS', 92)
+    if start_day is None or end_day is None or not 0 <= (end_day - start_day).days < max_days:
+        return JsonResponse({'error': f'from and to must be YYYY-MM-DD dates at most {max_days} days apart'},
+                            status=400)
+    start = timezone.make_aware(datetime.combine(start_day, time.min))
+    end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+    return JsonResponse({
+        'from': start_day.isoformat(),
+        'to': end_day.isoformat(),
+        'results': [
+            {
+                'event': occurrence.event.id,
+                'occurrence': occurrence.id,
+                'title': occurrence.event.title,
+                'location': occurrence.event.location,
+                'start_date': occurrence.start.isoformat(),
+                'end_date': occurrence.end.isoformat(),
+                'recurring': bool(occurrence.event.recurrence),
+                'url': reverse('events:detail', args=[occurrence.event.id]),
+            }
+            for occurrence in occurrences_between(start, end)
+        ],
+    })
+
+def _feed_user(request):
+    """The user a calendar feed is read as: the ?token= owner, else the session user"""
+    token = request.GET.get('token')
+    if token is None:
+        return request.user if request.user.is_authenticated else None
+    user = get_user_model().objects.filter(pk=token_user_id(token), is_active=True).first()
+    if user is None:
+        raise PermissionDenied('Invalid calendar token.')
+    return user
+
+def _calendar_response(request, events, name, filename):
+    """
+    Stream `events` as an iCalendar file, or answer 304 if the client's copy is current.
+
+    Polling clients mostly get the 304, which costs one aggregate query.
+    """
+    etag, newest = feed_etag(events)
+    last_modified = int(newest.timestamp()) if newest else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = StreamingHttpResponse(
+            stream_calendar(
+                events, name,
+                lambda event_id: request.build_absolute_uri(reverse('events:detail', args=[event_id])),
+                request.get_host().split(':')[0],
+            ),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _calendar_view(view):
+    """Resolve the feed's reader and send anyone without a session or token to log in"""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user = _feed_user(request)
+        if user is None:
+            return redirect_to_login(request.get_full_path())
+        return view(request, user, *args, **kwargs)
+    return wrapper
+
+@_calendar_view
+def campus_calendar(request, user):
+    """Every current and upcoming event on campus"""
+    return _calendar_response(request, feed_events(), 'Campus Events', 'campus-events.ics')
+
+@_calendar_view
+def my_calendar(request, user):
+    """The events `user` is attending"""
+    return _calendar_response(request, feed_events(user=user), f'Events for {user.username}', 'my-events.ics')
+
+@_calendar_view
+def club_calendar(request, user, club_id):
+    """Events organized by a club's president or members"""
+    from clubs.models import Club
+
+    club = get_object_or_404(Club, id=club_id)
+    return _calendar_response(request, feed_events(club=club), club.name, f'club-{club.id}.ics')
+
+@login_required
+@require_safe
+def event_calendar(request, event_id):
+    """One event as a file to add to a calendar"""
+    event = get_object_or_404(Event.objects.only('id', 'title'), id=event_id)
+    return _calendar_response(request, Event.objects.filter(id=event.id), event.title, f'event-{event.id}.ics')
@@ -1,3 +1,35 @@
-from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from smart_campus.testing import QueryScalingTestCase
+from users.models import User
+
+from .models import Feedback
+
+
+class FeedbackQueryCountTests(QueryScalingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.feedback = Feedback.objects.create(
+            title='Feedback 0', description='Description', category='Library', user=cls.student,
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+        self.created = 1
+
+    def add_feedback(self, count):
+        for _ in range(count):
+            author = User.objects.create_user(f'author{self.created}')
+            Feedback.objects.create(
+                title=f'Feedback {self.created}', description='Description', category='Hostel', user=author,
+            )
+            self.created += 1
+
+    def test_feedback_list(self):
+        self.assertConstantQueries(reverse('feedback:list'), self.add_feedback, 'feedback:list')
+
+    def test_feedback_detail(self):
+        url = reverse('feedback:detail', args=[self.feedback.id])
+        self.assertConstantQueries(url, self.add_feedback, 'feedback:detail')
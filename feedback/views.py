@@ -1,10 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import Http404
 from .models import Feedback
 from django import forms
-from users.models import User
-from users.views import create_notification
+from users.notifications import enqueue_role_notification
+from caching.conditional import conditional_page
+from caching.versions import cached
+
+FEEDBACK_CACHE_MODELS = ('feedback.Feedback', 'users.User')
 
 class FeedbackForm(forms.ModelForm):
     class Meta:
@@ -12,8 +16,11 @@ class FeedbackForm(forms.ModelForm):
         fields = ['title', 'description', 'category']
 
 @login_required
+@conditional_page(*FEEDBACK_CACHE_MODELS)
 def feedback_list(request):
-    feedback = Feedback.objects.all().order_by('-created_at')
+    feedback = cached('feedback:list', FEEDBACK_CACHE_MODELS, lambda: list(
+        Feedback.objects.select_related('user').order_by('-created_at')
+    ))
     return render(request, 'feedback/list.html', {'feedback_list': feedback})
 
 @login_required
@@ -25,15 +32,14 @@ def create_feedback(request):
             feedback.user = request.user
             feedback.save()
             
-            # Send notification to all faculty and admin users
-            faculty_and_admin_users = User.objects.filter(role__in=['faculty', 'admin'])
-            for user in faculty_and_admin_users:
-                create_notification(
-                    user=user,
-                    title=f'New Feedback from {request.user.username}',
-                    message=f'Category: {feedback.category}\nTitle: {feedback.title}\nDescription: {feedback.description[:100]}...',
-                    link=f'/feedback/{feedback.id}/'
-                )
+            # Send notification to all faculty and admin users (fanned out by the outbox worker)
+            enqueue_role_notification(
+                key=f'feedback:{feedback.id}',
+                roles=['faculty', 'admin'],
+                title=f'New Feedback from {request.user.username}',
+                message=f'Category: {feedback.category}\nTitle: {feedback.title}\nDescription: {feedback.description[:100]}...',
+                link=f'/feedback/{feedback.id}/'
+            )
             
             messages.success(request, 'Feedback submitted successfully! Faculty and admin have been notified.')
             return redirect('feedback:list')
@@ -43,5 +49,9 @@ def create_feedback(request):
 
 @login_required
 def feedback_detail(request, feedback_id):
-    feedback = get_object_or_404(Feedback, id=feedback_id)
+    feedback = cached(f'feedback:detail:{feedback_id}', FEEDBACK_CACHE_MODELS, lambda: (
+        Feedback.objects.select_related('user').filter(id=feedback_id).first()
+    ))
+    if feedback is None:
+        raise Http404('No Feedback matches the given query.')
     return render(request, 'feedback/detail.html', {'feedback': feedback})
@@ -0,0 +1,111 @@
+from itertools import combinations
+
+from django.db.models import Q
+from PIL import Image, UnidentifiedImageError
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def dhash(fp):
+    """
+    64-bit difference hash of an image.
+
+    The image is shrunk to 9x8 greyscale and each bit records whether a pixel
+    is brighter than its right-hand neighbour, which survives rescaling,
+    recompression and small colour changes.
+    """
+    with Image.open(fp) as image:
+        pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hash_file(fp):
+    """Return the dHash of an uploaded or stored file, or None if it is not a readable image"""
+    try:
+        if hasattr(fp, 'seek'):
+            fp.seek(0)
+        return dhash(fp)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+    finally:
+        if hasattr(fp, 'seek'):
+            try:
+                fp.seek(0)
+            except (OSError, ValueError):
+                pass
+
+
+def hash_path(path):
+    """Hash an image on disk; top-level so it can run in a process pool"""
+    try:
+        with open(path, 'rb') as fp:
+            return dhash(fp)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+
+def split_hash(value):
+    """Split a 64-bit hash into the 16-bit chunks stored in the image_hash_N columns"""
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _neighbours(chunk, radius):
+    """Every CHUNK_BITS-wide value within `radius` bit flips of `chunk`"""
+    values = [chunk]
+    for distance in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), distance):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def candidate_filter(value, max_distance):
+    """
+    Multi-index hashing lookup for hashes within `max_distance` of `value`.
+
+    If two 64-bit hashes differ in at most r bits, at least one of their four
+    16-bit chunks differs in at most r // 4 bits (pigeonhole). Probing each
+    indexed chunk column for that small neighbourhood therefore finds every
+    true match through index lookups; callers re-check the full distance.
+    """
+    radius = max_distance // CHUNKS
+    condition = Q()
+    for i, chunk in enumerate(split_hash(value)):
+        condition |= Q(**{f'image_hash_{i}__in': _neighbours(chunk, radius)})
+    return condition
+
+
+def find_similar_images(item, max_distance=10, limit=6):
+    """Return [(LostItem, distance)] whose photo looks like `item`'s, closest first"""
+    from .models import LostItem
+
+    if item.image_hash is None:
+        return []
+    target = item.image_hash
+    candidates = (
+        LostItem.objects.filter(candidate_filter(target, max_distance))
+        .exclude(id=item.id)
+        .select_related('user')
+    )
+    matches = []
+    for candidate in candidates:
+        distance = hamming(target, candidate.image_hash)
+        if distance <= max_distance:
+            matches.append((candidate, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches[:limit]
@@ -0,0 +1,58 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from lost_found.imagehash import hash_path
+from lost_found.models import LostItem
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes for lost and found photos that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hashing processes (defaults to the CPU count)')
+        parser.add_argument('--all', action='store_true',
+                            help='Re-hash every photo, not only the missing ones')
+
+    def handle(self, *args, **options):
+        items = LostItem.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image')
+        if not options['all']:
+            items = items.filter(image_hash_0__isnull=True)
+
+        hashed = skipped = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            batch = []
+            for item in items.iterator(chunk_size=CHUNK_SIZE):
+                batch.append(item)
+                if len(batch) >= CHUNK_SIZE:
+                    done, failed = self._hash_batch(pool, batch)
+                    hashed, skipped = hashed + done, skipped + failed
+                    batch = []
+            if batch:
+                done, failed = self._hash_batch(pool, batch)
+                hashed, skipped = hashed + done, skipped + failed
+
+        self.stdout.write(self.style.SUCCESS(f'Hashed {hashed} images ({skipped} unreadable).'))
+
+    def _hash_batch(self, pool, items):
+        paths = []
+        for item in items:
+            try:
+                paths.append(item.image.path)
+            except (NotImplementedError, ValueError):
+                paths.append(None)
+
+        updated = []
+        for item, value in zip(items, pool.map(_hash_or_none, paths)):
+            if value is not None:
+                item.set_image_hash(value)
+                updated.append(item)
+        LostItem.objects.bulk_update(updated, [f'image_hash_{i}' for i in range(4)])
+        return len(updated), len(items) - len(updated)
+
+
+def _hash_or_none(path):
+    return hash_path(path) if path else None
@@ -0,0 +1,281 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 2 ** 18
+INDEX_VERSION = 1
+
+# A "found" report is matched against open "lost" reports and vice versa
+COUNTERPART_STATUS = {
+    'lost': 'found',
+    'found': 'lost',
+}
+
+
+def item_text(item):
+    # Repeat the title so it outweighs incidental words in the description
+    return f'{item.title} {item.title} {item.description} {item.location}'
+
+
+class ItemMatcher:
+    """
+    Incremental TF-IDF index over open lost and found reports.
+
+    Raw term counts are kept per item (hashed, so no vocabulary has to be
+    refitted as items arrive) together with document frequencies. IDF
+    weighting is applied at query time with two sparse mat-vec products,
+    so adding an item never requires re-vectorising the corpus.
+    """
+
+    def __init__(self):
+        self.vectorizer = HashingVectorizer(
+            n_features=N_FEATURES,
+            alternate_sign=False,
+            norm=None,
+            stop_words='english',
+        )
+        self.items = {}  # item id -> (status, term indices, term counts)
+        self.doc_freq = np.zeros(N_FEATURES, dtype=np.int32)
+        self.synced_at = None
+        self.dirty = False
+        self._matrices = {}
+        self._lock = threading.Lock()
+
+    def _vectorize(self, item):
+        row = self.vectorizer.transform([item_text(item)])
+        return row.indices.astype(np.int32), row.data.astype(np.float32)
+
+    def _discard(self, item_id):
+        entry = self.items.pop(item_id, None)
+        if entry is not None:
+            self.doc_freq[entry[1]] -= 1
+            self._matrices.pop(entry[0], None)
+            self.dirty = True
+
+    def update(self, item):
+        """Add, refresh or drop a single item depending on its status"""
+        with self._lock:
+            self._discard(item.id)
+            if item.status in COUNTERPART_STATUS:
+                indices, counts = self._vectorize(item)
+                self.items[item.id] = (item.status, indices, counts)
+                self.doc_freq[indices] += 1
+                self._matrices.pop(item.status, None)
+                self.dirty = True
+
+    def remove(self, item_id):
+        with self._lock:
+            self._discard(item_id)
+
+    def sync(self):
+        """
+        Apply reports changed since the last sync, e.g. by other worker processes.
+
+        Deletions leave no updated_at behind, so the number of open reports
+        is compared with the index as well; when they differ, the live ids
+        are diffed against the indexed ones.
+        """
+        from .models import LostItem
+
+        started = timezone.now()
+        fields = ('id', 'title', 'description', 'location', 'status')
+        changed = LostItem.objects.only(*fields)
+        if self.synced_at is not None:
+            changed = changed.filter(updated_at__gte=self.synced_at)
+        else:
+            changed = changed.filter(status__in=COUNTERPART_STATUS)
+        for item in changed.iterator(chunk_size=2000):
+            self.update(item)
+        self.synced_at = started
+
+        open_items = LostItem.objects.filter(status__in=COUNTERPART_STATUS)
+        if open_items.count() != len(self.items):
+            live = set(open_items.values_list('id', flat=True).iterator(chunk_size=10000))
+            with self._lock:
+                for item_id in [item_id for item_id in self.items if item_id not in live]:
+                    self._discard(item_id)
+                missing = sorted(live.difference(self.items))
+            for start in range(0, len(missing), 500):
+                for item in LostItem.objects.only(*fields).filter(id__in=missing[start:start + 500]):
+                    self.update(item)
+
+    def _matrix(self, status):
+        """Stack the term counts for one status into a CSR matrix, cached until it changes"""
+        if status not in self._matrices:
+            entries = [(item_id, entry) for item_id, entry in self.items.items() if entry[0] == status]
+            ids = np.fromiter((item_id for item_id, _ in entries), dtype=np.int64, count=len(entries))
+            lengths = np.fromiter((len(entry[1]) for _, entry in entries), dtype=np.int64, count=len(entries))
+            indptr = np.concatenate(([0], np.cumsum(lengths)))
+            if entries:
+                indices = np.concatenate([entry[1] for _, entry in entries])
+                data = np.concatenate([entry[2] for _, entry in entries])
+            else:
+                indices = np.zeros(0, dtype=np.int32)
+                data = np.zeros(0, dtype=np.float32)
+            counts = sparse.csr_matrix((data, indices, indptr), shape=(len(entries), N_FEATURES))
+            self._matrices[status] = (ids, counts, counts.power(2).tocsr())
+        return self._matrices[status]
+
+    def match(self, item, limit=5, min_score=0.0):
+        """Return [(item id, cosine similarity)] of the closest open counterpart reports"""
+        counterpart = COUNTERPART_STATUS.get(item.status)
+        if counterpart is None:
+            return []
+
+        with self._lock:
+            ids, counts, squared = self._matrix(counterpart)
+            if not len(ids):
+                return []
+
+            indices, query_counts = self._vectorize(item)
+            total = len(self.items) + 1
+            idf = np.log((1 + total) / (1 + self.doc_freq[indices])) + 1
+            query = query_counts * idf
+            query_norm = np.linalg.norm(query)
+            if not query_norm:
+                return []
+
+            # cosine(x, q) with both sides TF-IDF weighted:
+            #   (X diag(idf)) . (q idf) / (|X diag(idf)| |q idf|)
+            weights = np.zeros(N_FEATURES, dtype=np.float64)
+            weights[indices] = query * idf
+            dots = counts @ weights
+
+            full_idf = np.log((1 + total) / (1 + self.doc_freq.astype(np.float64))) + 1
+            row_norms = np.sqrt(squared @ (full_idf ** 2))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.where(row_norms > 0, dots / (row_norms * query_norm), 0.0)
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(ids[i]), float(scores[i]))
+            for i in top
+            if scores[i] > min_score and ids[i] != item.id
+        ]
+
+    def save(self, path):
+        """Persist the index atomically so a restarted worker can skip the full rebuild"""
+        with self._lock:
+            # Flatten into a handful of arrays; pickling one small array per
+            # item is orders of magnitude slower to write and read back
+            ids = list(self.items)
+            lengths = [len(self.items[item_id][1]) for item_id in ids]
+            state = {
+                'version': INDEX_VERSION,
+                'ids': np.array(ids, dtype=np.int64),
+                'statuses': np.array([self.items[item_id][0] for item_id in ids]),
+                'indptr': np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+                'indices': np.concatenate([self.items[item_id][1] for item_id in ids]) if ids else np.zeros(0, dtype=np.int32),
+                'counts': np.concatenate([self.items[item_id][2] for item_id in ids]) if ids else np.zeros(0, dtype=np.float32),
+                'doc_freq': self.doc_freq,
+                'synced_at': self.synced_at,
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            os.close(fd)
+            joblib.dump(state, tmp_path)
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        matcher = cls()
+        try:
+            state = joblib.load(path)
+        except (OSError, EOFError, ValueError, KeyError):
+            return matcher
+        if state.get('version') != INDEX_VERSION:
+            return matcher
+        splits = state['indptr'][1:-1]
+        matcher.items = dict(zip(
+            state['ids'].tolist(),
+            zip(state['statuses'].tolist(), np.split(state['indices'], splits), np.split(state['counts'], splits)),
+        ))
+        matcher.doc_freq = state['doc_freq']
+        matcher.synced_at = state['synced_at']
+        return matcher
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+_last_saved = 0.0
+
+
+def get_matcher():
+    """Return the process-wide matcher, loading it from disk and catching up with the database"""
+    global _matcher, _last_saved
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = ItemMatcher.load(settings.LOST_FOUND_MATCHER_PATH)
+        _matcher.sync()
+        interval = getattr(settings, 'LOST_FOUND_MATCHER_SAVE_INTERVAL', 60)
+        if _matcher.dirty and time.monotonic() - _last_saved >= interval:
+            try:
+                _matcher.save(settings.LOST_FOUND_MATCHER_PATH)
+                _last_saved = time.monotonic()
+            except OSError:
+                logger.warning('Could not persist lost and found matcher index', exc_info=True)
+        return _matcher
+
+
+def find_matches(item, limit=5):
+    """Return [(LostItem, score)] for the open counterpart reports most similar to `item`"""
+    from .models import LostItem
+
+    min_score = getattr(settings, 'LOST_FOUND_MATCH_MIN_SCORE', 0.2)
+    scored = get_matcher().match(item, limit=limit, min_score=min_score)
+    if not scored:
+        return []
+
+    # Re-check against the database so deleted or claimed reports drop out
+    candidates = LostItem.objects.select_related('user').in_bulk(
+        [item_id for item_id, _ in scored]
+    )
+    counterpart = COUNTERPART_STATUS[item.status]
+    return [
+        (candidates[item_id], score)
+        for item_id, score in scored
+        if item_id in candidates and candidates[item_id].status == counterpart
+    ]
+
+
+def notify_matches(item, matches):
+    """Tell the reporter and the owners of the matching reports about each other"""
+    from users.models import Notification
+    from users.notifications import refresh_unread_counts
+
+    if not matches:
+        return
+
+    notifications = [
+        Notification(
+            user=item.user,
+            title=f'Possible matches for "{item.title}"',
+            message=f'We found {len(matches)} {COUNTERPART_STATUS[item.status]} report(s) that may match your item.',
+            link=f'/lost-found/{item.id}/',
+        )
+    ]
+    for candidate, score in matches:
+        if candidate.user_id == item.user_id:
+            continue
+        notifications.append(Notification(
+            user=candidate.user,
+            title=f'Possible match for "{candidate.title}"',
+            message=f'A new {item.status} report "{item.title}" at {item.location} may match your item.',
+            link=f'/lost-found/{item.id}/',
+        ))
+    Notification.objects.bulk_create(notifications)
+    refresh_unread_counts({notification.user_id for notification in notifications})
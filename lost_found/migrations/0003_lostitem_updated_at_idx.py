@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 20:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lost_found", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lostitem",
+            index=models.Index(fields=["updated_at"], name="lostitem_updated_at_idx"),
+        ),
+    ]
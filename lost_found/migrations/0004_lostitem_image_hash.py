@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-17 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lost_found", "0003_lostitem_updated_at_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lostitem",
+            name="image_hash_0",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="lostitem",
+            name="image_hash_1",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="lostitem",
+            name="image_hash_2",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="lostitem",
+            name="image_hash_3",
+            field=models.PositiveIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+    ]
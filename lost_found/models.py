@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 
+from .imagehash import CHUNK_BITS, CHUNKS, hash_file, split_hash
+
 class LostItem(models.Model):
     STATUS_CHOICES = (
         ('lost', 'Lost'),
@@ -17,6 +19,40 @@ class LostItem(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # 64-bit perceptual hash of the image, split into indexed 16-bit chunks
+    # so similar photos can be found with index lookups (see imagehash.py)
+    image_hash_0 = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)
+    image_hash_1 = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)
+    image_hash_2 = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)
+    image_hash_3 = models.PositiveIntegerField(null=True, blank=True, editable=False, db_index=True)
+    
+    class Meta:
+        indexes = [
+            # Lets each worker's matcher catch up on recently changed reports
+            models.Index(fields=['updated_at'], name='lostitem_updated_at_idx'),
+        ]
     
     def __str__(self):
         return self.title
+    
+    @property
+    def image_hash(self):
+        if self.image_hash_0 is None:
+            return None
+        value = 0
+        for i in range(CHUNKS):
+            value = (value << CHUNK_BITS) | getattr(self, f'image_hash_{i}')
+        return value
+    
+    def set_image_hash(self, value):
+        chunks = split_hash(value) if value is not None else [None] * CHUNKS
+        for i, chunk in enumerate(chunks):
+            setattr(self, f'image_hash_{i}', chunk)
+    
+    def save(self, *args, **kwargs):
+        # Hash new uploads before they are written to storage
+        if self.image and not self.image._committed:
+            self.set_image_hash(hash_file(self.image.file))
+        elif not self.image:
+            self.set_image_hash(None)
+        super().save(*args, **kwargs)
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .matching import get_matcher
+from .models import LostItem
+
+
+@receiver(post_save, sender=LostItem)
+def update_match_index(sender, instance, raw=False, **kwargs):
+    """Keep this process's matcher index in step with lost and found reports"""
+    if raw:
+        return
+    get_matcher().update(instance)
+
+
+@receiver(post_delete, sender=LostItem)
+def remove_from_match_index(sender, instance, **kwargs):
+    get_matcher().remove(instance.id)
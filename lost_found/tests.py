@@ -1,3 +1,104 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from smart_campus.testing import QueryScalingTestCase
+from users.models import Notification, User
+
+from . import matching
+from .models import LostItem
+
+
+class LostItemQueryCountTests(QueryScalingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.item = LostItem.objects.create(
+            title='Blue umbrella', description='Left in the library', location='Library',
+            date=datetime.date(2025, 1, 10), status='lost', user=cls.student,
+        )
+
+    def setUp(self):
+        super().setUp()
+        # Each test rolls back its rows, so start from an empty matcher index
+        matching._matcher = None
+        self.client.force_login(self.student)
+        self.created = 1
+
+    def add_items(self, count):
+        for _ in range(count):
+            reporter = User.objects.create_user(f'reporter{self.created}')
+            LostItem.objects.create(
+                title=f'Black wallet {self.created}', description='Leather wallet with cards',
+                location='Cafeteria', date=datetime.date(2025, 1, 11), status='lost', user=reporter,
+            )
+            self.created += 1
+
+    def test_item_list(self):
+        self.assertConstantQueries(reverse('lost_found:list'), self.add_items, 'lost_found:list')
+
+    def test_item_detail(self):
+        url = reverse('lost_found:detail', args=[self.item.id])
+        self.assertConstantQueries(url, self.add_items, 'lost_found:detail')
+
+
+class MatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', role='student')
+        cls.finder = User.objects.create_user('finder', role='student')
+        cls.wallet = cls.report('Black leather wallet', 'Wallet with student card', 'lost', cls.owner)
+        cls.umbrella = cls.report('Blue umbrella', 'Folding umbrella', 'lost', cls.owner)
+
+    @classmethod
+    def report(cls, title, description, status, user):
+        return LostItem.objects.create(title=title, description=description, location='Library',
+                                       date=datetime.date(2025, 1, 10), status=status, user=user)
+
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp)
+        settings = override_settings(LOST_FOUND_MATCHER_PATH=tmp / 'matcher.joblib')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        matching._matcher = None
+
+    def test_found_report_matches_lost_reports(self):
+        found = self.report('Found black wallet', 'Leather wallet near the desk', 'found', self.finder)
+        matches = matching.find_matches(found)
+        self.assertEqual([item for item, _ in matches], [self.wallet])
+        self.assertGreater(matches[0][1], 0.2)
+        # Reports of the same status are never matched with each other
+        self.assertEqual(matching.find_matches(self.wallet), [(found, matches[0][1])])
+        self.assertEqual(matching.find_matches(self.umbrella), [])
+
+    def test_sync_reconciles_reports_deleted_by_other_processes(self):
+        other_worker = matching.ItemMatcher()
+        other_worker.sync()
+        self.assertEqual(set(other_worker.items), {self.wallet.id, self.umbrella.id})
+
+        LostItem.objects.filter(id=self.wallet.id).delete()
+        claimed = LostItem.objects.get(id=self.umbrella.id)
+        claimed.status = 'claimed'
+        claimed.save()
+        other_worker.sync()
+        self.assertEqual(other_worker.items, {})
+        self.assertEqual(int(other_worker.doc_freq.sum()), 0)
+
+    def test_notify_matches(self):
+        found = self.report('Found black wallet', 'Leather wallet near the desk', 'found', self.finder)
+        own_report = self.report('Black wallet', 'Leather', 'lost', self.finder)
+        matching.notify_matches(found, [(self.wallet, 0.8), (own_report, 0.5)])
+        self.assertEqual(Notification.objects.filter(user=self.finder).count(), 1)
+        notification = Notification.objects.get(user=self.owner)
+        self.assertEqual(notification.link, f'/lost-found/{found.id}/')
+        self.assertIn('Found black wallet', notification.message)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.unread_count, 1)
+
+        matching.notify_matches(found, [])
+        self.assertEqual(Notification.objects.count(), 2)
@@ -1,9 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.http import Http404
 from .models import LostItem
+from .matching import find_matches, notify_matches
+from .imagehash import find_similar_images
+from caching.conditional import conditional_page
+from caching.versions import cached
 from django import forms
 
+ITEM_CACHE_MODELS = ('lost_found.LostItem', 'users.User')
+
 class LostItemForm(forms.ModelForm):
     class Meta:
         model = LostItem
@@ -13,8 +21,11 @@ class LostItemForm(forms.ModelForm):
         }
 
 @login_required
+@conditional_page(*ITEM_CACHE_MODELS)
 def item_list(request):
-    items = LostItem.objects.all().order_by('-created_at')
+    items = cached('lost_found:list', ITEM_CACHE_MODELS, lambda: list(
+        LostItem.objects.select_related('user').order_by('-created_at')
+    ))
     return render(request, 'lost_found/list.html', {'items': items})
 
 @login_required
@@ -25,6 +36,11 @@ def create_item(request):
             item = form.save(commit=False)
             item.user = request.user
             item.save()
+            matches = find_matches(item)
+            if matches:
+                notify_matches(item, matches)
+                messages.success(request, f'Item reported successfully! We found {len(matches)} possible match(es).')
+                return redirect('lost_found:detail', item_id=item.id)
             messages.success(request, 'Item reported successfully!')
             return redirect('lost_found:list')
     else:
@@ -32,9 +48,18 @@ def create_item(request):
     return render(request, 'lost_found/form.html', {'form': form, 'title': 'Report Item'})
 
 @login_required
+@conditional_page(*ITEM_CACHE_MODELS)
 def item_detail(request, item_id):
-    item = get_object_or_404(LostItem, id=item_id)
-    return render(request, 'lost_found/detail.html', {'item': item})
+    item = cached(f'lost_found:detail:{item_id}', ITEM_CACHE_MODELS, lambda: (
+        LostItem.objects.select_related('user').filter(id=item_id).first()
+    ))
+    if item is None:
+        raise Http404('No LostItem matches the given query.')
+    return render(request, 'lost_found/detail.html', {
+        'item': item,
+        'matches': find_matches(item),
+        'similar_images': find_similar_images(item, max_distance=settings.LOST_FOUND_IMAGE_MATCH_DISTANCE),
+    })
 
 @login_required
 def update_item(request, item_id):
@@ -0,0 +1,217 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .documents import DOCUMENTS, KIND_LABELS
+
+# Control characters that cannot appear in user text, used to delimit
+# highlighted terms until the snippet has been HTML-escaped
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+REBUILD_CHUNK_SIZE = 2000
+
+
+def search_terms(query):
+    """Split free text into plain word tokens, dropping any query syntax"""
+    return re.findall(r'\w+', query or '')[:16]
+
+
+def highlight(snippet):
+    """Escape a backend snippet and turn the match delimiters into <mark> tags"""
+    escaped = escape(snippet or '')
+    return mark_safe(escaped.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+
+class SearchBackend:
+    """
+    Base class for full-text search backends.
+
+    Backends own a single search_index table holding one row per indexed
+    object, keyed by SearchDocument.rowid().
+    """
+
+    def install(self, schema_editor=None):
+        raise NotImplementedError
+
+    def uninstall(self, schema_editor=None):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS search_index')
+
+    def index(self, document, obj):
+        raise NotImplementedError
+
+    def remove(self, document, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_index WHERE rowid = %s', [document.rowid(object_id)])
+
+    def bulk_insert(self, cursor, rows):
+        raise NotImplementedError
+
+    def optimize(self):
+        pass
+
+    def rebuild(self, kinds=None):
+        """Re-index every row of the given kinds (all kinds by default)"""
+        documents = [DOCUMENTS[kind] for kind in (kinds or DOCUMENTS)]
+        counts = {}
+        for document in documents:
+            fields = ['id', document.title_field] + document.body_fields
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('DELETE FROM search_index WHERE kind = %s', [document.kind])
+                rows = []
+                counts[document.kind] = 0
+                for values in document.model._default_manager.values_list(*fields).iterator(chunk_size=REBUILD_CHUNK_SIZE):
+                    object_id, title = values[0], values[1] or ''
+                    body = '\n'.join(value or '' for value in values[2:])
+                    rows.append((document.rowid(object_id), document.kind, object_id, title, body))
+                    if len(rows) >= REBUILD_CHUNK_SIZE:
+                        self.bulk_insert(cursor, rows)
+                        counts[document.kind] += len(rows)
+                        rows = []
+                if rows:
+                    self.bulk_insert(cursor, rows)
+                    counts[document.kind] += len(rows)
+        self.optimize()
+        return counts
+
+    def query(self, terms, kinds, limit, offset):
+        raise NotImplementedError
+
+    def search(self, query, kinds=None, limit=20, offset=0):
+        """Return ranked results as dicts with kind, title, snippet and url"""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        kinds = [kind for kind in (kinds or []) if kind in DOCUMENTS]
+        results = []
+        for kind, object_id, title, snippet in self.query(terms, kinds, limit, offset):
+            document = DOCUMENTS[kind]
+            results.append({
+                'kind': kind,
+                'label': KIND_LABELS[kind],
+                'object_id': object_id,
+                'title': title,
+                'snippet': highlight(snippet),
+                'url': document.url(object_id),
+            })
+        return results
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """Search backed by an SQLite FTS5 virtual table ranked with bm25"""
+
+    def install(self, schema_editor=None):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+                "kind UNINDEXED, object_id UNINDEXED, title, body, "
+                "tokenize = 'porter unicode61')"
+            )
+            # Weight title matches well above body matches; ORDER BY rank then
+            # uses this bm25 configuration without computing it in the query
+            cursor.execute(
+                "INSERT INTO search_index(search_index, rank) "
+                "VALUES ('rank', 'bm25(0.0, 0.0, 10.0, 1.0)')"
+            )
+
+    def index(self, document, obj):
+        rowid = document.rowid(obj.pk)
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM search_index WHERE rowid = %s', [rowid])
+            cursor.execute(
+                'INSERT INTO search_index (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+                [rowid, document.kind, obj.pk, document.title(obj), document.body(obj)],
+            )
+
+    def bulk_insert(self, cursor, rows):
+        cursor.executemany(
+            'INSERT INTO search_index (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+    def query(self, terms, kinds, limit, offset):
+        # Quote every term so user input can never be parsed as FTS5 syntax,
+        # and prefix-match the last one so partially typed words still hit
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        sql = (
+            "SELECT kind, object_id, title, "
+            f"snippet(search_index, 3, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '...', 24) "
+            "FROM search_index WHERE search_index MATCH %s"
+        )
+        params = [match]
+        if kinds:
+            sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += kinds
+        sql += ' ORDER BY rank LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class PostgresBackend(SearchBackend):
+    """Search backed by a stored tsvector column with a GIN index, ranked with ts_rank"""
+
+    def install(self, schema_editor=None):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS search_index ("
+                "rowid bigint PRIMARY KEY, kind varchar(20) NOT NULL, object_id bigint NOT NULL, "
+                "title text NOT NULL, body text NOT NULL, "
+                "document tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('english', title), 'A') || "
+                "setweight(to_tsvector('english', body), 'B')) STORED)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS search_index_document_idx ON search_index USING GIN (document)"
+            )
+
+    def index(self, document, obj):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO search_index (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s) '
+                'ON CONFLICT (rowid) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body',
+                [document.rowid(obj.pk), document.kind, obj.pk, document.title(obj), document.body(obj)],
+            )
+
+    def bulk_insert(self, cursor, rows):
+        cursor.executemany(
+            'INSERT INTO search_index (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+    def query(self, terms, kinds, limit, offset):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        sql = (
+            "SELECT kind, object_id, title, "
+            f"ts_headline('english', body, q, 'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24') "
+            "FROM search_index, to_tsquery('english', %s) q WHERE document @@ q"
+        )
+        params = [tsquery]
+        if kinds:
+            sql += ' AND kind = ANY(%s)'
+            params.append(kinds)
+        sql += ' ORDER BY ts_rank(document, q) DESC LIMIT %s OFFSET %s'
+        params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def get_backend():
+    """Instantiate SEARCH_BACKEND, defaulting to the one matching the database vendor"""
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    return SQLiteFTS5Backend()
@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.urls import reverse
+
+
+class SearchDocument:
+    """Describes how rows of one model are flattened into the search index"""
+
+    def __init__(self, kind, code, model, title_field, body_fields, url_name, url_kwarg):
+        self.kind = kind
+        self.code = code
+        self.model_label = model
+        self.title_field = title_field
+        self.body_fields = body_fields
+        self.url_name = url_name
+        self.url_kwarg = url_kwarg
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def rowid(self, object_id):
+        # Interleave the kinds into one integer key so updates and deletes hit
+        # the index's rowid directly instead of scanning for (kind, object_id)
+        return object_id * len(DOCUMENTS) + self.code
+
+    def title(self, obj):
+        return getattr(obj, self.title_field) or ''
+
+    def body(self, obj):
+        return '\n'.join(getattr(obj, field) or '' for field in self.body_fields)
+
+    def url(self, object_id):
+        return reverse(self.url_name, kwargs={self.url_kwarg: object_id})
+
+
+DOCUMENTS = {
+    'event': SearchDocument('event', 0, 'events.Event', 'title', ['description', 'location'], 'events:detail', 'event_id'),
+    'club': SearchDocument('club', 1, 'clubs.Club', 'name', ['description'], 'clubs:detail', 'club_id'),
+    'lost_item': SearchDocument('lost_item', 2, 'lost_found.LostItem', 'title', ['description', 'location'], 'lost_found:detail', 'item_id'),
+    'feedback': SearchDocument('feedback', 3, 'feedback.Feedback', 'title', ['description'], 'feedback:detail', 'feedback_id'),
+}
+
+KIND_LABELS = {
+    'event': 'Event',
+    'club': 'Club',
+    'lost_item': 'Lost & Found',
+    'feedback': 'Feedback',
+}
+
+
+def document_for_model(model):
+    for document in DOCUMENTS.values():
+        if document.model is model:
+            return document
+    return None
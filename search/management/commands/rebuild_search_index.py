@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.backends import get_backend
+from search.documents import DOCUMENTS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the events, clubs, lost_found and feedback tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f'Kinds to re-index ({", ".join(DOCUMENTS)}); all by default')
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(DOCUMENTS)
+        if unknown:
+            raise CommandError(f'Unknown kinds: {", ".join(sorted(unknown))}')
+
+        counts = get_backend().rebuild(options['kinds'] or None)
+        for kind, count in counts.items():
+            self.stdout.write(f'Indexed {count} {kind} rows')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
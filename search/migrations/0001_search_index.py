@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from search.backends import get_backend
+
+    get_backend().install(schema_editor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from search.backends import get_backend
+
+    get_backend().uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
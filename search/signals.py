@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+
+from .backends import get_backend
+from .documents import DOCUMENTS
+
+
+def index_object(sender, instance, **kwargs):
+    """Re-index a searchable object whenever it is saved"""
+    if kwargs.get('raw'):
+        return
+    document = _documents_by_model[sender]
+    get_backend().index(document, instance)
+
+
+def unindex_object(sender, instance, **kwargs):
+    document = _documents_by_model[sender]
+    get_backend().remove(document, instance.pk)
+
+
+_documents_by_model = {}
+
+for document in DOCUMENTS.values():
+    _documents_by_model[document.model] = document
+    post_save.connect(index_object, sender=document.model, dispatch_uid=f'search_index_{document.kind}')
+    post_delete.connect(unindex_object, sender=document.model, dispatch_uid=f'search_unindex_{document.kind}')
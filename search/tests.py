@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from clubs.models import Club
+from events.models import Event
+from feedback.models import Feedback
+from lost_found.models import LostItem
+from users.models import User
+
+from .views import SEARCH_MAX_PAGE
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student', role='student')
+        start = timezone.now() + timedelta(days=3)
+        cls.event = Event.objects.create(
+            title='Robotics workshop', description='Build a line follower', location='Lab 2',
+            start_date=start, end_date=start + timedelta(hours=2), organizer=cls.user,
+        )
+        cls.mention = Event.objects.create(
+            title='Career fair', description='Recruiters from robotics companies', location='Hall',
+            start_date=start, end_date=start + timedelta(hours=2), organizer=cls.user,
+        )
+        cls.club = Club.objects.create(name='Robotics Club', description='Weekly build nights', president=cls.user)
+        cls.item = LostItem.objects.create(title='Robotics kit', description='Blue box', location='Lab 2',
+                                           date=date.today(), user=cls.user)
+        cls.feedback = Feedback.objects.create(title='Robotics lab hours', description='Open longer please',
+                                               category='facilities', user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, **params):
+        return self.client.get(reverse('search:api'), params).json()
+
+    def test_title_matches_rank_above_body_matches(self):
+        results = self.search(q='robotics', type='event')['results']
+        self.assertEqual([result['id'] for result in results], [self.event.id, self.mention.id])
+        self.assertIn('<mark>', self.search(q='follower')['results'][0]['snippet'])
+
+    def test_kind_filters(self):
+        expected = {
+            'event': {self.event.id, self.mention.id},
+            'club': {self.club.id},
+            'lost_item': {self.item.id},
+            'feedback': {self.feedback.id},
+        }
+        for kind, ids in expected.items():
+            results = self.search(q='robotics', type=kind)['results']
+            self.assertEqual({result['kind'] for result in results}, {kind})
+            self.assertEqual({result['id'] for result in results}, ids)
+        self.assertEqual(len(self.search(q='robotics')['results']), 5)
+        # Unknown kinds are ignored rather than matching nothing
+        self.assertEqual(len(self.search(q='robotics', type='bogus')['results']), 5)
+
+    def test_huge_page_numbers_are_capped(self):
+        response = self.client.get(reverse('search:api'), {'q': 'robotics', 'page': '9' * 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['page'], SEARCH_MAX_PAGE)
+        self.assertFalse(response.json()['has_next'])
+        self.assertEqual(self.client.get(reverse('search:search'), {'q': 'robotics', 'page': 'x'}).status_code, 200)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.club.name = 'Chess Club'
+        self.club.save()
+        self.assertEqual(self.search(q='chess')['results'][0]['id'], self.club.id)
+        self.assertNotIn(self.club.id, [result['id'] for result in self.search(q='robotics', type='club')['results']])
+
+        item_id = self.item.id
+        self.item.delete()
+        self.assertEqual(self.search(q='robotics', type='lost_item')['results'], [])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM search_index WHERE kind = 'lost_item' AND object_id = %s", [item_id])
+            self.assertEqual(cursor.fetchone()[0], 0)
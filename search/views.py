@@ -0,0 +1,59 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from .backends import get_backend
+from .documents import KIND_LABELS
+
+SEARCH_PAGE_SIZE = 20
+# Deeper pages are never useful, and a huge page number would overflow the OFFSET
+SEARCH_MAX_PAGE = 50
+
+
+def _search(request):
+    query = request.GET.get('q', '').strip()
+    kinds = request.GET.getlist('type')
+    try:
+        page = min(max(int(request.GET.get('page', 1)), 1), SEARCH_MAX_PAGE)
+    except ValueError:
+        page = 1
+    results = get_backend().search(
+        query,
+        kinds=kinds,
+        limit=SEARCH_PAGE_SIZE + 1,
+        offset=(page - 1) * SEARCH_PAGE_SIZE,
+    )
+    has_next = len(results) > SEARCH_PAGE_SIZE and page < SEARCH_MAX_PAGE
+    return query, kinds, page, results[:SEARCH_PAGE_SIZE], has_next
+
+@login_required
+def search(request):
+    """Global search across events, clubs, lost items and feedback"""
+    query, kinds, page, results, has_next = _search(request)
+    return render(request, 'search/results.html', {
+        'query': query,
+        'kinds': kinds,
+        'kind_labels': KIND_LABELS,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+    })
+
+@login_required
+def search_api(request):
+    query, kinds, page, results, has_next = _search(request)
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'has_next': has_next,
+        'results': [
+            {
+                'kind': result['kind'],
+                'id': result['object_id'],
+                'title': result['title'],
+                'snippet': str(result['snippet']),
+                'url': result['url'],
+            }
+            for result in results
+        ],
+    })
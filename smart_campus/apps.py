@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SmartCampusConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "smart_campus"
+
+    def ready(self):
+        # Connect the SQLite connection_created tuning before any connection is opened
+        from . import db  # noqa: F401
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.backends.signals import connection_created
+
+try:
+    import fcntl
+except ImportError:  # Windows: serialise threads of one process only
+    fcntl = None
+
+# Applied to every new SQLite connection unless SQLITE_PRAGMAS overrides them.
+# WAL lets readers run alongside the single writer, NORMAL sync is durable in
+# WAL mode except against power loss, and busy_timeout makes a blocked writer
+# wait for the lock instead of failing with "database is locked".
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,
+    'cache_size': -32000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver tuning each new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    # An alias may carry its own PRAGMAS, e.g. a read-only replica snapshot
+    pragmas = connection.settings_dict.get('PRAGMAS', sqlite_pragmas())
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+connection_created.connect(configure_sqlite, dispatch_uid='smart_campus.db.configure_sqlite')
+
+
+class FileWriteLock:
+    """
+    Exclusive lock shared by every process that opens the same lock file.
+
+    Waiting processes block in flock() and are woken when the holder
+    releases it, instead of polling SQLite's busy handler, so a burst of
+    writes drains as a queue. A thread lock serialises threads of the same
+    process, which share the lock file descriptor.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        # Opened lazily and again after a fork: gunicorn workers must not share a descriptor
+        if self._fd is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file(), fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file(), fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+_write_lock = None
+_write_lock_guard = threading.Lock()
+_held = threading.local()
+
+
+def get_write_lock():
+    """The process-wide FileWriteLock, or None when SQLITE_WRITE_LOCK is off"""
+    global _write_lock
+    path = getattr(settings, 'SQLITE_WRITE_LOCK', None)
+    if not path or default_connection.vendor != 'sqlite':
+        return None
+    with _write_lock_guard:
+        if _write_lock is None or _write_lock.path != str(path):
+            _write_lock = FileWriteLock(path)
+        return _write_lock
+
+
+class serialized_writes(ContextDecorator):
+    """
+    Run a block of database writes while holding the cross-process write lock.
+
+    Usable as a decorator or context manager and re-entrant within a thread.
+    A no-op unless SQLITE_WRITE_LOCK is set. Inside an already open
+    transaction the lock is not taken: with transaction_mode IMMEDIATE that
+    transaction holds SQLite's own write lock, and waiting for the file lock
+    while holding it could stall a process that holds the file lock.
+    """
+
+    def __enter__(self):
+        depth = getattr(_held, 'depth', 0)
+        if depth == 0:
+            lock = None if default_connection.in_atomic_block else get_write_lock()
+            if lock is not None:
+                lock.acquire()
+            _held.lock = lock
+        _held.depth = depth + 1
+        return self
+
+    def __exit__(self, *exc_info):
+        _held.depth -= 1
+        if _held.depth == 0 and _held.lock is not None:
+            _held.lock.release()
+            _held.lock = None
+        return False
+
+
+def refresh_sqlite_snapshot(source, target):
+    """
+    Copy the SQLite database `source` to `target` as a consistent snapshot.
+
+    The online backup API copies a single point in time while writers keep
+    going. The copy is switched to rollback-journal mode, so readers need no
+    -wal file, and is renamed over `target` so open readers keep the old
+    snapshot until they reconnect.
+    """
+    target = str(target)
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    partial = f'{target}.partial'
+    source_db = sqlite3.connect(str(source))
+    snapshot_db = sqlite3.connect(partial)
+    try:
+        source_db.backup(snapshot_db)
+        snapshot_db.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        snapshot_db.close()
+        source_db.close()
+    os.replace(partial, target)
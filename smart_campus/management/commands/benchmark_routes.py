@@ -0,0 +1,311 @@
+import json
+import http.client
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from clubs.models import Club
+from events.models import Event
+from feedback.models import Feedback
+from lost_found.models import LostItem
+from users.models import Notification, PermissionRequest, User
+
+ROLES = ['student', 'faculty', 'admin']
+
+# Routes that change data or the session on GET, do not accept GET at all,
+# or run the CBC solver for up to SCHEDULER_TIME_LIMIT seconds per GET.
+# Driving them concurrently would change the dataset between runs or time
+# the solver rather than the page.
+UNSAFE_ROUTES = {
+    'users:logout',
+    'users:logout_simple',
+    'users:mark_notification_read',
+    'users:approve_permission',
+    'users:reject_permission',
+    'users:schedule_permission_requests',
+    'events:attend',
+    'events:attend_occurrence',
+    'events:ajax_delete',
+    'clubs:join',
+}
+SKIPPED_NAMESPACES = {'admin'}
+
+# URL kwarg -> model whose newest row fills it
+PARAM_MODELS = {
+    'event_id': Event,
+    'club_id': Club,
+    'item_id': LostItem,
+    'feedback_id': Feedback,
+    'request_id': PermissionRequest,
+    'notification_id': Notification,
+}
+
+_SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def discover_routes(patterns=None, namespace=None):
+    """Yield (url name, kwarg names) for every named route reachable from ROOT_URLCONF"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            child = pattern.namespace
+            if child in SKIPPED_NAMESPACES:
+                continue
+            if child:
+                child = f'{namespace}:{child}' if namespace else child
+            yield from discover_routes(pattern.url_patterns, child or namespace)
+        elif pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            yield name, list(getattr(pattern.pattern, 'converters', {}))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Time the view itself, not the page it redirects to
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+FETCH_TIMEOUT = 60
+
+
+def fetch(url, cookie):
+    """
+    Return (status, seconds, query count or None) for one GET.
+
+    A request that gets no response (refused, reset or timed out) is
+    recorded with the status 'error' instead of stopping the run.
+    """
+    request = urllib.request.Request(url, headers={'Cookie': cookie})
+    started = time.perf_counter()
+    try:
+        with _opener.open(request, timeout=FETCH_TIMEOUT) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    # URLError and socket timeouts are OSErrors; a truncated body is an HTTPException
+    except (OSError, http.client.HTTPException):
+        return 'error', time.perf_counter() - started, None
+    elapsed = time.perf_counter() - started
+    match = _SERVER_TIMING_QUERIES.search(headers.get('Server-Timing', ''))
+    return status, elapsed, int(match.group(1)) if match else None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every named route under concurrent load and check the results against BENCHMARK_BUDGETS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per route and role')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per route and role')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--workers', type=int, default=4, help='Gunicorn worker processes')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--base-url', help='Benchmark an already running server instead of starting gunicorn')
+        parser.add_argument('--roles', nargs='+', choices=ROLES, default=ROLES)
+        parser.add_argument('--routes', nargs='+', help='Only these URL names, e.g. events:list clubs:detail')
+        parser.add_argument('--output', help='Where to write the JSON report (default var/benchmarks/<commit>.json)')
+        parser.add_argument('--budgets', help='JSON file of budgets overriding BENCHMARK_BUDGETS')
+
+    def handle(self, *args, **options):
+        budgets = dict(getattr(settings, 'BENCHMARK_BUDGETS', {}))
+        if options['budgets']:
+            with open(options['budgets']) as fp:
+                budgets.update(json.load(fp))
+
+        users = self.role_users(options['roles'])
+        routes, skipped = self.plan_routes(options['routes'])
+        sessions = {role: self.login(user) for role, user in users.items()}
+
+        server = None
+        base_url = options['base_url']
+        if not base_url:
+            base_url = f'http://127.0.0.1:{options["port"]}'
+            server = self.start_gunicorn(options['port'], options['workers'])
+        try:
+            results = []
+            for name, path in routes:
+                for role, session in sessions.items():
+                    cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+                    result = self.benchmark(base_url + path, cookie, options)
+                    result.update(route=name, path=path, role=role)
+                    result['failures'] = self.check_budget(result, budgets.get(name, budgets.get('default', {})))
+                    results.append(result)
+                    self.print_result(result)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+            for session in sessions.values():
+                session.delete()
+
+        commit = self.git_commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'created_at': timezone.now().isoformat(),
+                'base_url': base_url,
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'workers': None if options['base_url'] else options['workers'],
+                'dataset': {model.__name__: model.objects.count() for model in [
+                    User, Event, Club, LostItem, Notification, PermissionRequest, Feedback,
+                ]},
+            },
+            'results': results,
+            'skipped': skipped,
+        }
+        output = Path(options['output'] or settings.BASE_DIR / 'var' / 'benchmarks' / f'{commit or "working"}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, sort_keys=True))
+        self.stdout.write(f'Report written to {output}')
+
+        failed = [result for result in results if result['failures']]
+        if failed:
+            for result in failed:
+                self.stderr.write(f'{result["route"]} ({result["role"]}): {"; ".join(result["failures"])}')
+            raise CommandError(f'{len(failed)} route benchmark(s) over budget.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} route benchmarks within budget.'))
+
+    def role_users(self, roles):
+        users = {}
+        for role in roles:
+            user = User.objects.filter(role=role, is_active=True).order_by('id').first()
+            if user is None:
+                self.stderr.write(f'No active {role} user; skipping that role. Run seed_campus first.')
+                continue
+            users[role] = user
+        if not users:
+            raise CommandError('No users to benchmark as.')
+        return users
+
+    def plan_routes(self, only=None):
+        """Resolve each route's URL with sample objects; return (routes, skipped)"""
+        samples = {
+            param: model.objects.order_by('-id').values_list('id', flat=True).first()
+            for param, model in PARAM_MODELS.items()
+        }
+        routes, skipped = [], []
+        for name, params in discover_routes():
+            if only and name not in only:
+                continue
+            if name in UNSAFE_ROUTES:
+                skipped.append({'route': name, 'reason': 'changes data on GET'})
+                continue
+            kwargs = {param: samples.get(param) for param in params}
+            missing = [param for param, value in kwargs.items() if value is None]
+            if missing:
+                skipped.append({'route': name, 'reason': f'no sample for {", ".join(missing)}'})
+                continue
+            routes.append((name, reverse(name, kwargs=kwargs)))
+        return routes, skipped
+
+    def login(self, user):
+        """Create a session for `user` directly, the way the test client's force_login does"""
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    def start_gunicorn(self, port, workers):
+        log_path = settings.BASE_DIR / 'var' / 'benchmarks' / 'gunicorn.log'
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        # The profiling middleware reports each request's query count in Server-Timing
+        env = dict(os.environ, PROFILING_ENABLED='1', PROFILING_SAMPLE_RATE='1.0', PROFILING_PUBLIC_HEADER='1')
+        with open(log_path, 'w') as log:
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', 'smart_campus.wsgi',
+                 '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+                cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with status {server.returncode}; see {log_path}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'gunicorn did not start listening on port {port}; see {log_path}')
+
+    def benchmark(self, url, cookie, options):
+        for _ in range(options['warmup']):
+            fetch(url, cookie)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            samples = list(pool.map(lambda _: fetch(url, cookie), range(options['requests'])))
+        wall = time.perf_counter() - started
+
+        latencies = sorted(elapsed * 1000 for _, elapsed, _ in samples)
+        queries = [count for _, _, count in samples if count is not None]
+        statuses = {}
+        for status, _, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'statuses': statuses,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'throughput_rps': round(len(samples) / wall, 2),
+            'queries': max(queries) if queries else None,
+        }
+
+    def check_budget(self, result, budget):
+        failures = []
+        errors = sum(count for status, count in result['statuses'].items() if status.startswith('5'))
+        if errors:
+            failures.append(f'{errors} server error(s)')
+        if result['statuses'].get('error'):
+            failures.append(f'{result["statuses"]["error"]} request(s) without a response')
+        if 'p95_ms' in budget and result['p95_ms'] > budget['p95_ms']:
+            failures.append(f'p95 {result["p95_ms"]}ms > {budget["p95_ms"]}ms')
+        if 'queries' in budget and result['queries'] is not None and result['queries'] > budget['queries']:
+            failures.append(f'{result["queries"]} queries > {budget["queries"]}')
+        return failures
+
+    def print_result(self, result):
+        line = (
+            f'{result["route"]:<36} {result["role"]:<8} '
+            f'p50 {result["p50_ms"]:>8.1f}ms  p95 {result["p95_ms"]:>8.1f}ms  p99 {result["p99_ms"]:>8.1f}ms  '
+            f'{result["throughput_rps"]:>7.1f} req/s  {result["queries"]} queries  {result["statuses"]}'
+        )
+        self.stdout.write(self.style.ERROR(line) if result['failures'] else line)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,149 @@
+import multiprocessing
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from events.models import Event
+from smart_campus.db import FileWriteLock, apply_pragmas, sqlite_pragmas
+from users.models import Notification, User
+
+# name -> (pragmas, BEGIN statement, use the file write lock)
+PROFILES = {
+    'default': ({'journal_mode': 'DELETE'}, 'BEGIN', False),
+    'tuned': (None, 'BEGIN IMMEDIATE', False),
+    'serialized': (None, 'BEGIN IMMEDIATE', True),
+}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+
+def _worker(path, pragmas, begin, lock_path, duration, seed, tables, event_ids, user_ids, results):
+    """Mixed attendance toggles, notification inserts and reads until the deadline"""
+    rng = random.Random(seed)
+    lock = FileWriteLock(lock_path) if lock_path else None
+    # Python's sqlite3 default timeout (5s) is what Django uses without OPTIONS
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(db.cursor(), pragmas)
+    attendees, notifications, users = tables
+    reads, writes, errors, latencies = 0, 0, 0, []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        event_id, user_id = rng.choice(event_ids), rng.choice(user_ids)
+        roll = rng.random()
+        if roll >= 0.8:
+            db.execute(f'SELECT COUNT(*) FROM {attendees} WHERE event_id = ?', (event_id,)).fetchone()
+            reads += 1
+            continue
+        started = time.perf_counter()
+        if lock:
+            lock.acquire()
+        try:
+            db.execute(begin)
+            if roll < 0.5:
+                exists = db.execute(
+                    f'SELECT 1 FROM {attendees} WHERE event_id = ? AND user_id = ?', (event_id, user_id),
+                ).fetchone()
+                if exists:
+                    db.execute(f'DELETE FROM {attendees} WHERE event_id = ? AND user_id = ?', (event_id, user_id))
+                else:
+                    db.execute(f'INSERT INTO {attendees} (event_id, user_id) VALUES (?, ?)', (event_id, user_id))
+            else:
+                db.execute(
+                    f'INSERT INTO {notifications} (user_id, title, message, link, is_read, created_at) '
+                    "VALUES (?, 'Benchmark', 'Benchmark', NULL, 0, datetime('now'))", (user_id,),
+                )
+                db.execute(f'UPDATE {users} SET unread_count = unread_count + 1 WHERE id = ?', (user_id,))
+            db.execute('COMMIT')
+            writes += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        except sqlite3.OperationalError:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            errors += 1
+        finally:
+            if lock:
+                lock.release()
+    db.close()
+    results.put((reads, writes, errors, latencies))
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent SQLite write throughput with the default and tuned connection settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Concurrent writer processes')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+        parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('benchmark_sqlite only runs against a SQLite database.')
+        event_ids = list(Event.objects.values_list('id', flat=True)[:2000])
+        user_ids = list(User.objects.values_list('id', flat=True)[:5000])
+        if not event_ids or not user_ids:
+            raise CommandError('The database needs events and users; run seed_campus first.')
+        tables = (
+            connection.ops.quote_name(Event.attendees.through._meta.db_table),
+            connection.ops.quote_name(Notification._meta.db_table),
+            connection.ops.quote_name(User._meta.db_table),
+        )
+        connection.close()
+
+        scratch = Path(tempfile.mkdtemp(prefix='benchmark-sqlite-'))
+        try:
+            for name in options['profiles']:
+                pragmas, begin, locked = PROFILES[name]
+                # Each profile runs on its own copy, since journal_mode is stored in the file
+                path = scratch / f'{name}.sqlite3'
+                source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+                with sqlite3.connect(path) as target:
+                    source.backup(target)
+                source.close()
+                pragmas = sqlite_pragmas() if pragmas is None else pragmas
+                lock_path = scratch / f'{name}.lock' if locked else None
+                self.run_profile(name, str(path), pragmas, begin, lock_path, tables, event_ids, user_ids, options)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def run_profile(self, name, path, pragmas, begin, lock_path, tables, event_ids, user_ids, options):
+        # Set the persistent journal mode once, before the workers start
+        with sqlite3.connect(path) as db:
+            apply_pragmas(db.cursor(), {'journal_mode': pragmas.get('journal_mode', 'DELETE')})
+
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(
+                path, pragmas, begin, lock_path and str(lock_path), options['duration'],
+                options['seed'] + i, tables, event_ids, user_ids, results,
+            ))
+            for i in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        reads = sum(result[0] for result in collected)
+        writes = sum(result[1] for result in collected)
+        errors = sum(result[2] for result in collected)
+        latencies = [latency for result in collected for latency in result[3]]
+        duration = options['duration']
+        self.stdout.write(
+            f'{name:<11} {writes / duration:>8.1f} writes/s  {reads / duration:>8.1f} reads/s  '
+            f'{errors:>5} locked errors  write p50 {_percentile(latencies, 50):.1f}ms  '
+            f'p95 {_percentile(latencies, 95):.1f}ms  p99 {_percentile(latencies, 99):.1f}ms'
+        )
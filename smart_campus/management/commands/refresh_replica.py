@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from smart_campus.db import refresh_sqlite_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Refresh the SQLite snapshot replicas listed in DATABASE_REPLICAS from the primary database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep refreshing every N seconds (default: refresh once and exit)')
+        parser.add_argument('aliases', nargs='*', help='Replica aliases to refresh (default: DATABASE_REPLICAS)')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or getattr(settings, 'DATABASE_REPLICAS', [])
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Snapshots can only be taken of a SQLite primary.')
+        targets = []
+        for alias in aliases:
+            replica = settings.DATABASES.get(alias)
+            if replica is None:
+                raise CommandError(f'Unknown database alias "{alias}".')
+            if replica['ENGINE'] != 'django.db.backends.sqlite3':
+                self.stdout.write(f'Skipping {alias}: replicated by its database server.')
+                continue
+            targets.append((alias, replica['NAME']))
+        if not targets:
+            raise CommandError('No SQLite replicas to refresh; set DATABASE_REPLICAS or pass aliases.')
+
+        while True:
+            for alias, name in targets:
+                started = time.monotonic()
+                refresh_sqlite_snapshot(source['NAME'], name)
+                self.stdout.write(f'Refreshed {alias} in {time.monotonic() - started:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
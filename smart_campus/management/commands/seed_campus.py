@@ -0,0 +1,274 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from caching.versions import CACHED_MODELS, bump_version
+from clubs.models import Club
+from events.attendance import refresh_attendee_counts
+from events.conflicts import normalize_location
+from events.models import Event
+from feedback.models import Feedback
+from lost_found.models import LostItem
+from users.models import Notification, PermissionRequest, User
+from users.notifications import refresh_unread_counts
+
+DEFAULT_COUNTS = {
+    'users': 100_000,
+    'events': 20_000,
+    'clubs': 5_000,
+    'lost_items': 200_000,
+    'notifications': 1_000_000,
+    'permission_requests': 20_000,
+    'feedback': 50_000,
+}
+
+DEPARTMENTS = [
+    'Computer Science', 'Electronics', 'Mechanical', 'Civil', 'Mathematics',
+    'Physics', 'Management', 'Biotechnology', 'Architecture', 'Law',
+]
+LOCATIONS = [
+    'Main Auditorium', 'Seminar Hall A', 'Seminar Hall B', 'Library', 'Cafeteria',
+    'Sports Complex', 'Open Air Theatre', 'CS Lab 1', 'CS Lab 2', 'Admin Block',
+    'Hostel Block C', 'Parking Lot', 'Innovation Centre', 'Conference Room 3',
+]
+EVENT_KINDS = ['Workshop', 'Hackathon', 'Seminar', 'Meetup', 'Concert', 'Tournament', 'Expo', 'Talk', 'Bootcamp']
+TOPICS = [
+    'Machine Learning', 'Robotics', 'Cloud Computing', 'Photography', 'Chess', 'Debate',
+    'Startups', 'Cyber Security', 'Music', 'Dance', 'Football', 'Drama', 'Design', 'Finance',
+]
+ITEMS = [
+    'wallet', 'phone', 'keys', 'water bottle', 'umbrella', 'laptop charger', 'ID card',
+    'headphones', 'airpods', 'watch', 'backpack', 'calculator', 'notebook', 'jacket', 'spectacles',
+]
+COLOURS = ['black', 'blue', 'red', 'white', 'grey', 'green', 'brown', 'silver', 'pink']
+FEEDBACK_CATEGORIES = ['Infrastructure', 'Academics', 'Hostel', 'Canteen', 'Transport', 'Library', 'IT Services']
+WORDS = (
+    'campus students faculty session great please bring join team learn build share '
+    'hands on project ideas community open everyone welcome register limited seats '
+    'certificate prizes food networking experts guest speaker practical demo'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, deterministic synthetic campus dataset for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiply every default volume, e.g. 0.01 for a quick run')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk_create transaction')
+        parser.add_argument('--prefix', default='seed', help='Username prefix of generated users')
+        for name, count in DEFAULT_COUNTS.items():
+            parser.add_argument(f'--{name.replace("_", "-")}', type=int, default=None,
+                                help=f'Number of {name.replace("_", " ")} (default {count:,} x scale)')
+        parser.add_argument('--skip-index', action='store_true',
+                            help='Do not rebuild the search index afterwards')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.now = timezone.now()
+        counts = {
+            name: options[name] if options[name] is not None else int(count * options['scale'])
+            for name, count in DEFAULT_COUNTS.items()
+        }
+        if counts['users'] < 10:
+            raise CommandError('At least 10 users are needed to build relationships.')
+        if User.objects.filter(username__startswith=f'{options["prefix"]}_').exists():
+            raise CommandError(f'Users prefixed "{options["prefix"]}_" already exist; pass another --prefix.')
+
+        started = time.monotonic()
+        user_ids = self._timed('users', self.seed_users, counts['users'], options['prefix'])
+        staff_ids = list(User.objects.filter(id__in=user_ids, role__in=['faculty', 'admin']).values_list('id', flat=True))
+        self._timed('events', self.seed_events, counts['events'], user_ids, staff_ids)
+        self._timed('clubs', self.seed_clubs, counts['clubs'], user_ids, staff_ids)
+        self._timed('lost items', self.seed_lost_items, counts['lost_items'], user_ids)
+        self._timed('notifications', self.seed_notifications, counts['notifications'], user_ids)
+        self._timed('permission requests', self.seed_permission_requests, counts['permission_requests'], user_ids, staff_ids)
+        self._timed('feedback', self.seed_feedback, counts['feedback'], user_ids)
+        self._timed('denormalized counters', self.refresh_counters, user_ids)
+        if not options['skip_index']:
+            self._timed('search index', call_command, 'rebuild_search_index', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded campus in {time.monotonic() - started:.1f}s.'))
+
+    def _timed(self, label, func, *args, **kwargs):
+        started = time.monotonic()
+        result = func(*args, **kwargs)
+        self.stdout.write(f'  {label}: {time.monotonic() - started:.1f}s')
+        return result
+
+    def _bulk_create(self, model, rows, ids=False):
+        """
+        bulk_create an iterable of unsaved instances in chunked transactions.
+
+        Only one chunk is held at a time; with ids=True the primary keys of
+        the new rows are collected and returned.
+        """
+        created_ids = []
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                created_ids.extend(self._insert(model, batch, ids))
+                batch = []
+        if batch:
+            created_ids.extend(self._insert(model, batch, ids))
+        return created_ids if ids else None
+
+    def _insert(self, model, batch, ids):
+        with transaction.atomic():
+            objects = model.objects.bulk_create(batch)
+        return [obj.pk for obj in objects] if ids else []
+
+    def _sentence(self, words=12):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def _moment(self, past_days=730, future_days=180):
+        offset = self.rng.uniform(-past_days, future_days)
+        return self.now + timedelta(days=offset)
+
+    def seed_users(self, count, prefix):
+        # Hash once: running the password hasher 100k times would dominate the run
+        password = make_password('campus123')
+
+        def rows():
+            for i in range(count):
+                roll = self.rng.random()
+                role = 'admin' if roll < 0.005 else 'faculty' if roll < 0.08 else 'student'
+                yield User(
+                    username=f'{prefix}_{i}',
+                    email=f'{prefix}_{i}@campus.example',
+                    password=password,
+                    role=role,
+                    department=self.rng.choice(DEPARTMENTS),
+                    is_staff=role != 'student',
+                    can_create_events=role != 'student',
+                    can_create_clubs=role != 'student',
+                )
+        return self._bulk_create(User, rows(), ids=True)
+
+    def _attendance(self, owner_ids, user_ids, through, owner_field, popular=0.02, cap=2000):
+        """Bulk-insert M2M rows with a long tail: most rows small, a few very popular"""
+        def rows():
+            for owner_id in owner_ids:
+                size = self.rng.randint(0, 40)
+                if self.rng.random() < popular:
+                    size = self.rng.randint(200, cap)
+                for user_id in self.rng.sample(user_ids, min(size, len(user_ids))):
+                    yield through(**{owner_field: owner_id, 'user_id': user_id})
+        self._bulk_create(through, rows())
+
+    def seed_events(self, count, user_ids, staff_ids):
+        def rows():
+            for _ in range(count):
+                start = self._moment()
+                end = start + timedelta(hours=self.rng.choice([1, 2, 3, 4, 8]))
+                topic = self.rng.choice(TOPICS)
+                location = self.rng.choice(LOCATIONS)
+                yield Event(
+                    title=f'{topic} {self.rng.choice(EVENT_KINDS)}',
+                    description=self._sentence(30),
+                    location=location,
+                    # bulk_create skips Event.save(), which normally derives this
+                    location_key=normalize_location(location),
+                    start_date=start,
+                    end_date=end,
+                    # Also derived in save(); a single event's last occurrence is itself
+                    last_end=end,
+                    organizer_id=self.rng.choice(staff_ids or user_ids),
+                )
+        event_ids = self._bulk_create(Event, rows(), ids=True)
+        self._attendance(event_ids, user_ids, Event.attendees.through, 'event_id')
+        # Attendance rows were bulk inserted, so Event.attendee_count is still 0
+        for i in range(0, len(event_ids), self.chunk_size):
+            with transaction.atomic():
+                refresh_attendee_counts(event_ids[i:i + self.chunk_size])
+
+    def seed_clubs(self, count, user_ids, staff_ids):
+        def rows():
+            for i in range(count):
+                yield Club(
+                    name=f'{self.rng.choice(TOPICS)} Club {i}',
+                    description=self._sentence(25),
+                    president_id=self.rng.choice(user_ids),
+                )
+        club_ids = self._bulk_create(Club, rows(), ids=True)
+        self._attendance(club_ids, user_ids, Club.members.through, 'club_id', popular=0.05, cap=1000)
+
+    def seed_lost_items(self, count, user_ids):
+        def rows():
+            for _ in range(count):
+                item = self.rng.choice(ITEMS)
+                colour = self.rng.choice(COLOURS)
+                location = self.rng.choice(LOCATIONS)
+                yield LostItem(
+                    title=f'{colour.capitalize()} {item}',
+                    description=f'{colour} {item} near the {location.lower()}. {self._sentence(10)}',
+                    location=location,
+                    date=self._moment(past_days=365, future_days=0).date(),
+                    status=self.rng.choices(['lost', 'found', 'claimed'], weights=[5, 3, 2])[0],
+                    user_id=self.rng.choice(user_ids),
+                )
+        self._bulk_create(LostItem, rows())
+
+    def seed_notifications(self, count, user_ids):
+        def rows():
+            for _ in range(count):
+                yield Notification(
+                    user_id=self.rng.choice(user_ids),
+                    title=self.rng.choice(['Event reminder', 'New feedback', 'Club update', 'Permission request']),
+                    message=self._sentence(15),
+                    link='/events/',
+                    is_read=self.rng.random() < 0.7,
+                )
+        self._bulk_create(Notification, rows())
+
+    def seed_permission_requests(self, count, user_ids, staff_ids):
+        def rows():
+            for _ in range(count):
+                kind = self.rng.choice(['event_creation', 'club_creation'])
+                status = self.rng.choices(['pending', 'approved', 'rejected'], weights=[2, 5, 1])[0]
+                start = self._moment(past_days=60, future_days=120)
+                reviewed = status != 'pending'
+                yield PermissionRequest(
+                    user_id=self.rng.choice(user_ids),
+                    permission_type=kind,
+                    reason=self._sentence(20),
+                    event_title=f'{self.rng.choice(TOPICS)} {self.rng.choice(EVENT_KINDS)}' if kind == 'event_creation' else None,
+                    event_description=self._sentence(20) if kind == 'event_creation' else None,
+                    event_location=self.rng.choice(LOCATIONS) if kind == 'event_creation' else None,
+                    event_start_date=start if kind == 'event_creation' else None,
+                    event_end_date=start + timedelta(hours=2) if kind == 'event_creation' else None,
+                    status=status,
+                    reviewed_by_id=self.rng.choice(staff_ids) if reviewed and staff_ids else None,
+                    reviewed_at=self.now if reviewed else None,
+                )
+        self._bulk_create(PermissionRequest, rows())
+
+    def seed_feedback(self, count, user_ids):
+        def rows():
+            for _ in range(count):
+                category = self.rng.choice(FEEDBACK_CATEGORIES)
+                yield Feedback(
+                    title=f'{category}: {self._sentence(5)}',
+                    description=self._sentence(40),
+                    category=category,
+                    status=self.rng.choice(['pending', 'in_progress', 'resolved']),
+                    user_id=self.rng.choice(user_ids),
+                )
+        self._bulk_create(Feedback, rows())
+
+    def refresh_counters(self, user_ids):
+        """bulk_create bypasses the signals that maintain denormalized counters and cache versions"""
+        for i in range(0, len(user_ids), self.chunk_size):
+            with transaction.atomic():
+                refresh_unread_counts(user_ids[i:i + self.chunk_size])
+        for label in CACHED_MODELS:
+            bump_version(label)
@@ -0,0 +1,71 @@
+import posixpath
+import re
+import urllib.request
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from smart_campus.staticfiles import VENDOR_ASSETS
+
+# The same references ManifestStaticFilesStorage rewrites; each one has to
+# exist locally or collectstatic fails.
+REFERENCE_PATTERNS = {
+    '.css': [
+        re.compile(r'url\(\s*["\']?([^"\')]+)["\']?\s*\)'),
+        re.compile(r'/\*#\s*sourceMappingURL=(\S+)\s*\*/'),
+    ],
+    '.js': [
+        re.compile(r'//#\s*sourceMappingURL=(\S+)'),
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Download the third-party CSS/JS in VENDOR_ASSETS, and the files they reference, into static/vendor/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download files that already exist again')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        root = Path(settings.STATICFILES_DIRS[0])
+        queue = [(path, url) for path, url in VENDOR_ASSETS.values()]
+        seen = set()
+        fetched = 0
+        while queue:
+            path, url = queue.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            target = root / path
+            if target.exists() and not options['force']:
+                data = target.read_bytes()
+            else:
+                data = self.download(url, options['timeout'])
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(data)
+                fetched += 1
+                self.stdout.write(f'{path} ({len(data) // 1024}K)')
+            queue.extend(self.references(path, url, data))
+        self.stdout.write(self.style.SUCCESS(f'{fetched} downloaded, {len(seen) - fetched} already present.'))
+
+    def download(self, url, timeout):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.read()
+        except OSError as exc:
+            raise CommandError(f'Could not download {url}: {exc}')
+
+    def references(self, path, url, data):
+        """Relative (path, url) pairs referenced from a downloaded CSS or JS file."""
+        patterns = REFERENCE_PATTERNS.get(posixpath.splitext(path)[1], [])
+        text = data.decode('utf-8', errors='replace')
+        for pattern in patterns:
+            for ref in pattern.findall(text):
+                ref = ref.strip()
+                if ref.startswith(('data:', '#', '/')) or urlsplit(ref).scheme:
+                    continue
+                ref = urlsplit(ref).path
+                yield posixpath.normpath(posixpath.join(posixpath.dirname(path), ref)), urljoin(url, ref)
@@ -0,0 +1,125 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('smart_campus.profiling')
+
+_active_profile = ContextVar('request_profile', default=None)
+
+# Collapse IN (%s, %s, ...) lists so queries that differ only in list length share a shape
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    """Normalise SQL so repeated executions of the same statement compare equal"""
+    sql = _PLACEHOLDER_LIST.sub('(%s, ...)', sql)
+    return _NUMBER.sub('N', sql)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.shapes = Counter()
+
+    def record_query(self, sql, duration):
+        self.query_count += 1
+        self.db_time += duration
+        self.shapes[query_shape(sql)] += 1
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def duplicates(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+class QueryProfilingMiddleware:
+    """
+    Record SQL count, DB time, template render time and wall time per request.
+
+    The numbers are returned as a Server-Timing header, which browser dev
+    tools show next to each request, and any SQL statement repeated more than
+    PROFILING_DUPLICATE_THRESHOLD times in one request (the signature of an
+    N+1 pattern in a template loop) is logged with the view's path.
+    Controlled by PROFILING_ENABLED and PROFILING_SAMPLE_RATE so it can run
+    on a fraction of production traffic. The header reveals how a page is
+    built, so it is only sent to staff, under DEBUG, or to everyone with
+    PROFILING_PUBLIC_HEADER. Template times come from the
+    smart_campus.template_backends.ProfilingDjangoTemplates backend.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._should_profile():
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _active_profile.set(profile)
+
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile.record_query(sql, time.perf_counter() - started)
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+                response = self.get_response(request)
+        finally:
+            _active_profile.reset(token)
+
+        self._report(request, response, profile)
+        return response
+
+    def _should_profile(self):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            return False
+        return random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+    def _expose_header(self, request):
+        if settings.DEBUG or getattr(settings, 'PROFILING_PUBLIC_HEADER', False):
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def _report(self, request, response, profile):
+        total_ms = profile.total_time * 1000
+        if self._expose_header(request):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.query_count} queries"',
+                f'tpl;dur={profile.template_time * 1000:.1f};desc="template render"',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        threshold = getattr(settings, 'PROFILING_DUPLICATE_THRESHOLD', 5)
+        for shape, count in profile.duplicates(threshold):
+            logger.warning(
+                'Repeated query on %s %s: %d executions of %s',
+                request.method, request.path, count, shape,
+            )
+
+        slow_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 500)
+        if total_ms > slow_ms:
+            logger.warning(
+                'Slow request %s %s: %.1fms total, %d queries in %.1fms, templates %.1fms',
+                request.method, request.path, total_ms,
+                profile.query_count, profile.db_time * 1000, profile.template_time * 1000,
+            )
@@ -0,0 +1,114 @@
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Outside a request (management commands, workers, tests) everything reads the primary
+_use_primary = ContextVar('use_primary', default=True)
+
+_WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send every ORM read inside the block to the primary.
+
+    Used wherever a result outlives the request, such as cache fills: a
+    lagging replica could otherwise store old rows under a version token
+    that promises new ones.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads made while serving a read-only request to a replica alias.
+
+    Reads go to the primary when ReplicaMiddleware has pinned the request:
+    an unsafe method, a write earlier in the same request, or a recent write
+    by the same browser (the sticky cookie). They also go to the primary
+    inside an open transaction, and for apps in REPLICA_EXCLUDED_APPS such
+    as sessions, which must never be read stale. Writes and migrations
+    always go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in getattr(settings, 'REPLICA_EXCLUDED_APPS', ['sessions']):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Decide per request whether ORM reads may use a replica.
+
+    Safe-method requests read from replicas unless the browser wrote within
+    the last REPLICA_STICKY_SECONDS. Once a request writes, the rest of it
+    reads the primary, and the response sets a cookie that keeps that
+    browser on the primary until the replicas have caught up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        cookie = getattr(settings, 'REPLICA_STICKY_COOKIE', 'primary_until')
+        token = _use_primary.set(request.method not in SAFE_METHODS or self._sticky(request, cookie))
+        wrote = False
+
+        def detect_writes(execute, sql, params, many, context):
+            nonlocal wrote
+            if _WRITE_STATEMENT.match(sql):
+                wrote = True
+                _use_primary.set(True)
+            return execute(sql, params, many, context)
+
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(detect_writes):
+                response = self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+
+        if wrote:
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 60)
+            response.set_cookie(cookie, str(int(time.time() + seconds)), max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+    def _sticky(self, request, cookie):
+        try:
+            return float(request.COOKIES.get(cookie, 0)) > time.time()
+        except ValueError:
+            return False
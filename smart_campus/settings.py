@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import datetime
 import os
 from pathlib import Path
 
@@ -37,6 +38,8 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
+    # Serve static files through WhiteNoise under runserver too
+    "whitenoise.runserver_nostatic",
     "django.contrib.staticfiles",
     # Custom apps
     "users",
@@ -44,10 +47,19 @@ INSTALLED_APPS = [
     "events",
     "feedback",
     "clubs",
+    "search",
+    "uploads",
+    "caching",
+    # Project-wide management commands and template tags
+    "smart_campus",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Static files are answered here, before any profiling or database routing
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "smart_campus.middleware.QueryProfilingMiddleware",
+    "smart_campus.routers.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -60,7 +72,8 @@ ROOT_URLCONF = "smart_campus.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that reports render times to the profiling middleware
+        "BACKEND": "smart_campus.template_backends.ProfilingDjangoTemplates",
         "DIRS": [BASE_DIR / 'templates'],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -83,6 +96,34 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Media is authorised by uploads.views.serve_media and then delivered by the
+# front-end server: 'nginx' answers with X-Accel-Redirect to
+# MEDIA_ACCEL_REDIRECT_PREFIX, which must be an `internal` location aliasing
+# MEDIA_ROOT; 'sendfile' sends X-Sendfile for Apache/lighttpd. Unset, files
+# are streamed from Python with Range support (gunicorn uses sendfile(2)).
+MEDIA_SERVER = os.environ.get('MEDIA_SERVER') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# Browser cache lifetime for media that is not content-addressed
+MEDIA_MAX_AGE = 3600
+
+# Uploads are stored under the SHA-256 of their content so duplicates share
+# one file; generated renditions keep their fixed, derived names.
+STORAGES = {
+    "default": {
+        "BACKEND": "uploads.storage.ContentAddressedStorage",
+    },
+    "renditions": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    # collectstatic fingerprints every file and writes .br/.gz copies;
+    # WhiteNoise serves fingerprinted names as immutable for a year.
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "smart_campus.staticfiles.CompressedManifestStorage"
+        ),
+    },
+}
 
 WSGI_APPLICATION = "smart_campus.wsgi.application"
 
@@ -94,9 +135,79 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Take the write lock when a transaction starts. A deferred
+            # transaction that reads and then writes cannot wait on
+            # busy_timeout and fails straight away with "database is locked".
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
+# SQLite tuning
+# smart_campus.db.DEFAULT_PRAGMAS run on every new connection (WAL,
+# synchronous=NORMAL, 10s busy_timeout, 32MB cache, 256MB mmap); define
+# SQLITE_PRAGMAS to replace them. Set SQLITE_WRITE_LOCK to a lock file path
+# to queue hot write paths across gunicorn workers with flock instead of
+# competing for the SQLite lock.
+SQLITE_WRITE_LOCK = os.environ.get('SQLITE_WRITE_LOCK') or None
+
+# Read replicas
+# ReplicaRouter sends the reads of read-only requests to DATABASE_REPLICAS,
+# keeping a browser on the primary for REPLICA_STICKY_SECONDS after it
+# writes. Locally "replica" is a SQLite snapshot of db.sqlite3 refreshed by
+# `manage.py refresh_replica --interval 30`; in production point the alias
+# at a streaming Postgres replica. Enable with DATABASE_REPLICAS_ENABLED=1.
+DATABASES["replica"] = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": BASE_DIR / "var" / "replica.sqlite3",
+    "PRAGMAS": {
+        'query_only': 1,
+        'cache_size': -32000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_ROUTERS = ['smart_campus.routers.ReplicaRouter']
+DATABASE_REPLICAS = ['replica'] if os.environ.get('DATABASE_REPLICAS_ENABLED', '').lower() in ('1', 'true', 'yes') else []
+REPLICA_EXCLUDED_APPS = ['sessions']
+REPLICA_STICKY_SECONDS = 60
+SQLITE_REPLICA_REFRESH_INTERVAL = 30
+
+
+# Caching
+# CACHE_BACKEND picks locmem, file or memcached (pymemcache). locmem is per
+# process, so version bumps made by one gunicorn worker are invisible to the
+# others; anything running more than one process needs file or memcached.
+# Cached pages are keyed on per-model version tokens (see caching.versions),
+# which model signals replace on every save, delete and M2M change.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smart-campus',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'var' / 'cache')),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+CACHES = {
+    'default': {
+        **_CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': 'smart_campus',
+    },
+}
+PAGE_CACHE_TIMEOUT = 300
+# Part of every page ETag (caching.conditional); change it on deploy so
+# browsers fetch pages rendered by new templates instead of revalidating
+ETAG_SALT = os.environ.get('ETAG_SALT', '')
+
 
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
@@ -147,7 +258,106 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'users:profile'
 LOGOUT_REDIRECT_URL = 'home'
 
+# Notifications
+# Serve the unread badge from the denormalized users.User.unread_count column.
+# When disabled the count is cached per user and invalidated on every write.
+NOTIFICATIONS_UNREAD_COUNT_COLUMN = True
+NOTIFICATIONS_UNREAD_CACHE_TIMEOUT = 300
+# Role-wide notifications are fanned out by `manage.py process_notification_outbox`.
+# Set NOTIFICATIONS_OUTBOX_EAGER to deliver them at commit time when no worker runs.
+NOTIFICATIONS_OUTBOX_EAGER = False
+NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS = 5
+NOTIFICATIONS_OUTBOX_LEASE = 300
+
+# Full-text search
+# Dotted path to a search.backends.SearchBackend subclass. When unset the
+# backend matching the database vendor is used (SQLite FTS5 or Postgres).
+SEARCH_BACKEND = None
+
+# Venue conflicts
+# Double bookings are found with a per-process interval index over event
+# times (events.conflicts). Set to False to query the database instead.
+EVENT_CONFLICT_INDEX = True
+# Bookable hours used by the free-slots API
+VENUE_DAY_START = datetime.time(8)
+VENUE_DAY_END = datetime.time(22)
+# Batch scheduler for pending event requests (events.scheduling). Proposals
+# may move an event by these many hours or to another venue; None means
+# every venue existing events use. CBC stops after SCHEDULER_TIME_LIMIT
+# seconds with the best schedule found so far.
+SCHEDULER_TIME_SHIFTS = [0, -1, 1, -2, 2]
+SCHEDULER_VENUES = None
+SCHEDULER_TIME_LIMIT = 20
+# iCalendar feeds (events.calendar) leave out events that ended longer ago
+EVENT_FEED_PAST_DAYS = 180
+# Recurring events (events.recurrence). Upcoming dates are stored this many
+# days ahead, at most RECURRENCE_MAX_MATERIALIZED per series; run
+# materialize_occurrences daily to roll the horizon forward. Other dates are
+# expanded on demand for windows of at most RECURRENCE_MAX_WINDOW_DAYS.
+RECURRENCE_HORIZON_DAYS = 180
+RECURRENCE_MAX_MATERIALIZED = 500
+RECURRENCE_MAX_WINDOW_DAYS = 92
+RECURRENCE_DETAIL_DAYS = 60
+
+# Lost and found matching
+# The TF-IDF index of open reports is persisted here between restarts.
+LOST_FOUND_MATCHER_PATH = BASE_DIR / 'var' / 'lost_found_matcher.joblib'
+LOST_FOUND_MATCHER_SAVE_INTERVAL = 60
+LOST_FOUND_MATCH_MIN_SCORE = 0.2
+# Maximum Hamming distance between photo hashes to count as visually similar
+LOST_FOUND_IMAGE_MATCH_DISTANCE = 10
+
+# Image renditions
+# Uploaded images are queued and resized to these widths (WebP and JPEG) by
+# `manage.py process_renditions`; templates serve them through the
+# responsive_image tag, falling back to the original until they exist.
+# Missing renditions are looked up again after RENDITION_MISS_TIMEOUT seconds.
+RENDITION_WIDTHS = [320, 640, 1024]
+RENDITION_QUALITY = 80
+RENDITIONS_ASYNC = True
+RENDITION_MISS_TIMEOUT = 30
+RENDITION_MAX_ATTEMPTS = 5
+
+# Request profiling
+# Adds Server-Timing headers (query count, DB, template and total time) and
+# logs repeated queries to the smart_campus.profiling logger. In production
+# enable it for a sample of requests with PROFILING_SAMPLE_RATE. The header
+# goes to staff and under DEBUG only, unless PROFILING_PUBLIC_HEADER is set
+# (benchmark_routes sets it to read every role's query counts).
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', str(DEBUG)).lower() in ('1', 'true', 'yes')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '1.0'))
+PROFILING_PUBLIC_HEADER = os.environ.get('PROFILING_PUBLIC_HEADER', '').lower() in ('1', 'true', 'yes')
+PROFILING_DUPLICATE_THRESHOLD = 5
+PROFILING_SLOW_REQUEST_MS = 500
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "smart_campus.profiling": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 # Additional authentication settings
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
+
+# Route benchmarks
+# Budgets checked by `manage.py benchmark_routes`; a route fails when its p95
+# latency or its per-request query count goes over. Keys are URL names
+# ("events:list") and override the "default" entry.
+BENCHMARK_BUDGETS = {
+    'default': {'p95_ms': 500, 'queries': 30},
+    'search:search': {'p95_ms': 800, 'queries': 30},
+    'search:api': {'p95_ms': 800, 'queries': 30},
+}
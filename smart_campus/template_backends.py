@@ -0,0 +1,38 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from .middleware import _active_profile
+
+
+class ProfiledTemplate(Template):
+    """A Django template that adds its render time to the request's profile"""
+
+    def render(self, context=None, request=None):
+        profile = _active_profile.get()
+        if profile is None:
+            return super().render(context, request)
+        # Only time the outermost render; templates rendered inside it are part of it
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_depth -= 1
+            if profile.template_depth == 0:
+                profile.template_time += time.perf_counter() - started
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing renders for QueryProfilingMiddleware.
+
+    Selected with TEMPLATES' BACKEND; outside a profiled request it behaves
+    exactly like DjangoTemplates.
+    """
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,14 @@
+from django import template
+
+from smart_campus.staticfiles import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """
+    URL of a third-party asset listed in smart_campus.staticfiles.VENDOR_ASSETS,
+    e.g. <link href="{% vendor_asset 'bootstrap.css' %}" rel="stylesheet">.
+    """
+    return vendor_url(name)
@@ -0,0 +1,94 @@
+import logging
+import re
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .middleware import query_shape
+
+logger = logging.getLogger('smart_campus.profiling')
+
+_TEMPLATE_TIME = re.compile(r'tpl;dur=([\d.]+)')
+
+
+class QueryScalingTestCase(TestCase):
+    """
+    Base class for tests asserting that a view's SQL query count does not
+    grow with the number of rows it displays.
+
+    Each check requests the view at every size in `sizes`, growing the
+    fixture in between, and fails if the counts differ; the failure message
+    lists the statements whose execution count changed, which is usually
+    the template loop doing one query per row. The template render time
+    reported by the profiling middleware is logged per size so slow
+    template changes show up in the test output.
+    """
+
+    sizes = (1, 5, 20)
+
+    @classmethod
+    def setUpClass(cls):
+        cls._scratch = tempfile.mkdtemp(prefix='smart_campus-tests-')
+        cls._scaling_settings = override_settings(
+            MEDIA_ROOT=cls._scratch,
+            RENDITIONS_ASYNC=False,
+            LOST_FOUND_MATCHER_PATH=Path(cls._scratch) / 'lost_found_matcher.joblib',
+            PROFILING_ENABLED=True,
+            PROFILING_SAMPLE_RATE=1.0,
+            PROFILING_PUBLIC_HEADER=True,
+        )
+        cls._scaling_settings.enable()
+        cls.render_times = []
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._scaling_settings.disable()
+        shutil.rmtree(cls._scratch, ignore_errors=True)
+        for label, timings in cls.render_times:
+            logger.info(
+                'Template render %s: %s', label,
+                ', '.join(f'{size} rows {ms:.1f}ms' for size, ms in timings),
+            )
+
+    def setUp(self):
+        super().setUp()
+        # Rolled back rows leave cached pages behind under unchanged versions
+        cache.clear()
+
+    def assertConstantQueries(self, url, grow, label=None, status=200):
+        """
+        Request `url` once per entry in `sizes`, calling grow(n) first to add n rows.
+
+        Returns the query count, which is the same at every size.
+        """
+        counts, captured, timings = [], [], []
+        current = 0
+        for size in self.sizes:
+            grow(size - current)
+            current = size
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status, f'{url} returned {response.status_code}')
+            counts.append(len(queries))
+            captured.append(Counter(query_shape(query['sql']) for query in queries.captured_queries))
+            match = _TEMPLATE_TIME.search(response.get('Server-Timing', ''))
+            if match:
+                timings.append((size, float(match.group(1))))
+
+        self.render_times.append((label or url, timings))
+        if len(set(counts)) > 1:
+            grown = captured[-1] - captured[0]
+            details = '\n'.join(f'  +{count}x {shape}' for shape, count in grown.most_common())
+            self.fail(
+                f'Query count for {label or url} grows with fixture size '
+                f'({", ".join(f"{size}: {count}" for size, count in zip(self.sizes, counts))}):\n{details}'
+            )
+        return counts[0]
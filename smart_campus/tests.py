@@ -0,0 +1,260 @@
+import datetime
+import gzip
+import re
+import shutil
+import socket
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+import brotli
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from caching.conditional import conditional_page
+from caching.versions import cached
+from clubs.models import Club
+from events.models import Event
+from lost_found import matching
+from lost_found.models import LostItem
+from users.models import User
+
+from .management.commands import benchmark_routes
+from .routers import ReplicaMiddleware, ReplicaRouter
+from .staticfiles import VENDOR_ASSETS, vendor_url
+from .testing import QueryScalingTestCase
+
+
+class HomeQueryCountTests(QueryScalingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+
+    def setUp(self):
+        super().setUp()
+        matching._matcher = None
+        self.client.force_login(self.student)
+        self.created = 0
+
+    def add_content(self, count):
+        for _ in range(count):
+            self.created += 1
+            owner = User.objects.create_user(f'owner{self.created}', role='faculty')
+            start = timezone.now() + timedelta(days=self.created)
+            Event.objects.create(
+                title=f'Event {self.created}', description='Description', location='Library',
+                start_date=start, end_date=start + timedelta(hours=1), organizer=owner,
+            )
+            LostItem.objects.create(
+                title=f'Item {self.created}', description='Description', location='Library',
+                date=datetime.date(2025, 1, 10), status='lost', user=owner,
+            )
+            Club.objects.create(name=f'Club {self.created}', description='Description', president=owner)
+
+    def test_home(self):
+        self.assertConstantQueries(reverse('home'), self.add_content, 'home')
+
+    def test_home_anonymous(self):
+        self.client.logout()
+        self.assertConstantQueries(reverse('home'), self.add_content, 'home (anonymous)')
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_PUBLIC_HEADER=False)
+class QueryProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.staff = User.objects.create_user('staff', role='faculty', is_staff=True)
+
+    def test_server_timing_only_for_staff_and_debug(self):
+        self.client.force_login(self.student)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('home')))
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get(reverse('home')))
+
+        self.client.force_login(self.staff)
+        timing = self.client.get(reverse('home'))['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+;desc="template render", '
+                                 r'total;dur=[\d.]+$')
+        self.assertGreater(float(re.search(r'tpl;dur=([\d.]+)', timing).group(1)), 0)
+
+    def test_repeated_and_slow_requests_are_logged(self):
+        self.client.force_login(self.student)
+        with override_settings(PROFILING_DUPLICATE_THRESHOLD=0, PROFILING_SLOW_REQUEST_MS=-1), \
+                self.assertLogs('smart_campus.profiling', 'WARNING') as logs:
+            self.client.get(reverse('home'))
+        self.assertTrue(any(line.startswith('WARNING:smart_campus.profiling:Repeated query on GET /')
+                            for line in logs.output))
+        self.assertTrue(any('Slow request GET /' in line and 'templates' in line for line in logs.output))
+
+    def test_disabled_profiling_logs_nothing(self):
+        self.client.force_login(self.staff)
+        with override_settings(PROFILING_ENABLED=False, PROFILING_SLOW_REQUEST_MS=-1), \
+                self.assertNoLogs('smart_campus.profiling'):
+            response = self.client.get(reverse('home'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    databases = {'default'}
+
+    def route(self, request, write=False):
+        """Return the alias Event reads used inside `request`, before and after an optional write"""
+        seen = []
+
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(Event))
+            if write:
+                with connection.cursor() as cursor:
+                    cursor.execute('UPDATE users_user SET unread_count = unread_count WHERE id = -1')
+                seen.append(ReplicaRouter().db_for_read(Event))
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_outside_requests_reads_use_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Event), 'default')
+
+    def test_safe_request_reads_replica(self):
+        seen, response = self.route(RequestFactory().get('/events/'))
+        self.assertEqual(seen, ['replica'])
+        self.assertNotIn('primary_until', response.cookies)
+
+    def test_unsafe_request_reads_primary(self):
+        seen, _ = self.route(RequestFactory().post('/events/create/'))
+        self.assertEqual(seen, ['default'])
+
+    def test_write_pins_rest_of_request_and_browser(self):
+        seen, response = self.route(RequestFactory().get('/events/1/attend/'), write=True)
+        self.assertEqual(seen, ['replica', 'default'])
+        self.assertIn('primary_until', response.cookies)
+
+        request = RequestFactory().get('/events/1/')
+        request.COOKIES['primary_until'] = response.cookies['primary_until'].value
+        seen, _ = self.route(request)
+        self.assertEqual(seen, ['default'])
+
+    def test_sessions_never_read_from_replica(self):
+        seen = []
+        ReplicaMiddleware(lambda request: seen.append(ReplicaRouter().db_for_read(Session)) or HttpResponse())(
+            RequestFactory().get('/')
+        )
+        self.assertEqual(seen, ['default'])
+
+    def test_cache_fills_read_primary(self):
+        seen = []
+
+        def read():
+            seen.append(ReplicaRouter().db_for_read(Event))
+
+        def view(request):
+            read()
+            cached(f'replicas:{time.time_ns()}', ['events.Event'], read)
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(RequestFactory().get('/events/'))
+        self.assertEqual(seen, ['replica', 'default'])
+
+    def test_conditional_pages_read_primary(self):
+        seen = []
+
+        @conditional_page('events.Event')
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(Event))
+            return HttpResponse()
+
+        request = RequestFactory().get('/events/')
+        request.user = AnonymousUser()
+        response = ReplicaMiddleware(view)(request)
+        self.assertEqual(seen, ['default'])
+        self.assertTrue(response.has_header('ETag'))
+
+
+class BenchmarkRoutesTests(SimpleTestCase):
+    def listening_socket(self):
+        server = socket.socket()
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        return server
+
+    def test_unreachable_server_is_recorded_not_raised(self):
+        server = self.listening_socket()
+        url = f'http://127.0.0.1:{server.getsockname()[1]}/'
+        server.close()
+        command = benchmark_routes.Command()
+        result = command.benchmark(url, '', {'warmup': 1, 'requests': 3, 'concurrency': 2})
+        self.assertEqual(result['statuses'], {'error': 3})
+        self.assertEqual(command.check_budget(result, {}), ['3 request(s) without a response'])
+
+    def test_timeouts_are_recorded(self):
+        # Connections are queued by the kernel but never answered
+        server = self.listening_socket()
+        server.listen(5)
+        with mock.patch.object(benchmark_routes, 'FETCH_TIMEOUT', 0.2):
+            status, elapsed, queries = benchmark_routes.fetch(f'http://127.0.0.1:{server.getsockname()[1]}/', '')
+        self.assertEqual((status, queries), ('error', None))
+        self.assertGreaterEqual(elapsed, 0.2)
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.addCleanup(vendor_url.cache_clear)
+        vendor_url.cache_clear()
+        self.static_dir = self.tmp / 'static'
+        self.static_dir.mkdir()
+
+    def write(self, root, path, content):
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+
+    def test_vendor_url_prefers_local_copy(self):
+        with override_settings(STATICFILES_DIRS=[self.static_dir]):
+            self.assertTrue(vendor_url('bootstrap.css').startswith('https://'))
+            self.write(self.static_dir, VENDOR_ASSETS['bootstrap.css'][0], 'body {}')
+            vendor_url.cache_clear()
+            self.assertEqual(vendor_url('bootstrap.css'), '/static/vendor/bootstrap/css/bootstrap.min.css')
+
+    def test_vendor_static_fetches_referenced_files(self):
+        cdn = self.tmp / 'cdn'
+        self.write(cdn, 'css/all.min.css',
+                   '.fa{src:url(../webfonts/fa-solid.woff2) format("woff2"),url("data:x")}\n'
+                   '/*# sourceMappingURL=all.min.css.map */')
+        self.write(cdn, 'css/all.min.css.map', '{}')
+        self.write(cdn, 'webfonts/fa-solid.woff2', 'font')
+        assets = {'fontawesome.css': ('vendor/fa/css/all.min.css', (cdn / 'css/all.min.css').as_uri())}
+        with override_settings(STATICFILES_DIRS=[self.static_dir]), \
+                mock.patch.dict(VENDOR_ASSETS, assets, clear=True):
+            call_command('vendor_static', stdout=open(self.tmp / 'out', 'w'))
+        for path in ['css/all.min.css', 'css/all.min.css.map', 'webfonts/fa-solid.woff2']:
+            self.assertTrue((self.static_dir / 'vendor/fa' / path).exists(), path)
+
+    def test_collectstatic_writes_hashed_precompressed_files(self):
+        css = 'body { background: url(../img/logo.svg); }\n' * 200
+        self.write(self.static_dir, 'css/site.css', css)
+        self.write(self.static_dir, 'img/logo.svg', '<svg xmlns="http://www.w3.org/2000/svg"/>')
+        storages = {
+            'staticfiles': {'BACKEND': 'smart_campus.staticfiles.CompressedManifestStorage'},
+        }
+        with override_settings(STATICFILES_DIRS=[self.static_dir], STATIC_ROOT=self.tmp / 'collected',
+                               STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        hashed = [path for path in (self.tmp / 'collected/css').iterdir() if path.name.endswith('.css')
+                  and path.name != 'site.css']
+        self.assertEqual(len(hashed), 1)
+        content = hashed[0].read_bytes()
+        self.assertEqual(gzip.decompress(Path(f'{hashed[0]}.gz').read_bytes()), content)
+        self.assertEqual(brotli.decompress(Path(f'{hashed[0]}.br').read_bytes()), content)
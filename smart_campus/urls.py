@@ -17,7 +17,6 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from . import views
 
 urlpatterns = [
@@ -28,8 +27,7 @@ urlpatterns = [
     path('events/', include('events.urls')),
     path('feedback/', include('feedback.urls')),
     path('clubs/', include('clubs.urls')),
+    path('search/', include('search.urls')),
+    # Access-checked; delivery is offloaded to the web server when MEDIA_SERVER is set
+    path(settings.MEDIA_URL.lstrip('/'), include('uploads.urls')),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -9,7 +9,7 @@ def home(request):
     if request.user.is_authenticated:
         # Get recent events, lost items, and clubs for authenticated users
         events = Event.objects.all().order_by('-start_date')[:3]
-        lost_items = LostItem.objects.filter(status='lost').order_by('-created_at')[:3]
+        lost_items = LostItem.objects.filter(status='lost').select_related('user').order_by('-created_at')[:3]
         clubs = Club.objects.all().order_by('?')[:3]  # Random selection
         
         context = {
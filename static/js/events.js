@@ -46,4 +46,55 @@ function deleteEvent(eventId) {
         console.error('Error:', error);
         alert('An error occurred while deleting the event.');
     });
-}
\ No newline at end of file
+}
+
+function loadMoreEvents(button) {
+    if (button.dataset.loading === 'true') {
+        return Promise.resolve();
+    }
+    button.dataset.loading = 'true';
+
+    const url = `${button.dataset.feedUrl}?${button.dataset.filters}&cursor=${encodeURIComponent(button.dataset.cursor)}`;
+    return fetch(url, {
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest',
+        },
+    })
+    .then(response => response.json())
+    .then(data => {
+        document.getElementById('event-grid').insertAdjacentHTML('beforeend', data.html);
+        if (data.next_cursor) {
+            button.dataset.cursor = data.next_cursor;
+            button.href = `?${button.dataset.filters}&cursor=${encodeURIComponent(data.next_cursor)}`;
+            button.dataset.loading = 'false';
+        } else {
+            document.getElementById('event-pager').remove();
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        button.dataset.loading = 'false';
+    });
+}
+
+function initEventInfiniteScroll() {
+    const button = document.getElementById('load-more-events');
+    if (!button) {
+        return;
+    }
+
+    // Without JavaScript the button is a plain link to the next page
+    button.addEventListener('click', event => {
+        event.preventDefault();
+        loadMoreEvents(button);
+    });
+
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMoreEvents(button);
+            }
+        }, { rootMargin: '400px' });
+        observer.observe(button);
+    }
+}
@@ -0,0 +1,16 @@
+from django.apps import apps
+
+# (model label, ImageField name) for every user upload handled by this app
+IMAGE_FIELDS = [
+    ('events.Event', 'image'),
+    ('clubs.Club', 'logo'),
+    ('lost_found.LostItem', 'image'),
+    ('users.User', 'profile_picture'),
+    ('users.PermissionRequest', 'event_image'),
+]
+
+
+def image_fields():
+    """Yield (model, field name) for every configured ImageField"""
+    for label, field_name in IMAGE_FIELDS:
+        yield apps.get_model(label), field_name
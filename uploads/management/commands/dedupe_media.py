@@ -0,0 +1,80 @@
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from caching.versions import CACHED_MODELS, bump_version
+from uploads.fields import image_fields
+from uploads.models import StoredFile
+from uploads.references import delete_stored_file
+from uploads.storage import content_hash, is_content_addressed
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads into content-addressed storage, merging byte-identical copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the duplicates without changing anything')
+
+    def handle(self, *args, **options):
+        legacy_names = set()
+        for model, field_name in image_fields():
+            names = model._default_manager.exclude(**{field_name: ''}).values_list(field_name, flat=True)
+            legacy_names.update(name for name in names.distinct() if name and not is_content_addressed(name))
+
+        renamed = {}
+        missing = 0
+        by_hash = {}
+        for name in sorted(legacy_names):
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+            with default_storage.open(name, 'rb') as fp:
+                if options['dry_run']:
+                    by_hash.setdefault(content_hash(fp), []).append(name)
+                else:
+                    renamed[name] = default_storage.save(name, fp)
+
+        if options['dry_run']:
+            duplicates = sum(len(names) - 1 for names in by_hash.values())
+            self.stdout.write(f'{len(legacy_names)} legacy files, {duplicates} duplicates, {missing} missing.')
+            return
+
+        with transaction.atomic():
+            for model, field_name in image_fields():
+                for old_name, new_name in renamed.items():
+                    model._default_manager.filter(**{field_name: old_name}).update(**{field_name: new_name})
+            self._recount()
+
+        # update() skips the signals that invalidate cached pages showing these images
+        for model, _ in image_fields():
+            if model._meta.label in CACHED_MODELS:
+                bump_version(model._meta.label)
+
+        for old_name in renamed:
+            default_storage.delete(old_name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {len(renamed)} files into {len(set(renamed.values()))} content-addressed files '
+            f'({missing} missing). Run generate_renditions to render the new names.'
+        ))
+
+    def _recount(self):
+        """Rebuild every StoredFile.ref_count from the rows that reference it"""
+        counts = Counter()
+        for model, field_name in image_fields():
+            names = model._default_manager.exclude(**{field_name: ''}).values_list(field_name, flat=True)
+            counts.update(name for name in names.iterator() if is_content_addressed(name))
+
+        for stored in StoredFile.objects.all().iterator():
+            stored.ref_count = counts.pop(stored.name, 0)
+            if stored.ref_count:
+                stored.save(update_fields=['ref_count'])
+            else:
+                stored.delete()
+                transaction.on_commit(lambda name=stored.name: delete_stored_file(name))
+        StoredFile.objects.bulk_create(
+            [StoredFile(name=name, ref_count=count) for name, count in counts.items()]
+        )
@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from uploads.fields import image_fields
+from uploads.renditions import generate_renditions, rendition_manifest
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail renditions for images uploaded before the rendition pipeline existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes used to resize images (defaults to the CPU count)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate renditions that already exist')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field_name in image_fields():
+            stored = (
+                model._default_manager.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+            )
+            names.update(stored.iterator(chunk_size=2000))
+
+        names = sorted(names)
+        if not options['force']:
+            names = [name for name in names if not rendition_manifest(name)]
+
+        generated = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for name, widths in zip(names, pool.map(generate_renditions, names, chunksize=8)):
+                if widths:
+                    generated += 1
+                else:
+                    self.stderr.write(f'Skipped {name}')
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {generated} of {len(names)} images.'))
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from smart_campus.db import serialized_writes
+from uploads.models import RenditionJob
+from uploads.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate renditions for the uploads queued by web requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes used to resize images (defaults to the CPU count)')
+        parser.add_argument('--jobs', type=int, default=50,
+                            help='Queued uploads taken per poll')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue once and exit instead of polling')
+
+    def handle(self, *args, **options):
+        max_attempts = getattr(settings, 'RENDITION_MAX_ATTEMPTS', 5)
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                jobs = list(RenditionJob.objects.filter(attempts__lt=max_attempts)[:options['jobs']])
+                futures = [(job, pool.submit(generate_renditions, job.name)) for job in jobs]
+                for job, future in futures:
+                    try:
+                        widths = future.result()
+                    except Exception as e:
+                        self.stderr.write(f'Renditions for {job.name} failed (attempt {job.attempts + 1}): {e}')
+                        with serialized_writes():
+                            RenditionJob.objects.filter(pk=job.pk).update(
+                                attempts=F('attempts') + 1, last_error=str(e),
+                            )
+                        continue
+                    # An unreadable image is not retried; it is served without renditions
+                    self.stdout.write(f'Generated {job.name}' if widths else f'Skipped {job.name}')
+                    with serialized_writes():
+                        job.delete()
+
+                if options['once']:
+                    if not jobs:
+                        break
+                elif not jobs:
+                    time.sleep(options['sleep'])
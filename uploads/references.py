@@ -0,0 +1,99 @@
+import logging
+import threading
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from smart_campus.db import serialized_writes
+
+from .models import StoredFile
+from .renditions import manifest_name, read_manifest, rendition_name, rendition_storage, FORMATS
+from .storage import is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+# References claimed by uploads in this thread that no saved row accounts for yet
+_uploads = threading.local()
+
+
+def claim_reference(name, **defaults):
+    """Count one more reference to `name`, creating its StoredFile row if needed"""
+    with serialized_writes(), transaction.atomic():
+        updated = StoredFile.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+        if not updated:
+            StoredFile.objects.get_or_create(name=name, defaults={**defaults, 'ref_count': 1})
+
+
+def claim_upload(name, **defaults):
+    """
+    Claim a reference for a file that is being stored.
+
+    The row the upload is saved to takes the claim over in take_upload_claim
+    instead of adding a reference of its own. An upload never saved to a row
+    keeps its file until dedupe_media recounts the references.
+    """
+    claim_reference(name, **defaults)
+    if not hasattr(_uploads, 'claims'):
+        _uploads.claims = Counter()
+    _uploads.claims[name] += 1
+
+
+def take_upload_claim(name):
+    """Whether an upload in this thread claimed `name`; the claim is used up"""
+    claims = getattr(_uploads, 'claims', None)
+    if not claims or not claims[name]:
+        return False
+    claims[name] -= 1
+    if not claims[name]:
+        del claims[name]
+    return True
+
+
+def add_reference(name):
+    """Record one more model field pointing at a content-addressed file"""
+    if is_content_addressed(name):
+        claim_reference(name)
+
+
+def release_reference(name):
+    """Drop one reference and delete the file once nothing points at it any more"""
+    if not is_content_addressed(name):
+        return
+    with serialized_writes(), transaction.atomic():
+        StoredFile.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        deleted, _ = StoredFile.objects.filter(name=name, ref_count=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_stored_file(name))
+
+
+def delete_stored_file(name):
+    """
+    Remove an unreferenced file and its renditions from storage.
+
+    The file is kept if the name was claimed again after its last reference
+    went away. The check runs in a write transaction, so it waits for an
+    upload of the same bytes that is claiming the name in _save.
+    """
+    with serialized_writes(), transaction.atomic():
+        if StoredFile.objects.filter(name=name).exists():
+            return
+        _delete_files(name)
+
+
+def _delete_files(name):
+    storage = rendition_storage()
+    try:
+        # Not the cached lookup: a recent miss would leave the renditions behind
+        widths = read_manifest(name)
+    except OSError:
+        widths = ()
+    for width in widths:
+        for extension in FORMATS:
+            storage.delete(rendition_name(name, width, extension))
+    storage.delete(manifest_name(name))
+    try:
+        default_storage.delete(name)
+    except OSError:
+        logger.warning('Could not delete unreferenced upload %s', name, exc_info=True)
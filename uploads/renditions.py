@@ -0,0 +1,155 @@
+import io
+import json
+import logging
+import posixpath
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from smart_campus.db import serialized_writes
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+
+def rendition_widths():
+    return getattr(settings, 'RENDITION_WIDTHS', [320, 640, 1024])
+
+
+def rendition_storage():
+    """Renditions live at fixed names derived from the original, so they bypass the upload storage"""
+    return storages['renditions']
+
+
+def rendition_root(name):
+    """Directory holding the renditions of the stored file `name`"""
+    base, _ = posixpath.splitext(name)
+    return posixpath.join('renditions', base)
+
+
+def rendition_name(name, width, extension):
+    return posixpath.join(rendition_root(name), f'{width}.{extension}')
+
+
+def manifest_name(name):
+    return posixpath.join(rendition_root(name), 'manifest.json')
+
+
+def generate_renditions(name):
+    """
+    Write resized WebP and JPEG copies of a stored image.
+
+    One copy is produced per configured width that is narrower than the
+    original (plus one at the original width when it is narrower than all
+    of them). A manifest listing the widths is written last, so a reader
+    either sees a complete set or falls back to the original file.
+    """
+    storage = rendition_storage()
+    try:
+        with default_storage.open(name, 'rb') as fp:
+            image = Image.open(fp)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as e:
+        logger.warning('Cannot generate renditions for %s: %s', name, e)
+        return []
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    widths = [width for width in rendition_widths() if width < image.width] or [image.width]
+    quality = getattr(settings, 'RENDITION_QUALITY', 80)
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for extension, (pil_format, _) in FORMATS.items():
+            output = resized.convert('RGB') if pil_format == 'JPEG' else resized
+            buffer = io.BytesIO()
+            output.save(buffer, pil_format, quality=quality, optimize=True)
+            _replace(storage, rendition_name(name, width, extension), buffer.getvalue())
+
+    _replace(storage, manifest_name(name), json.dumps({'widths': widths}).encode())
+    _misses.pop(name, None)
+    return widths
+
+
+def _replace(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def read_manifest(name):
+    """Widths listed in the stored manifest of `name`; raises OSError if there is none"""
+    try:
+        with rendition_storage().open(manifest_name(name), 'rb') as fp:
+            return tuple(json.load(fp)['widths'])
+    except (ValueError, KeyError) as e:
+        raise OSError(f'Unreadable rendition manifest for {name}: {e}')
+
+
+@lru_cache(maxsize=4096)
+def _cached_manifest(name):
+    return read_manifest(name)
+
+
+# name -> time.monotonic() until which a missing manifest is not looked up again
+_misses = OrderedDict()
+MAX_MISSES = 4096
+
+
+def rendition_manifest(name):
+    """
+    Widths available for `name`, or () if its renditions have not been generated yet.
+
+    Both answers are cached in the process: found manifests until they are
+    evicted, misses for RENDITION_MISS_TIMEOUT seconds so that renditions
+    generated by the worker show up shortly after.
+    """
+    if name in _misses:
+        if _misses[name] > time.monotonic():
+            return ()
+        del _misses[name]
+    try:
+        return _cached_manifest(name)
+    except OSError:
+        _misses[name] = time.monotonic() + getattr(settings, 'RENDITION_MISS_TIMEOUT', 30)
+        if len(_misses) > MAX_MISSES:
+            _misses.popitem(last=False)
+        return ()
+
+
+def srcset(name, extension):
+    return ', '.join(
+        f'{rendition_storage().url(rendition_name(name, width, extension))} {width}w'
+        for width in rendition_manifest(name)
+    )
+
+
+def schedule_renditions(name):
+    """
+    Queue renditions for a freshly uploaded file.
+
+    Resizing is CPU heavy, so web workers only record a RenditionJob and the
+    process_renditions command does the work. With RENDITIONS_ASYNC off
+    (tests, small installs) they are generated straight away.
+    """
+    from .models import RenditionJob
+
+    if rendition_manifest(name):
+        # Content-addressed uploads can resolve to a file rendered before
+        return
+    if not getattr(settings, 'RENDITIONS_ASYNC', True):
+        generate_renditions(name)
+        return
+    with serialized_writes():
+        RenditionJob.objects.get_or_create(name=name)
@@ -0,0 +1,145 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class FileRange:
+    """
+    A file object that reads at most `length` bytes from `start`.
+
+    Django streams FileResponse in blocks through read(). gunicorn hands
+    fileno() to sendfile(2) from the current offset for Content-Length bytes.
+    Both stop at the end of the requested range.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single satisfiable "bytes=" range, with `end`
+    inclusive. Return None to send the whole file, or False if the range
+    cannot be satisfied. Multi-range requests get the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the final N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def cache_headers(response, immutable):
+    # Media is only served to signed-in users, so shared caches must not keep it
+    if immutable:
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, max_age=getattr(settings, 'MEDIA_MAX_AGE', 3600))
+    return response
+
+
+def serve_file(request, name, path, immutable=False):
+    """
+    Respond with the file at `path` (stored as `name`) after access checks passed.
+
+    Delivery is handed to the front-end server when MEDIA_SERVER is set:
+    'nginx' sends X-Accel-Redirect to an internal location, 'sendfile' sends
+    the absolute path in X-Sendfile (Apache mod_xsendfile, lighttpd). Both
+    servers handle Range and conditional requests themselves. Otherwise
+    the file is streamed from Python with Range support, and gunicorn
+    uses sendfile(2) for it.
+    """
+    stat = os.stat(path)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+
+    server = getattr(settings, 'MEDIA_SERVER', None)
+    if server:
+        response = HttpResponse(content_type=content_type)
+        if server == 'nginx':
+            prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        elif server == 'sendfile':
+            response['X-Sendfile'] = path
+        else:
+            raise ValueError(f'Unknown MEDIA_SERVER {server!r}')
+        return cache_headers(response, immutable)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+        return cache_headers(response, immutable)
+
+    byte_range = None
+    if request.headers.get('Range') and _if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers['Range'], stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    else:
+        response = FileResponse(file, content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return cache_headers(response, immutable)
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range with a stale If-Range validator falls back to the full file"""
+    validator = request.headers.get('If-Range')
+    if not validator:
+        return True
+    if validator.startswith(('"', 'W/')):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
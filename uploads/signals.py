@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .fields import image_fields
+from .references import add_reference, release_reference, take_upload_claim
+from .renditions import schedule_renditions
+
+
+def _field_names(sender, update_fields=None):
+    names = [field_name for model, field_name in image_fields() if model is sender]
+    if update_fields is not None:
+        names = [field_name for field_name in names if field_name in update_fields]
+    return names
+
+
+def remember_uploads(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Note new uploads and the previously stored names before FileField.pre_save commits the files"""
+    instance._new_image_fields = []
+    instance._stored_file_names = {}
+    field_names = _field_names(sender, update_fields)
+    if raw or not field_names:
+        return
+    instance._new_image_fields = [
+        field_name
+        for field_name in field_names
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+    if not instance._state.adding:
+        previous = sender._default_manager.filter(pk=instance.pk).values(*field_names).first()
+        instance._stored_file_names = previous or {}
+
+
+def track_saved_uploads(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Schedule renditions for new uploads and move file references to the new names"""
+    if raw:
+        return
+    for field_name in getattr(instance, '_new_image_fields', []):
+        name = getattr(instance, field_name).name
+        transaction.on_commit(lambda name=name: schedule_renditions(name))
+
+    previous = getattr(instance, '_stored_file_names', {})
+    for field_name in _field_names(sender, update_fields):
+        old_name = previous.get(field_name) or ''
+        new_name = getattr(instance, field_name).name or ''
+        # Storing an upload already claimed a reference to its name
+        claimed = take_upload_claim(new_name)
+        if new_name != old_name:
+            if not claimed:
+                add_reference(new_name)
+            release_reference(old_name)
+        elif claimed:
+            release_reference(new_name)
+
+    instance._new_image_fields = []
+    instance._stored_file_names = {}
+
+
+def release_deleted_uploads(sender, instance, **kwargs):
+    for field_name in _field_names(sender):
+        release_reference(getattr(instance, field_name).name or '')
+
+
+for model, _ in image_fields():
+    label = model._meta.label
+    pre_save.connect(remember_uploads, sender=model, dispatch_uid=f'uploads_pre_save_{label}')
+    post_save.connect(track_saved_uploads, sender=model, dispatch_uid=f'uploads_post_save_{label}')
+    post_delete.connect(release_deleted_uploads, sender=model, dispatch_uid=f'uploads_post_delete_{label}')
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+from smart_campus.db import serialized_writes
+
+CAS_PREFIX = 'cas'
+
+
+def is_content_addressed(name):
+    """Whether a stored name was produced by ContentAddressedStorage (and so never changes)"""
+    return bool(name) and name.startswith(CAS_PREFIX + '/')
+
+
+def content_hash(content):
+    sha = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every upload after the SHA-256 of its bytes.
+
+    Uploading a file that is already stored returns the existing name instead
+    of writing a suffixed copy, so identical images uploaded to different
+    models share one file on disk. Because a name always refers to the same
+    bytes, URLs under cas/ can be cached forever. Reference counts of the
+    shared files are kept in uploads.models.StoredFile; saving a file claims
+    one reference, which the row the file is saved to takes over.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen from the content in _save
+        return name
+
+    def _save(self, name, content):
+        from .references import claim_upload
+
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        target = posixpath.join(CAS_PREFIX, digest[:2], digest[2:4], digest + extension)
+        with serialized_writes(), transaction.atomic():
+            # Claim the name before looking for the file: a release that
+            # dropped its last reference then either sees the claim and keeps
+            # the file, or has already deleted it and it is written again here
+            claim_upload(target, sha256=digest, size=content.size)
+            self._write(target, content)
+        return target
+
+    def _write(self, target, content):
+        full_path = self.path(target)
+        if not os.path.exists(full_path):
+            # Write to a temporary file and rename it into place: two workers
+            # storing the same bytes at once both end up with the same file
+            directory = os.path.dirname(full_path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as output:
+                    for chunk in content.chunks():
+                        output.write(chunk)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, full_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
@@ -0,0 +1,33 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from uploads.renditions import rendition_manifest, srcset
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 768px) 100vw, 33vw'
+
+
+@register.simple_tag
+def responsive_image(image, sizes=DEFAULT_SIZES, **attrs):
+    """
+    Render an ImageField as a <picture> with WebP and JPEG srcsets.
+
+    Extra keyword arguments become attributes of the <img>, e.g.
+    {% responsive_image event.image alt=event.title class="card-img-top" %}.
+    Falls back to a plain <img> of the original until renditions exist.
+    """
+    if not image:
+        return ''
+    attributes = format_html_join('', ' {}="{}"', ((key.replace('_', '-'), value) for key, value in attrs.items()))
+    if not rendition_manifest(image.name):
+        return format_html('<img src="{}"{} loading="lazy">', image.url, attributes)
+    return format_html(
+        # display: contents keeps existing img sizing rules working unchanged
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{} loading="lazy">'
+        '</picture>',
+        srcset(image.name, 'webp'), sizes,
+        image.url, srcset(image.name, 'jpg'), sizes, attributes,
+    )
@@ -0,0 +1,251 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from clubs.models import Club
+from events.models import Event
+from users.models import PermissionRequest, User
+
+from . import renditions
+from .models import RenditionJob, StoredFile
+
+POSTER = 'cas/ab/cd/abcd1234.jpg'
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.other = User.objects.create_user('other', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+
+    def setUp(self):
+        media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name in [POSTER, 'profile_pics/me.png']:
+            (media_root / name).parent.mkdir(parents=True, exist_ok=True)
+            (media_root / name).write_bytes(CONTENT)
+        self.url = reverse('uploads:media', args=[POSTER])
+        self.client.force_login(self.student)
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_mutable_names_are_not_immutable(self):
+        response = self.client.get(reverse('uploads:media', args=['profile_pics/me.png']))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_revalidation(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(MEDIA_SERVER='nginx')
+    def test_nginx_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{POSTER}')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVER='sendfile')
+    def test_sendfile_offload(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response['X-Sendfile'].endswith(POSTER))
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_path_traversal(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/cas/../../manage.py').status_code, 404)
+
+    def test_permission_request_images_are_private(self):
+        PermissionRequest.objects.create(user=self.other, permission_type='event_creation', reason='Fest',
+                                         event_image=POSTER)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(self.faculty)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class StoredFileReferenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.president = User.objects.create_user('president', role='student')
+
+    def setUp(self):
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def club(self, content=CONTENT):
+        club = Club(name='Photography', description='Photos', president=self.president)
+        club.logo.save('logo.png', ContentFile(content), save=False)
+        club.save()
+        return club
+
+    def stored(self, name):
+        return StoredFile.objects.filter(name=name).values_list('ref_count', flat=True).first()
+
+    def test_identical_uploads_share_one_file(self):
+        first, second = self.club(), self.club()
+        self.assertEqual(first.logo.name, second.logo.name)
+        self.assertTrue(first.logo.name.startswith('cas/'))
+        self.assertEqual(self.stored(first.logo.name), 2)
+        self.assertEqual(len([path for path in self.media_root.rglob('*') if path.is_file()]), 1)
+
+    def test_release_deletes_the_last_copy_only(self):
+        first, second = self.club(), self.club()
+        name = first.logo.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.stored(name), 1)
+        self.assertTrue((self.media_root / name).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self.stored(name))
+        self.assertFalse((self.media_root / name).exists())
+
+    def test_replacing_an_upload_with_the_same_bytes_keeps_one_reference(self):
+        club = self.club()
+        club.logo.save('again.png', ContentFile(CONTENT))
+        self.assertEqual(self.stored(club.logo.name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            club.logo.save('other.png', ContentFile(b'other bytes'))
+        self.assertEqual(StoredFile.objects.count(), 1)
+        self.assertEqual(self.stored(club.logo.name), 1)
+
+    def test_reupload_before_deletion_keeps_the_file(self):
+        club = self.club()
+        name = club.logo.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            club.delete()
+        self.assertIsNone(self.stored(name))
+        # The same bytes are uploaded again before the deletion scheduled for commit runs
+        self.club()
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.stored(name), 1)
+        self.assertTrue((self.media_root / name).exists())
+
+
+def jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class RenditionTests(TestCase):
+    def setUp(self):
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, RENDITION_WIDTHS=[320, 640, 1024])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Content-addressed names repeat across tests, so start without cached lookups
+        renditions._misses.clear()
+        renditions._cached_manifest.cache_clear()
+
+    def store(self, width, height):
+        return default_storage.save('poster.jpg', ContentFile(jpeg(width, height)))
+
+    def test_widths_narrower_than_the_original(self):
+        name = self.store(800, 400)
+        self.assertEqual(renditions.generate_renditions(name), [320, 640])
+        self.assertEqual(renditions.rendition_manifest(name), (320, 640))
+        storage = renditions.rendition_storage()
+        for width in [320, 640]:
+            for extension in renditions.FORMATS:
+                with storage.open(renditions.rendition_name(name, width, extension), 'rb') as fp:
+                    self.assertEqual(Image.open(fp).size, (width, width // 2))
+        self.assertFalse(storage.exists(renditions.rendition_name(name, 1024, 'jpg')))
+
+    def test_small_images_get_one_rendition_at_their_own_width(self):
+        name = self.store(200, 100)
+        self.assertEqual(renditions.generate_renditions(name), [200])
+        self.assertEqual(renditions.generate_renditions('cas/missing.jpg'), [])
+
+    def test_srcset_and_responsive_image_tag(self):
+        name = self.store(800, 400)
+        template = Template('{% load renditions %}{% responsive_image event.image alt="Poster" %}')
+        context = Context({'event': Event(image=name)})
+        self.assertEqual(renditions.srcset(name, 'webp'), '')
+        self.assertNotIn('<picture', template.render(context))
+
+        renditions.generate_renditions(name)
+        url = renditions.rendition_storage().url
+        self.assertEqual(renditions.srcset(name, 'webp'), (
+            f'{url(renditions.rendition_name(name, 320, "webp"))} 320w, '
+            f'{url(renditions.rendition_name(name, 640, "webp"))} 640w'
+        ))
+        html = template.render(context)
+        self.assertIn('<picture', html)
+        self.assertIn(renditions.srcset(name, 'jpg'), html)
+        self.assertIn('alt="Poster"', html)
+
+    def test_missing_manifests_are_cached_for_a_while(self):
+        name = self.store(800, 400)
+        with mock.patch.object(renditions, 'read_manifest', wraps=renditions.read_manifest) as read:
+            self.assertEqual(renditions.rendition_manifest(name), ())
+            self.assertEqual(renditions.rendition_manifest(name), ())
+            self.assertEqual(read.call_count, 1)
+            with override_settings(RENDITION_MISS_TIMEOUT=0):
+                renditions._misses.clear()
+                renditions.rendition_manifest(name)
+                renditions.rendition_manifest(name)
+            self.assertEqual(read.call_count, 3)
+
+    @override_settings(RENDITIONS_ASYNC=True)
+    def test_uploads_are_queued_for_the_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            # As a form assigns it: the file is stored when the row is saved
+            club = Club.objects.create(name='Photography', description='Photos',
+                                       president=User.objects.create_user('president'),
+                                       logo=ContentFile(jpeg(800, 400), name='logo.jpg'))
+        self.assertEqual(list(RenditionJob.objects.values_list('name', flat=True)), [club.logo.name])
+        with self.assertRaises(OSError):
+            renditions.read_manifest(club.logo.name)
+
+        call_command('process_renditions', '--once', '--workers', '1', stdout=io.StringIO())
+        self.assertFalse(RenditionJob.objects.exists())
+        self.assertEqual(renditions.read_manifest(club.logo.name), (320, 640))
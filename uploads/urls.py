@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'uploads'
+
+urlpatterns = [
+    path('<path:path>', views.serve_media, name='media'),
+]
@@ -0,0 +1,60 @@
+import os
+import posixpath
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.views.decorators.http import require_safe
+
+from events.models import Event
+from users.models import PermissionRequest
+
+from .renditions import rendition_storage
+from .serving import serve_file
+from .storage import is_content_addressed
+
+
+def _original_prefix(name):
+    """The stored upload a media path belongs to, without its extension"""
+    if name.startswith('renditions/'):
+        return posixpath.dirname(name)[len('renditions/'):]
+    return posixpath.splitext(name)[0]
+
+
+def can_view_media(user, name):
+    """
+    Whether `user` may download the media file `name`.
+
+    Everything in media/ is shown on pages behind a login, except images
+    attached to permission requests. Those are visible only to the requester
+    and to reviewers until the event is published with the same image.
+    """
+    if not user.is_authenticated:
+        return False
+    if not user.is_student():
+        return True
+    prefix = _original_prefix(name) + '.'
+    requests = PermissionRequest.objects.filter(event_image__startswith=prefix)
+    if not requests.exclude(user=user).exists():
+        return True
+    return requests.filter(user=user).exists() or Event.objects.filter(image__startswith=prefix).exists()
+
+
+@require_safe
+@login_required
+def serve_media(request, path):
+    """Serve an uploaded file or rendition from MEDIA_ROOT to a signed-in user"""
+    name = posixpath.normpath(path)
+    if name.startswith(('.', '/')):
+        raise Http404
+    storage = rendition_storage() if name.startswith('renditions/') else default_storage
+    try:
+        full_path = storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path) or not can_view_media(request.user, name):
+        raise Http404
+    # Content-addressed uploads and their renditions never change under the same name
+    immutable = is_content_addressed(_original_prefix(name))
+    return serve_file(request, name, full_path, immutable=immutable)
@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 
 # Import the models we will register
-from .models import User, Notification, PermissionRequest
+from .models import User, Notification, NotificationOutbox, PermissionRequest
 
 
 class CustomUserAdmin(UserAdmin):
@@ -52,6 +52,13 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('title', 'message', 'user__username')
 
 
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'status', 'attempts', 'available_at', 'processed_at')
+    list_filter = ('status',)
+    search_fields = ('idempotency_key', 'title')
+    readonly_fields = ('created_at', 'processed_at', 'last_user_id', 'last_error')
+
+
 class PermissionRequestAdmin(admin.ModelAdmin):
     list_display = ('user', 'permission_type', 'status', 'created_at', 'reviewed_by')
     list_filter = ('permission_type', 'status', 'created_at')
@@ -62,4 +69,5 @@ class PermissionRequestAdmin(admin.ModelAdmin):
 # Register admin classes
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Notification, NotificationAdmin)
+admin.site.register(NotificationOutbox, NotificationOutboxAdmin)
 admin.site.register(PermissionRequest, PermissionRequestAdmin)
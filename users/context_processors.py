@@ -1,9 +1,11 @@
+from .notifications import get_unread_count
+
+
 def notifications_context(request):
     """Add unread notification count to all templates"""
     if request.user.is_authenticated:
-        unread_count = request.user.notifications.filter(is_read=False).count()
         return {
-            'unread_notifications_count': unread_count
+            'unread_notifications_count': get_unread_count(request.user)
         }
     return {
         'unread_notifications_count': 0
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.notifications import claim_outbox_jobs, process_outbox_job
+
+
+class Command(BaseCommand):
+    help = 'Expand queued role notifications from the outbox into Notification rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Notifications inserted per bulk_create batch')
+        parser.add_argument('--jobs', type=int, default=10,
+                            help='Outbox jobs claimed per poll')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the due jobs once and exit instead of polling')
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = claim_outbox_jobs(limit=options['jobs'])
+            for job in jobs:
+                try:
+                    process_outbox_job(job, batch_size=options['batch_size'])
+                    self.stdout.write(f'Delivered outbox job {job.idempotency_key}')
+                except Exception as e:
+                    self.stderr.write(
+                        f'Outbox job {job.idempotency_key} failed (attempt {job.attempts}): {e}'
+                    )
+
+            if options['once']:
+                if not jobs:
+                    break
+            elif not jobs:
+                time.sleep(options['sleep'])
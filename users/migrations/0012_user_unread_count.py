@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-17 20:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_count(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Notification = apps.get_model("users", "Notification")
+    unread = (
+        Notification.objects.filter(user=OuterRef("pk"), is_read=False)
+        .order_by()
+        .values("user")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    User.objects.update(unread_count=Coalesce(Subquery(unread), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_permissionrequest_event_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_unread_count, migrations.RunPython.noop),
+    ]
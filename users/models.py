@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from smart_campus.db import serialized_writes
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -12,6 +14,8 @@ class User(AbstractUser):
     department = models.CharField(max_length=100, blank=True, null=True)
     can_create_events = models.BooleanField(default=False)
     can_create_clubs = models.BooleanField(default=False)
+    # Denormalized unread notification count, maintained by users.signals
+    unread_count = models.PositiveIntegerField(default=0, editable=False)
     
     def is_student(self):
         return self.role == 'student'
@@ -44,6 +48,49 @@ class Notification(models.Model):
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        # Run the post_save unread counter refresh in the same transaction as the write
+        with serialized_writes(), transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class NotificationOutbox(models.Model):
+    """A pending fan-out of one notification to every user with the given roles.
+
+    Requests write a single row here; the process_notification_outbox command
+    expands it into Notification rows in batches, resuming from last_user_id
+    if a batch fails.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    recipient_roles = models.JSONField(default=list)
+    title = models.CharField(max_length=100)
+    message = models.TextField()
+    link = models.CharField(max_length=200, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    last_user_id = models.BigIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+        ]
+    
+    def __str__(self):
+        return self.idempotency_key
 
 
 class PermissionRequest(models.Model):
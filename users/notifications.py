@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from smart_campus.db import serialized_writes
+
+
+def use_unread_column():
+    """Whether the unread badge is served from the denormalized User.unread_count column"""
+    return getattr(settings, 'NOTIFICATIONS_UNREAD_COUNT_COLUMN', True)
+
+
+def unread_cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def get_unread_count(user):
+    """Return the number of unread notifications for a user without a COUNT(*) per render"""
+    if use_unread_column():
+        return user.unread_count
+
+    key = unread_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = user.notifications.filter(is_read=False).count()
+        cache.set(key, count, getattr(settings, 'NOTIFICATIONS_UNREAD_CACHE_TIMEOUT', 300))
+    return count
+
+
+def refresh_unread_counts(user_ids):
+    """
+    Bring the cached and denormalized unread counters back in line for the given users.
+
+    Called after any Notification write, including bulk writes that bypass model
+    signals. The column is recomputed with a correlated subquery in a single
+    UPDATE, so it runs inside whatever transaction the caller is in.
+    """
+    from .models import Notification, User
+
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    cache.delete_many([unread_cache_key(user_id) for user_id in user_ids])
+
+    if use_unread_column():
+        unread = (
+            Notification.objects.filter(user=OuterRef('pk'), is_read=False)
+            .order_by()
+            .values('user')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        User.objects.filter(pk__in=user_ids).update(
+            unread_count=Coalesce(Subquery(unread), Value(0))
+        )
+
+
+def enqueue_role_notification(key, roles, title, message, link=None):
+    """
+    Queue one notification for every user with one of the given roles.
+
+    Writes a single NotificationOutbox row; the fan-out happens later in the
+    process_notification_outbox worker. The idempotency key makes repeated
+    calls for the same source object a no-op.
+    """
+    from .models import NotificationOutbox
+
+    try:
+        with transaction.atomic():
+            job = NotificationOutbox.objects.create(
+                idempotency_key=key,
+                recipient_roles=list(roles),
+                title=title,
+                message=message,
+                link=link,
+            )
+    except IntegrityError:
+        return NotificationOutbox.objects.get(idempotency_key=key)
+
+    if getattr(settings, 'NOTIFICATIONS_OUTBOX_EAGER', False):
+        transaction.on_commit(lambda: process_outbox_job(job))
+    return job
+
+
+def claim_outbox_jobs(limit=10):
+    """
+    Claim up to `limit` due jobs for this worker.
+
+    Each claim is a conditional UPDATE, so concurrent workers never process the
+    same job. Jobs stuck in 'processing' longer than the lease (a worker died
+    mid-job) become claimable again.
+    """
+    from .models import NotificationOutbox
+
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'NOTIFICATIONS_OUTBOX_LEASE', 300))
+    claimable = Q(status='pending', available_at__lte=now) | Q(status='processing', locked_at__lt=now - lease)
+
+    claimed = []
+    for job_id in NotificationOutbox.objects.filter(claimable).values_list('id', flat=True)[:limit]:
+        updated = NotificationOutbox.objects.filter(claimable, id=job_id).update(
+            status='processing', locked_at=now
+        )
+        if updated:
+            claimed.append(NotificationOutbox.objects.get(id=job_id))
+    return claimed
+
+
+def process_outbox_job(job, batch_size=500):
+    """
+    Expand a claimed job into Notification rows with bulk_create.
+
+    Recipients are walked in primary key order and each batch commits together
+    with the job's last_user_id cursor, so a retry resumes after the last
+    delivered batch instead of notifying anyone twice.
+    """
+    from .models import Notification, User
+
+    recipients = User.objects.filter(role__in=job.recipient_roles).order_by('id')
+    try:
+        while True:
+            user_ids = list(recipients.filter(id__gt=job.last_user_id).values_list('id', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            with serialized_writes(), transaction.atomic():
+                Notification.objects.bulk_create([
+                    Notification(user_id=user_id, title=job.title, message=job.message, link=job.link)
+                    for user_id in user_ids
+                ])
+                # bulk_create skips post_save, so refresh the badge counters here
+                refresh_unread_counts(user_ids)
+                job.last_user_id = user_ids[-1]
+                job.save(update_fields=['last_user_id'])
+    except Exception as e:
+        job.attempts += 1
+        job.last_error = str(e)
+        max_attempts = getattr(settings, 'NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', 5)
+        if job.attempts >= max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.available_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+        job.locked_at = None
+        job.save(update_fields=['attempts', 'last_error', 'status', 'available_at', 'locked_at'])
+        raise
+
+    job.status = 'done'
+    job.locked_at = None
+    job.processed_at = timezone.now()
+    job.save(update_fields=['status', 'locked_at', 'processed_at'])
+    return job
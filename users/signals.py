@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notification
+from .notifications import refresh_unread_counts
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def update_unread_count(sender, instance, **kwargs):
+    """Keep the unread badge counter in sync with every Notification write"""
+    refresh_unread_counts([instance.user_id])
@@ -1,3 +1,216 @@
-from django.test import TestCase
+import datetime
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clubs.models import Club
+from events import conflicts
+from events.models import Event
+from feedback.models import Feedback
+from lost_found import matching
+from lost_found.models import LostItem
+from smart_campus.testing import QueryScalingTestCase
+
+from .models import Notification, PermissionRequest, User
+from .views import UserUpdateForm, _publish_requested_event
+
+
+class UserQueryCountTests(QueryScalingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', password='pw', role='student')
+        cls.faculty = User.objects.create_user('faculty', password='pw', role='faculty')
+
+    def setUp(self):
+        super().setUp()
+        matching._matcher = None
+        self.client.force_login(self.student)
+        self.created = 0
+
+    def add_activity(self, count):
+        for _ in range(count):
+            self.created += 1
+            start = timezone.now() + timedelta(days=self.created)
+            event = Event.objects.create(
+                title=f'Event {self.created}', description='Description', location='Library',
+                start_date=start, end_date=start + timedelta(hours=1), organizer=self.faculty,
+            )
+            event.attendees.add(self.student)
+            club = Club.objects.create(name=f'Club {self.created}', description='Description', president=self.faculty)
+            club.members.add(self.student)
+            LostItem.objects.create(
+                title=f'Item {self.created}', description='Description', location='Library',
+                date=datetime.date(2025, 1, 10), user=self.student,
+            )
+            Feedback.objects.create(title=f'Feedback {self.created}', description='Description',
+                                    category='Library', user=self.student)
+
+    def add_notifications(self, count):
+        for _ in range(count):
+            self.created += 1
+            Notification.objects.create(user=self.student, title=f'Notice {self.created}',
+                                        message='Message', link='/events/')
+
+    def add_requests(self, count):
+        for _ in range(count):
+            self.created += 1
+            requester = User.objects.create_user(f'requester{self.created}')
+            PermissionRequest.objects.create(user=requester, permission_type='club_creation', reason='Reason')
+            PermissionRequest.objects.create(user=self.student, permission_type='event_creation', reason='Reason',
+                                             status='rejected', reviewed_by=self.faculty,
+                                             reviewed_at=timezone.now())
+
+    def test_profile(self):
+        self.assertConstantQueries(reverse('users:profile'), self.add_activity, 'users:profile')
+
+    def test_notifications(self):
+        self.assertConstantQueries(reverse('users:notifications'), self.add_notifications, 'users:notifications')
+
+    def test_permission_requests_student(self):
+        self.assertConstantQueries(reverse('users:permission_requests'), self.add_requests,
+                                   'users:permission_requests (student)')
+
+    def test_permission_requests_faculty(self):
+        self.client.force_login(self.faculty)
+        self.assertConstantQueries(reverse('users:permission_requests'), self.add_requests,
+                                   'users:permission_requests (faculty)')
+
+
+@override_settings(SCHEDULER_VENUES=['Hall A', 'Hall B'], SCHEDULER_TIME_SHIFTS=[0, 1])
+class ScheduleRequestsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+        cls.start = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=7)
+        cls.requests = [
+            PermissionRequest.objects.create(
+                user=cls.student, permission_type='event_creation', reason='Please', event_title=f'Meetup {index}',
+                event_location='Hall A', event_start_date=cls.start, event_end_date=cls.start + timedelta(hours=1),
+            )
+            for index in range(2)
+        ]
+        cls.url = reverse('users:schedule_permission_requests')
+
+    def setUp(self):
+        conflicts._index = None
+        self.client.force_login(self.faculty)
+
+    def test_students_cannot_schedule(self):
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get(self.url), reverse('home'), fetch_redirect_response=False)
+
+    def test_proposal_and_bulk_accept(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = response.context['rows']
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0].location, 'Hall A')
+
+        data = {'accept': [slot.request.id for slot in rows]}
+        for slot in rows:
+            data[f'slot-{slot.request.id}'] = f'{slot.location}|{slot.start.isoformat()}|{slot.end.isoformat()}'
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('users:permission_requests'), fetch_redirect_response=False)
+
+        self.assertFalse(PermissionRequest.objects.filter(status='pending').exists())
+        events = Event.objects.order_by('start_date', 'location')
+        self.assertEqual(events.count(), 2)
+        for event in events:
+            self.assertEqual(conflicts.find_conflicts(event.location, event.start_date, event.end_date,
+                                                      exclude_id=event.id), [])
+        self.assertEqual(Notification.objects.filter(user=self.student, title='Event Approved and Published').count(), 2)
+
+        # Replaying the form approves nothing twice
+        self.client.post(self.url, data)
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_taken_slot_is_skipped(self):
+        first = self.requests[0]
+        data = {
+            'accept': [first.id],
+            f'slot-{first.id}': f'Hall A|{self.start.isoformat()}|{(self.start + timedelta(hours=1)).isoformat()}',
+        }
+        Event.objects.create(title='Booked', description='Description', location='Hall A', organizer=self.faculty,
+                             start_date=self.start, end_date=self.start + timedelta(hours=2))
+        self.client.post(self.url, data)
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'pending')
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_malformed_request_id_is_skipped(self):
+        times = f'{self.start.isoformat()}|{(self.start + timedelta(hours=1)).isoformat()}'
+        response = self.client.post(self.url, {'accept': ['oops'], 'slot-oops': f'Hall A|{times}'}, follow=True)
+        self.assertContains(response, '1 request(s) were skipped')
+        self.assertFalse(Event.objects.exists())
+
+
+class WriteMethodTests(TestCase):
+    """Views that change data only accept POST, so ReplicaMiddleware sends them to the primary"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+        cls.notification = Notification.objects.create(user=cls.student, title='Notice', message='Message',
+                                                       link='/events/')
+        cls.permission_request = PermissionRequest.objects.create(user=cls.student, permission_type='club_creation',
+                                                                  reason='Chess club')
+
+    def test_mark_notification_read(self):
+        self.client.force_login(self.student)
+        url = reverse('users:mark_notification_read', args=[self.notification.id])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.notification.refresh_from_db()
+        self.assertFalse(self.notification.is_read)
+        self.assertRedirects(self.client.post(url), '/events/', fetch_redirect_response=False)
+        self.notification.refresh_from_db()
+        self.assertTrue(self.notification.is_read)
+
+    def test_review_permission_requests(self):
+        self.client.force_login(self.faculty)
+        for name in ['users:approve_permission', 'users:reject_permission']:
+            self.assertEqual(self.client.get(reverse(name, args=[self.permission_request.id])).status_code, 405)
+        self.permission_request.refresh_from_db()
+        self.assertEqual(self.permission_request.status, 'pending')
+        self.client.post(reverse('users:reject_permission', args=[self.permission_request.id]))
+        self.permission_request.refresh_from_db()
+        self.assertEqual(self.permission_request.status, 'rejected')
+
+
+class UnreadCountWriteTests(TestCase):
+    """Saving a user loaded before a notification arrived must not reset its unread_count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', email='student@campus.example', role='student')
+        cls.faculty = User.objects.create_user('faculty', role='faculty')
+
+    def notify(self):
+        Notification.objects.create(user=self.student, title='Notice', message='Message')
+
+    def test_profile_form(self):
+        stale = User.objects.get(pk=self.student.pk)
+        self.notify()
+        form = UserUpdateForm({'username': 'student', 'email': 'new@campus.example', 'department': 'Physics'},
+                              instance=stale)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.student.refresh_from_db()
+        self.assertEqual((self.student.email, self.student.unread_count), ('new@campus.example', 1))
+
+    def test_publishing_a_requested_event(self):
+        start = timezone.now() + timedelta(days=3)
+        permission_request = PermissionRequest.objects.create(
+            user=self.student, permission_type='event_creation', reason='Please', event_title='Meetup',
+            event_location='Hall A', event_start_date=start, event_end_date=start + timedelta(hours=1),
+        )
+        permission_request = PermissionRequest.objects.select_related('user').get(pk=permission_request.pk)
+        self.notify()
+        _publish_requested_event(permission_request, self.faculty)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.can_create_events)
+        # The notice above and the approval notification
+        self.assertEqual(self.student.unread_count, 2)
@@ -6,9 +6,14 @@ from django.contrib.auth import get_user_model, login
 from django.contrib.auth.views import LoginView, LogoutView
 from django import forms
 from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from django.db import transaction
 from django.utils import timezone
+from datetime import datetime
 import logging
+from smart_campus.db import serialized_writes
 from .models import Notification, PermissionRequest
+from .notifications import enqueue_role_notification, get_unread_count
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -45,6 +50,13 @@ class UserUpdateForm(forms.ModelForm):
         model = User
         fields = ['username', 'email', 'department', 'profile_picture']
 
+    def save(self, commit=True):
+        user = super().save(commit=False)
+        if commit:
+            # unread_count changes under this form; a full save would overwrite it
+            user.save(update_fields=self._meta.fields)
+        return user
+
 def register(request):
     if request.method == 'POST':
         form = UserRegisterForm(request.POST)
@@ -101,13 +113,15 @@ def profile(request):
 @login_required
 def notifications(request):
     notifications = request.user.notifications.all()
-    unread_count = request.user.notifications.filter(is_read=False).count()
+    unread_count = get_unread_count(request.user)
     return render(request, 'users/notifications.html', {
         'notifications': notifications,
         'unread_count': unread_count
     })
 
 @login_required
+@require_POST
+@serialized_writes()
 def mark_notification_read(request, notification_id):
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
     notification.is_read = True
@@ -193,15 +207,14 @@ def request_permission(request):
                 else:
                     messages.info(request, 'Permission request submitted without an image.')
                 
-                # Notify faculty and admin about the request
-                faculty_and_admin_users = User.objects.filter(role__in=['faculty', 'admin'])
-                for user in faculty_and_admin_users:
-                    create_notification(
-                        user=user,
-                        title=f'Permission Request from {request.user.username}',
-                        message=f'Permission Type: {permission_request.get_permission_type_display()}\nReason: {permission_request.reason[:100]}...',
-                        link=f'/users/permission-requests/{permission_request.id}/'
-                    )
+                # Notify faculty and admin about the request (fanned out by the outbox worker)
+                enqueue_role_notification(
+                    key=f'permission_request:{permission_request.id}',
+                    roles=['faculty', 'admin'],
+                    title=f'Permission Request from {request.user.username}',
+                    message=f'Permission Type: {permission_request.get_permission_type_display()}\nReason: {permission_request.reason[:100]}...',
+                    link=f'/users/permission-requests/{permission_request.id}/'
+                )
                 
                 messages.success(request, 'Permission request submitted successfully! Faculty and admin have been notified.')
                 return redirect('users:permission_requests')
@@ -225,6 +238,7 @@ def permission_requests(request):
         requests = request.user.permission_requests.all()
     else:
         requests = PermissionRequest.objects.filter(status='pending')
+    requests = requests.select_related('user', 'reviewed_by')
     
     return render(request, 'users/permission_requests.html', {'requests': requests})
 
@@ -241,7 +255,50 @@ def permission_request_detail(request, request_id):
 
     return render(request, 'users/permission_request_detail.html', {'request_obj': permission_request})
 
+def _publish_requested_event(permission_request, reviewer):
+    """Create the Event described by an approved event_creation request and notify the requester"""
+    # grant the user the event creation flag as a backup
+    permission_request.user.can_create_events = True
+    # Only the flag: a full save would write back a stale unread_count
+    permission_request.user.save(update_fields=['can_create_events'])
+
+    # Only create the Event if the student supplied required data
+    if not (permission_request.event_title and permission_request.event_start_date):
+        # If required info missing, inform the student they were approved but event not auto-created
+        create_notification(
+            user=permission_request.user,
+            title='Permission Approved',
+            message=(f'Your request for {permission_request.get_permission_type_display()} was approved by {reviewer.username}, '
+                     'but the event was not auto-created because required event details were missing. Please create the event manually.'),
+            link='/events/'
+        )
+        return None
+
+    from events.models import Event
+    event = Event(
+        title=permission_request.event_title,
+        description=permission_request.event_description or permission_request.reason,
+        location=permission_request.event_location or 'TBD',
+        start_date=permission_request.event_start_date,
+        end_date=permission_request.event_end_date or permission_request.event_start_date,
+        organizer=permission_request.user,
+    )
+    # attach image if provided on the request
+    if getattr(permission_request, 'event_image', None):
+        event.image = permission_request.event_image
+    event.save()
+
+    # Notify requester that their event is live and link to its detail page
+    create_notification(
+        user=permission_request.user,
+        title='Event Approved and Published',
+        message=f'Your event "{event.title}" was approved and published by {reviewer.username}.',
+        link=f'/events/{event.id}/'
+    )
+    return event
+
 @login_required
+@require_POST
 def approve_permission(request, request_id):
     """Allow faculty/admin to approve permission requests"""
     # Only faculty may approve permission requests
@@ -263,47 +320,16 @@ def approve_permission(request, request_id):
 
     # If this was an event creation request, create the Event from stored fields
     if permission_request.permission_type == 'event_creation':
-        # grant the user the event creation flag as a backup
-        permission_request.user.can_create_events = True
-        permission_request.user.save()
-
-        # Only create the Event if the student supplied required data
-        if permission_request.event_title and permission_request.event_start_date:
-            from events.models import Event
-            event = Event(
-                title=permission_request.event_title,
-                description=permission_request.event_description or permission_request.reason,
-                location=permission_request.event_location or 'TBD',
-                start_date=permission_request.event_start_date,
-                end_date=permission_request.event_end_date or permission_request.event_start_date,
-                organizer=permission_request.user,
-            )
-            # attach image if provided on the request
-            if getattr(permission_request, 'event_image', None):
-                event.image = permission_request.event_image
-            event.save()
-
-            # Notify requester that their event is live and link to its detail page
-            create_notification(
-                user=permission_request.user,
-                title='Event Approved and Published',
-                message=f'Your event "{event.title}" was approved and published by {request.user.username}.',
-                link=f'/events/{event.id}/'
-            )
-        else:
-            # If required info missing, inform the student they were approved but event not auto-created
-            create_notification(
-                user=permission_request.user,
-                title='Permission Approved',
-                message=(f'Your request for {permission_request.get_permission_type_display()} was approved by {request.user.username}, '
-                         'but the event was not auto-created because required event details were missing. Please create the event manually.'),
-                link='/events/'
-            )
+        event = _publish_requested_event(permission_request, request.user)
+        if event is not None:
+            # Approval still goes ahead; the reviewer is told about any double booking
+            from events.conflicts import warn_conflicts
+            warn_conflicts(request, event)
 
     elif permission_request.permission_type == 'club_creation':
         # grant the user club creation permission
         permission_request.user.can_create_clubs = True
-        permission_request.user.save()
+        permission_request.user.save(update_fields=['can_create_clubs'])
 
         # Try to auto-create a Club from the request. Use reasonable defaults if students didn't provide explicit club fields.
         try:
@@ -344,6 +370,61 @@ def approve_permission(request, request_id):
     return redirect('users:permission_requests')
 
 @login_required
+def schedule_permission_requests(request):
+    """Propose a venue and time for every pending event request and approve the accepted rows in bulk"""
+    if not request.user.is_faculty():
+        messages.error(request, 'Only faculty can approve permissions.')
+        return redirect('home')
+
+    from events.conflicts import find_conflicts
+    from events.scheduling import propose_schedule
+
+    if request.method == 'POST':
+        approved = skipped = 0
+        for request_id in request.POST.getlist('accept'):
+            # The slot shown to the reviewer travels with the form so accepting never re-solves
+            location, _, times = request.POST.get(f'slot-{request_id}', '').partition('|')
+            start, _, end = times.partition('|')
+            try:
+                request_id = int(request_id)
+                start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+            except ValueError:
+                skipped += 1
+                continue
+            with transaction.atomic():
+                permission_request = PermissionRequest.objects.select_for_update().filter(
+                    id=request_id, status='pending', permission_type='event_creation',
+                ).select_related('user').first()
+                # Approved elsewhere meanwhile, or the slot was taken since the proposal
+                if permission_request is None or find_conflicts(location, start, end):
+                    skipped += 1
+                    continue
+                permission_request.event_location = location
+                permission_request.event_start_date = start
+                permission_request.event_end_date = end
+                permission_request.status = 'approved'
+                permission_request.reviewed_by = request.user
+                permission_request.reviewed_at = timezone.now()
+                permission_request.save()
+                _publish_requested_event(permission_request, request.user)
+            approved += 1
+        if approved:
+            messages.success(request, f'Approved and published {approved} event request(s).')
+        if skipped:
+            messages.warning(request, f'{skipped} request(s) were skipped because they were already reviewed '
+                                      'or their slot is no longer free. Run the scheduler again for them.')
+        return redirect('users:permission_requests')
+
+    schedule = propose_schedule()
+    rows = sorted(schedule.assignments.values(), key=lambda slot: (slot.start, slot.location))
+    return render(request, 'users/schedule_requests.html', {
+        'schedule': schedule,
+        'rows': rows,
+        'pending_count': len(rows) + len(schedule.unscheduled),
+    })
+
+@login_required
+@require_POST
 def reject_permission(request, request_id):
     """Allow faculty/admin to reject permission requests"""
     # Only faculty may reject permission requests